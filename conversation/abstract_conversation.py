@@ -3,6 +3,15 @@ import typing
 from enum import Enum
 from PIL import Image
 
+from conversation.history_policy import (
+    PLACEHOLDER_TEXT,
+    HistoryPolicy,
+    RequestStats,
+    estimate_image_tokens,
+    estimate_text_tokens,
+)
+from conversation.image_cache import EncodedImage
+
 
 class Role(str, Enum):
     USER = "user"
@@ -10,6 +19,13 @@ class Role(str, Enum):
 
 
 class Conversation:
+    history_policy: HistoryPolicy = HistoryPolicy()
+    # What was sent on every request, to weigh the history policy against the quality of answers
+    request_stats: typing.Sequence[RequestStats] = ()
+
+    # Decides what is sent of the images in the history (e.g. to downsample old ones), see `history_policy.py`
+    def set_history_policy(self, policy: HistoryPolicy):
+        self.history_policy = policy
 
     # Upon calling the method, user signals that he wants to send a message (containing text and images)
     # Cannot be called before commit_transaction() or after rollback_transaction() after begin_transaction() is called
@@ -38,3 +54,64 @@ class Conversation:
 
     def get_latest_message(self) -> typing.Tuple[Role, str]:
         pass
+
+    # Image sent by a content block of the backend's messages (None if the block isn't an image)
+    def _image_of_block(self, block: dict) -> typing.Optional[EncodedImage]:
+        return None
+
+    # Content block of the backend's messages sending the image
+    def _block_of_image(self, image: EncodedImage) -> dict:
+        pass
+
+    # Messages to send in a request, after applying the history policy to `messages`, which are left untouched
+    def _prepare_request(self, messages: typing.List[dict]) -> typing.List[dict]:
+        images = []  # (message index, block index, image)
+        text_characters = 0
+
+        for i, message in enumerate(messages):
+            content = message["content"]
+
+            if isinstance(content, str):
+                text_characters += len(content)
+                continue
+
+            for j, block in enumerate(content):
+                image = self._image_of_block(block)
+
+                if image is None:
+                    text_characters += len(block.get("text", ""))
+                else:
+                    images.append((i, j, image))
+
+        kept = self.history_policy.apply([image for _, _, image in images], text_characters)
+        request = list(messages)
+
+        for (i, j, image), kept_image in zip(images, kept):
+            if kept_image is image:
+                continue
+
+            if request[i] is messages[i]:
+                request[i] = {**messages[i], "content": list(messages[i]["content"])}
+
+            if kept_image is None:
+                request[i]["content"][j] = {"type": "text", "text": PLACEHOLDER_TEXT}
+                text_characters += len(PLACEHOLDER_TEXT)
+            else:
+                request[i]["content"][j] = self._block_of_image(kept_image)
+
+        sent = [(image, kept_image) for (_, _, image), kept_image in zip(images, kept) if kept_image is not None]
+
+        if not isinstance(self.request_stats, list):  # Still the (shared) class-level default
+            self.request_stats = []
+
+        self.request_stats.append(RequestStats(
+            images=len(sent),
+            downsampled_images=sum(kept_image is not image for image, kept_image in sent),
+            dropped_images=len(images) - len(sent),
+            payload_bytes=text_characters + sum(len(kept_image.base64) for _, kept_image in sent),
+            estimated_tokens=estimate_text_tokens(text_characters) + sum(
+                estimate_image_tokens(kept_image.size) for _, kept_image in sent
+            ),
+        ))
+
+        return request
@@ -1,5 +1,3 @@
-import base64
-import io
 import logging
 from dataclasses import dataclass
 from time import sleep
@@ -8,6 +6,7 @@ from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 from PIL import Image
 
 from conversation.abstract_conversation import Conversation, Role
+from conversation.image_cache import EncodedImage, encode_image
 
 # Conditional import for optional anthropic dependency
 # This allows the file to be imported even if anthropic is not installed
@@ -145,6 +144,9 @@ class AnthropicConversation(Conversation):
         self.total_input_tokens = 0
         self.total_output_tokens = 0
 
+        # Images in the conversation by their base64 data, for the history policy
+        self.images_by_data: Dict[str, EncodedImage] = {}
+
     def begin_transaction(self, role: Role) -> None:
         """
         Begin a new message transaction.
@@ -196,7 +198,7 @@ class AnthropicConversation(Conversation):
         """
         Add an image message to the current transaction.
         
-        Images are converted to JPEG format and base64 encoded.
+        Images are converted to JPEG format and base64 encoded, through the shared encoded image cache.
         A text label is automatically added before each image.
         
         Args:
@@ -211,21 +213,28 @@ class AnthropicConversation(Conversation):
         self.image_counter += 1
         self.add_text_message(f"Image {self.image_counter}:")
 
-        # Convert image to JPEG and base64 encode
-        image = image.convert("RGB")
-        buffer = io.BytesIO()
-        image.save(buffer, format='JPEG', quality=JPEG_QUALITY)
-        base64_image = base64.b64encode(buffer.getvalue()).decode('utf-8')
+        # JPEG and base64 encode (or reuse the encoding of an image already sent)
+        encoded = encode_image(image, quality=JPEG_QUALITY)
+        self.images_by_data[encoded.base64] = encoded
 
         content = self.transaction_conversation["content"]
-        content.append({
+        content.append(self._block_of_image(encoded))
+
+    def _image_of_block(self, block: Dict[str, Any]) -> Optional[EncodedImage]:
+        if block["type"] != "image":
+            return None
+
+        return self.images_by_data.get(block["source"]["data"])
+
+    def _block_of_image(self, image: EncodedImage) -> Dict[str, Any]:
+        return {
             "type": "image",
             "source": {
                 "type": "base64",
-                "media_type": "image/jpeg",
-                "data": str(base64_image)
+                "media_type": image.media_type,
+                "data": image.base64
             }
-        })
+        }
 
     def _call_anthropic_api(
         self, 
@@ -367,7 +376,7 @@ class AnthropicConversation(Conversation):
         # Send to Anthropic API and get response
         response = self._call_anthropic_api(
             model=self.model_name,
-            messages=self.conversation,
+            messages=self._prepare_request(self.conversation),
             max_tokens=self.max_tokens,
             temperature=self.temperature,
             top_p=self.top_p,
@@ -1,4 +1,3 @@
-import io
 import logging
 from time import sleep
 
@@ -8,6 +7,7 @@ from google.genai import types
 from google.genai.errors import APIError, ServerError
 
 from conversation.abstract_conversation import Conversation, Role
+from conversation.image_cache import encode_image
 
 
 class GeminiConversation(Conversation):
@@ -31,6 +31,12 @@ class GeminiConversation(Conversation):
         self.transaction_role = None
         self.transaction_conversation = {}
 
+    def set_history_policy(self, policy):
+        raise ValueError(
+            "GeminiConversation does not support history policies: the chat session keeps the history and only new "
+            "messages are sent, so there is nothing to trim"
+        )
+
     def begin_transaction(self, role: Role):
         if self.transaction_started:
             raise Exception("Transaction already started")
@@ -62,7 +68,8 @@ class GeminiConversation(Conversation):
         if not self.transaction_started:
             raise Exception("Transaction not started")
 
-        image = image.convert("RGB")
+        if image.mode != "RGB":  # Converting to the same mode would copy the image
+            image = image.convert("RGB")
         
         content = self.transaction_conversation["content"]
 
@@ -82,14 +89,11 @@ class GeminiConversation(Conversation):
                 if sub["type"] == "text":
                     parts.append(types.Part.from_text(text=sub["text"]))
                 elif sub["type"] == "image":
-                    # Convert PIL Image to bytes
-                    img = sub["image"]
-                    buffer = io.BytesIO()
-                    img.save(buffer, format='JPEG', quality=95)
-                    buffer.seek(0)
+                    # The whole conversation is converted on every request; images are only encoded the first time
+                    encoded = encode_image(sub["image"])
                     parts.append(types.Part.from_bytes(
-                        data=buffer.read(),
-                        mime_type='image/jpeg'
+                        data=encoded.data,
+                        mime_type=encoded.media_type
                     ))
                 else:
                     parts.append(types.Part.from_text("[unsupported content]"))
@@ -0,0 +1,140 @@
+import hashlib
+import io
+import math
+import threading
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Tuple
+
+from PIL import Image
+
+from conversation.base_conversation_factory import BaseConversationFactory
+from conversation.image_cache import EncodedImage, JPEG_QUALITY, encode_image
+
+PLACEHOLDER_TEXT = "[An earlier image was removed from the conversation to save context]"
+
+# Rough estimates, only used to keep requests under a budget: ~4 characters of text per token, and images cost about
+# one token per 750 pixels (as documented by Anthropic; OpenAI's tiling gives similar numbers at our resolutions).
+CHARACTERS_PER_TOKEN = 4
+PIXELS_PER_TOKEN = 750
+
+
+def estimate_image_tokens(size: Tuple[int, int]) -> int:
+    return math.ceil(size[0] * size[1] / PIXELS_PER_TOKEN)
+
+
+def estimate_text_tokens(characters: int) -> int:
+    return math.ceil(characters / CHARACTERS_PER_TOKEN)
+
+
+# Downsampled images by the digest of the original and the factor. Keyed by the digest rather than the image, so that
+# the cache doesn't keep the full size originals alive.
+_downsampled: "OrderedDict[Tuple[bytes, float], EncodedImage]" = OrderedDict()
+_downsampled_capacity = 512
+_downsampled_lock = threading.Lock()
+
+
+def downsample(image: EncodedImage, factor: float) -> EncodedImage:
+    """The image scaled by `factor`. Old images are downsampled again on every request, hence the cache."""
+    key = hashlib.blake2b(image.data, digest_size=16).digest(), factor
+
+    with _downsampled_lock:
+        downsampled = _downsampled.get(key)
+
+        if downsampled is not None:
+            _downsampled.move_to_end(key)
+            return downsampled
+
+    with Image.open(io.BytesIO(image.data)) as decoded:
+        size = (max(1, round(decoded.width * factor)), max(1, round(decoded.height * factor)))
+        downsampled = encode_image(decoded.resize(size, Image.Resampling.LANCZOS), quality=JPEG_QUALITY)
+
+    with _downsampled_lock:
+        _downsampled[key] = downsampled
+
+        while len(_downsampled) > _downsampled_capacity:
+            _downsampled.popitem(last=False)
+
+    return downsampled
+
+
+class RequestStats(NamedTuple):
+    images: int  # Images sent, at full size or downsampled
+    downsampled_images: int
+    dropped_images: int  # Images replaced with a placeholder
+    payload_bytes: int  # Base64 image data and text
+    estimated_tokens: int
+
+
+class HistoryPolicy:
+    """
+    Decides what is sent of the images in the conversation history on every request. This one sends all of them as they
+    are, which is what FlySearch always did.
+    """
+
+    def apply(self, images: List[EncodedImage], text_characters: int) -> List[Optional[EncodedImage]]:
+        """
+        Given the images of the conversation (oldest first) and the length of its text, returns the image to send in
+        place of each of them, or None to replace it with a placeholder.
+        """
+        return images
+
+
+class ContextBudgetPolicy(HistoryPolicy):
+    """
+    Keeps the last `keep_last_images` images as they are (all of them if it's None), and downsamples the older ones by
+    `downsample_factor` (or replaces them with placeholders if it's None). If the request would still exceed
+    `max_payload_bytes` or `max_tokens`, the oldest images are replaced with placeholders until it fits (the latest
+    image is always sent).
+    """
+
+    def __init__(self, keep_last_images: Optional[int] = 3, downsample_factor: Optional[float] = 0.5,
+                 max_payload_bytes: Optional[int] = None, max_tokens: Optional[int] = None):
+        if keep_last_images is not None and keep_last_images < 1:
+            raise ValueError("At least the latest image has to be kept")
+
+        self.keep_last_images = keep_last_images
+        self.downsample_factor = downsample_factor
+        self.max_payload_bytes = max_payload_bytes
+        self.max_tokens = max_tokens
+
+    def apply(self, images: List[EncodedImage], text_characters: int) -> List[Optional[EncodedImage]]:
+        old = 0 if self.keep_last_images is None else max(0, len(images) - self.keep_last_images)
+
+        if self.downsample_factor is None:
+            kept = [None] * old + images[old:]
+        else:
+            kept = [downsample(image, self.downsample_factor) for image in images[:old]] + images[old:]
+
+        payload_bytes = text_characters + sum(len(image.base64) for image in kept if image is not None)
+        tokens = estimate_text_tokens(text_characters) + sum(
+            estimate_image_tokens(image.size) for image in kept if image is not None
+        )
+
+        for i in range(len(kept) - 1):
+            if not self._over_budget(payload_bytes, tokens):
+                break
+
+            if kept[i] is not None:
+                payload_bytes -= len(kept[i].base64) - len(PLACEHOLDER_TEXT)
+                tokens -= estimate_image_tokens(kept[i].size) - estimate_text_tokens(len(PLACEHOLDER_TEXT))
+                kept[i] = None
+
+        return kept
+
+    def _over_budget(self, payload_bytes: int, tokens: int) -> bool:
+        return ((self.max_payload_bytes is not None and payload_bytes > self.max_payload_bytes) or
+                (self.max_tokens is not None and tokens > self.max_tokens))
+
+
+class HistoryPolicyConversationFactory(BaseConversationFactory):
+    """Makes conversations with another factory, and sets the given history policy on them."""
+
+    def __init__(self, factory, policy: HistoryPolicy):
+        self.factory = factory
+        self.policy = policy
+
+    def get_conversation(self):
+        conversation = self.factory.get_conversation()
+        conversation.set_history_policy(self.policy)
+
+        return conversation
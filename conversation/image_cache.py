@@ -0,0 +1,86 @@
+import base64
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, Tuple
+
+from PIL import Image
+
+JPEG_QUALITY = 95
+
+
+class EncodedImage(NamedTuple):
+    data: bytes
+    base64: str
+    media_type: str
+    size: Tuple[int, int]
+
+
+class EncodedImageCache:
+    """
+    Encoded images by content (and encoding parameters), so that an image sent by several conversations - the same
+    glimpse goes to every semantic unit, and is re-sent with the whole history on every request - is encoded once.
+    The least recently used images are evicted once there are more than `capacity` of them.
+    """
+
+    def __init__(self, capacity: int = 256):
+        self.capacity = capacity
+        self.entries: "OrderedDict[Tuple, EncodedImage]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        # Conversations of parallel agents share the cache.
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(image: Image.Image, image_format: str, quality: int) -> Tuple:
+        digest = hashlib.blake2b(image.tobytes(), digest_size=16).digest()
+
+        return digest, image.mode, image.size, image_format, quality
+
+    def encode(self, image: Image.Image, image_format: str = "JPEG", quality: int = JPEG_QUALITY) -> EncodedImage:
+        key = self.key(image, image_format, quality)
+
+        with self._lock:
+            encoded = self.entries.get(key)
+
+            if encoded is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return encoded
+
+            self.misses += 1
+
+        # Encoding is the slow part, so it's done outside the lock; the same image may be encoded twice in a race.
+        if image.mode != "RGB":  # Converting to the same mode would copy the image
+            image = image.convert("RGB")
+
+        buffer = io.BytesIO()
+        image.save(buffer, format=image_format, quality=quality)
+        data = buffer.getvalue()
+        encoded = EncodedImage(data, base64.b64encode(data).decode("utf-8"), f"image/{image_format.lower()}",
+                               image.size)
+
+        with self._lock:
+            self.entries[key] = encoded
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+
+        return encoded
+
+    def clear(self) -> None:
+        with self._lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+encoded_images = EncodedImageCache()
+
+
+def encode_image(image: Image.Image, image_format: str = "JPEG", quality: int = JPEG_QUALITY) -> EncodedImage:
+    """Encodes the image, or returns its encoding from the process-wide cache."""
+    return encoded_images.encode(image, image_format, quality)
@@ -1,11 +1,9 @@
-import base64
-import io
-
 from time import sleep
 from PIL import Image
 from openai import RateLimitError, Client
 
 from conversation.abstract_conversation import Conversation, Role
+from conversation.image_cache import encode_image
 
 
 class OpenAIConversation(Conversation):
@@ -22,6 +20,9 @@ class OpenAIConversation(Conversation):
         self.transaction_role = None
         self.transaction_conversation = {}
 
+        # Images in the conversation by their data URL, for the history policy
+        self.images_by_url = {}
+
     def begin_transaction(self, role: Role):
         if self.transaction_started:
             raise Exception("Transaction already started")
@@ -53,22 +54,27 @@ class OpenAIConversation(Conversation):
         if not self.transaction_started:
             raise Exception("Transaction not started")
 
-        image = image.convert("RGB")
-        buffer = io.BytesIO()
-        image.save(buffer, format='JPEG', quality=95)
-        base64_image = base64.b64encode(buffer.getvalue()).decode('utf-8')
+        encoded = encode_image(image)
+        block = self._block_of_image(encoded)
+        self.images_by_url[block["image_url"]["url"]] = encoded
 
         content = self.transaction_conversation["content"]
+        content.append(block)
+
+    def _image_of_block(self, block):
+        if block["type"] != "image_url":
+            return None
 
-        content.append(
-            {
-                "type": "image_url",
-                "image_url": {
-                    "url": f"data:image/jpeg;base64,{base64_image}",
-                    "detail": "high"  # FIXME
-                }
+        return self.images_by_url.get(block["image_url"]["url"])
+
+    def _block_of_image(self, image):
+        return {
+            "type": "image_url",
+            "image_url": {
+                "url": f"data:{image.media_type};base64,{image.base64}",
+                "detail": "high"  # FIXME
             }
-        )
+        }
 
     def get_answer_from_openai(self, model, messages, max_tokens, seed, temperature, top_p):
         fail = True
@@ -110,7 +116,7 @@ class OpenAIConversation(Conversation):
 
         response = self.get_answer_from_openai(
             model=self.model_name,
-            messages=self.conversation,
+            messages=self._prepare_request(self.conversation),
             max_tokens=self.max_tokens,
             seed=self.seed,
             temperature=self.temperature,
@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from conversation import history_policy
+from conversation.abstract_conversation import Conversation, Role
+from conversation.history_policy import PLACEHOLDER_TEXT, ContextBudgetPolicy, HistoryPolicy
+from conversation.image_cache import encode_image
+from conversation.openai_conversation import OpenAIConversation
+from conversation.test_openai_conversation import MockOpenAI
+
+
+def make_image(seed: int, size: int = 100) -> Image.Image:
+    pixels = np.random.default_rng(seed).integers(0, 256, size=(size, size, 3), dtype=np.uint8)
+    return Image.fromarray(pixels)
+
+
+def make_images(n: int):
+    return [encode_image(make_image(seed)) for seed in range(n)]
+
+
+class TestContextBudgetPolicy:
+    def test_default_policy_sends_everything(self):
+        images = make_images(3)
+
+        assert HistoryPolicy().apply(images, 1000) == images
+
+    def test_old_images_are_downsampled(self):
+        images = make_images(5)
+        kept = ContextBudgetPolicy(keep_last_images=2, downsample_factor=0.5).apply(images, 0)
+
+        assert [image.size for image in kept] == [(50, 50)] * 3 + [(100, 100)] * 2
+        assert kept[3:] == images[3:]
+
+    def test_downsampled_images_are_reused(self):
+        images = make_images(3)
+        policy = ContextBudgetPolicy(keep_last_images=1)
+
+        assert policy.apply(images, 0)[0] is policy.apply(images, 0)[0]
+
+    def test_downsampled_images_are_not_keyed_by_originals(self):
+        images = make_images(3)
+        ContextBudgetPolicy(keep_last_images=1).apply(images, 0)
+
+        assert not any(image in key for key in history_policy._downsampled for image in images)
+
+    def test_old_images_can_be_dropped(self):
+        images = make_images(3)
+        policy = ContextBudgetPolicy(keep_last_images=1, downsample_factor=None)
+
+        assert policy.apply(images, 0) == [None, None, images[2]]
+
+    @pytest.mark.parametrize("budget", [{"max_payload_bytes": 1000}, {"max_tokens": 20}])
+    def test_oldest_images_are_dropped_to_fit_the_budget(self, budget):
+        images = make_images(3)
+        kept = ContextBudgetPolicy(keep_last_images=None, **budget).apply(images, 0)
+
+        # The latest image is sent even if it doesn't fit by itself
+        assert kept == [None, None, images[2]]
+
+    def test_images_fitting_the_budget_are_kept(self):
+        images = make_images(3)
+        budget = sum(len(image.base64) for image in images[1:]) + 100
+        policy = ContextBudgetPolicy(keep_last_images=None, max_payload_bytes=budget)
+
+        assert policy.apply(images, 0) == [None] + images[1:]
+
+    def test_latest_image_has_to_be_kept(self):
+        with pytest.raises(ValueError):
+            ContextBudgetPolicy(keep_last_images=0)
+
+
+class TestConversationHistoryPolicy:
+    def make_conversation(self, policy=None):
+        openai_mock = MockOpenAI("mock_key")
+        conversation = OpenAIConversation(openai_mock, model_name="mock_model")  # type: ignore
+
+        if policy is not None:
+            conversation.set_history_policy(policy)
+
+        for seed in range(3):
+            conversation.begin_transaction(Role.USER)
+            conversation.add_text_message(f"Glimpse {seed}")
+            conversation.add_image_message(make_image(seed))
+            conversation.commit_transaction(send_to_vlm=True)
+
+        return conversation, openai_mock
+
+    def test_policy_is_applied_to_requests_only(self):
+        policy = ContextBudgetPolicy(keep_last_images=1, downsample_factor=None)
+        conversation, openai_mock = self.make_conversation(policy)
+
+        sent = openai_mock.get_mock_create_messages()[-1]
+        sent_blocks = [block for message in sent if message["role"] == "user" for block in message["content"]]
+
+        assert [block["type"] for block in sent_blocks] == ["text", "text"] * 2 + ["text", "image_url"]
+        assert sent_blocks[1] == sent_blocks[3] == {"type": "text", "text": PLACEHOLDER_TEXT}
+
+        # The history itself is untouched
+        assert [content for _, content in conversation.get_conversation(save_urls=False)].count("image") == 3
+
+    def test_request_sizes_are_recorded(self):
+        conversation, _ = self.make_conversation()
+        limited_conversation, _ = self.make_conversation(ContextBudgetPolicy(keep_last_images=1))
+
+        assert [stats.images for stats in conversation.request_stats] == [1, 2, 3]
+        assert [stats.downsampled_images for stats in limited_conversation.request_stats] == [0, 1, 2]
+        assert conversation.request_stats[-1].payload_bytes > limited_conversation.request_stats[-1].payload_bytes
+        assert conversation.request_stats[-1].estimated_tokens > limited_conversation.request_stats[-1].estimated_tokens
+
+    def test_conversations_have_defaults_without_calling_init(self):
+        class ConversationMock(Conversation):
+            def __init__(self):
+                pass
+
+        conversation = ConversationMock()
+
+        assert type(conversation.history_policy) is HistoryPolicy
+        assert list(conversation.request_stats) == []
+
+        conversation._prepare_request([{"role": "user", "content": "Hello"}])
+
+        assert len(conversation.request_stats) == 1
+        assert list(ConversationMock().request_stats) == []
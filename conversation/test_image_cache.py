@@ -0,0 +1,57 @@
+import base64
+import io
+
+import numpy as np
+from PIL import Image
+
+from conversation.image_cache import EncodedImageCache
+
+
+def make_image(seed: int, mode: str = "RGB") -> Image.Image:
+    pixels = np.random.default_rng(seed).integers(0, 256, size=(20, 20, 3), dtype=np.uint8)
+    return Image.fromarray(pixels).convert(mode)
+
+
+class TestEncodedImageCache:
+    def test_encoding_matches_pil(self):
+        image = make_image(0)
+        encoded = EncodedImageCache().encode(image)
+
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=95)
+
+        assert encoded.data == buffer.getvalue()
+        assert base64.b64decode(encoded.base64) == encoded.data
+        assert encoded.media_type == "image/jpeg"
+
+    def test_equal_images_are_encoded_once(self):
+        cache = EncodedImageCache()
+
+        first = cache.encode(make_image(0))
+        second = cache.encode(make_image(0))
+
+        assert second is first
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_encoding_parameters_are_part_of_the_key(self):
+        cache = EncodedImageCache()
+        image = make_image(0)
+
+        assert cache.encode(image, quality=95) is not cache.encode(image, quality=50)
+        assert cache.encode(image) is not cache.encode(make_image(0, mode="RGBA"))
+        assert cache.misses == 3
+
+    def test_least_recently_used_images_are_evicted(self):
+        cache = EncodedImageCache(capacity=2)
+        first, second, third = make_image(0), make_image(1), make_image(2)
+
+        cache.encode(first)
+        cache.encode(second)
+        cache.encode(first)
+        cache.encode(third)  # Evicts the second image
+
+        assert len(cache.entries) == 2
+        cache.encode(first)
+        assert cache.misses == 3
+        cache.encode(second)
+        assert cache.misses == 4
@@ -1,3 +1,4 @@
+import functools
 import logging
 import pathlib
 from datetime import datetime
@@ -9,15 +10,23 @@ from dotenv import load_dotenv
 
 from analysis.results import print_results
 from conversation.conversations import LLM_BACKEND_FACTORIES, LLMBackends
+from conversation.history_policy import ContextBudgetPolicy, HistoryPolicyConversationFactory
+from glimpse_generators.render_cache import RenderCache
+from glimpse_generators.replay_glimpse_generator import UnvisitedPositionPolicy
+from glimpse_generators.unreal_client_wrapper import UnrealTransport
+from glimpse_generators.unreal_glimpse_generator import CaptureMode
 from prompts.prompts import PROMPT_FACTORIES
 from rl.agents.agents import AGENT_FACTORIES, Agents
 from rl.environment import EnvironmentType
+from rl.environment.baked_fly_search_env import BakedFlySearchEnv
 from rl.environment.environments import ENVIRONMENTS
+from rl.environment.replay_fly_search_env import ReplayFlySearchEnv
 from rl.evaluation.configs.difficulty_levels import (
     DIFFICULTY_LEVELS,
     DifficultySettings,
 )
 from rl.evaluation.configs.experiment_config import ExperimentConfig
+from rl.evaluation.episode_schedule import EpisodeSchedule
 from rl.evaluation.experiment_runner import ExperimentRunner
 from rl.evaluation.loggers.local_fs_logger_factory import LocalFSLoggerFactory
 from rl.evaluation.validators.altitude_validator_factory import AltitudeValidatorFactory
@@ -81,6 +90,54 @@ def main(
         help="The level of logging to use",
         default=LogLevel.INFO,
     ),
+    simulators: int = typer.Option(
+        help="The number of simulator instances to run episodes on concurrently",
+        default=1,
+        min=1,
+    ),
+    standby_simulator: bool = typer.Option(
+        False,
+        "--standby-simulator",
+        help="Whether to keep a second, warmed-up simulator process ready to replace a crashed one (uses more memory)",
+    ),
+    capture_mode: CaptureMode = typer.Option(
+        help="How glimpses are captured (legacy reproduces the paper, native renders at the final resolution)",
+        default=CaptureMode.LEGACY,
+    ),
+    transport: UnrealTransport = typer.Option(
+        help="How to connect to the simulator (auto uses its Unix domain socket if it's local, falling back to TCP)",
+        default=UnrealTransport.AUTO,
+    ),
+    render_cache: Optional[pathlib.Path] = typer.Option(
+        help="The directory of an on-disk cache of rendered glimpses, reused across runs (disabled if not given)",
+        default=None,
+    ),
+    schedule: EpisodeSchedule = typer.Option(
+        help="The order to run episodes in (hilbert and nearest-neighbour keep consecutive ones close on the map, "
+             "results are still logged under the original indices)",
+        default=EpisodeSchedule.IN_ORDER,
+    ),
+    history_keep_images: Optional[int] = typer.Option(
+        help="Send only the last N images of the conversation at full size, downsampling older ones "
+             "(all are sent if not given)",
+        default=None,
+        min=1,
+    ),
+    history_downsample: float = typer.Option(
+        help="The scale older images are sent at (0 replaces them with placeholders)",
+        default=0.5,
+        min=0.0,
+        max=1.0,
+    ),
+    history_max_bytes: Optional[int] = typer.Option(
+        help="Replace the oldest images with placeholders while a request is larger than this (no limit if not given)",
+        default=None,
+    ),
+    history_max_tokens: Optional[int] = typer.Option(
+        help="Replace the oldest images with placeholders while a request is estimated to take more tokens than this "
+             "(no limit if not given)",
+        default=None,
+    ),
 ):
     logging.basicConfig(level=getattr(logging, log_level.value))
 
@@ -88,6 +145,18 @@ def main(
         run_name = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
 
     context["conversation_factory"] = LLM_BACKEND_FACTORIES[model_backend](model_name)
+
+    if history_keep_images is not None or history_max_bytes is not None or history_max_tokens is not None:
+        history_policy = ContextBudgetPolicy(
+            keep_last_images=history_keep_images,
+            downsample_factor=history_downsample or None,
+            max_payload_bytes=history_max_bytes,
+            max_tokens=history_max_tokens,
+        )
+        context["conversation_factory"] = HistoryPolicyConversationFactory(
+            context["conversation_factory"], history_policy
+        )
+
     context["log_directory"] = pathlib.Path(results_directory) / run_name
     context["logger_factories"] = [
         LocalFSLoggerFactory(
@@ -99,6 +168,12 @@ def main(
     context["continue_from_idx"] = continue_from_idx
     context["sanity_check"] = not skip_sanity_check
     context["number_of_runs"] = number_of_runs
+    context["simulators"] = simulators
+    context["standby_simulator"] = standby_simulator
+    context["capture_mode"] = capture_mode
+    context["transport"] = transport
+    context["render_cache"] = RenderCache(render_cache) if render_cache else None
+    context["schedule"] = schedule
 
 
 @app.command()
@@ -115,11 +190,17 @@ def benchmark(
         EnvironmentType.CITY if scenario_mapper.is_city else EnvironmentType.FOREST
     )
     difficulty_level = DIFFICULTY_LEVELS[scenario_mapper.difficulty]
-    environment = ENVIRONMENTS[env_type](
+    environment_factory = functools.partial(
+        ENVIRONMENTS[env_type],
         give_class_image=difficulty_level.show_visual_sample,
         skip_object_placement_checks=True,
         require_object_in_sight=False,
+        standby_simulator=context["standby_simulator"],
+        capture_mode=context["capture_mode"],
+        transport=context["transport"],
+        render_cache=context["render_cache"],
     )
+    environment = environment_factory()
 
     validator_factories = [
         AltitudeValidatorFactory(difficulty_level.max_uav_altitude),
@@ -141,9 +222,112 @@ def benchmark(
         continue_from_idx=context["continue_from_idx"],
         number_of_glimpses=difficulty_level.max_steps,
         prompt_factory=PROMPT_FACTORIES[difficulty_level.prompt_type],
+        environment_factory=environment_factory,
     )
 
-    runner = ExperimentRunner(config, first_dummy=context["sanity_check"])
+    runner = ExperimentRunner(
+        config, first_dummy=context["sanity_check"], simulators=context["simulators"], schedule=context["schedule"]
+    )
+    runner.run()
+    print_results(context["log_directory"])
+
+
+@app.command()
+def replay(
+    log_directory: pathlib.Path = typer.Argument(
+        help="The directory containing the logged episodes to replay (e.g. a run from all_logs)"
+    ),
+    unvisited_policy: UnvisitedPositionPolicy = typer.Option(
+        help="What to show when the agent flies somewhere the recorded drone didn't",
+        default=UnvisitedPositionPolicy.NEAREST,
+    ),
+):
+    """
+    Replay logged episodes without a simulator (for testing agents, validators and loggers).
+    """
+    scenario_mapper = MimicScenarioMapper(log_directory)
+    env_type = (
+        EnvironmentType.CITY if scenario_mapper.is_city else EnvironmentType.FOREST
+    )
+    difficulty_level = DIFFICULTY_LEVELS[scenario_mapper.difficulty]
+    environment = ReplayFlySearchEnv(
+        log_directory,
+        unvisited_policy=unvisited_policy,
+        recorded_environment=env_type,
+        give_class_image=difficulty_level.show_visual_sample,
+        capture_mode=context["capture_mode"],
+        render_cache=context["render_cache"],
+    )
+
+    validator_factories = [
+        AltitudeValidatorFactory(difficulty_level.max_uav_altitude),
+        OutOfBoundsFlightValidatorFactory(
+            fs2_behavior=difficulty_level == DifficultySettings.FS_2
+        ),
+    ]
+    if difficulty_level == DifficultySettings.FS_1:
+        validator_factories.append(RecklessFlyingValidatorFactory())
+
+    config = ExperimentConfig(
+        agent_factory=context["agent_factory"],
+        scenario_mapper=scenario_mapper,
+        environment=environment,
+        logger_factories=context["logger_factories"],
+        validator_factories=validator_factories,
+        forgiveness=difficulty_level.max_retries,
+        number_of_runs=context["number_of_runs"],
+        continue_from_idx=context["continue_from_idx"],
+        number_of_glimpses=difficulty_level.max_steps,
+        prompt_factory=PROMPT_FACTORIES[difficulty_level.prompt_type],
+    )
+
+    # There is no simulator to run concurrently on.
+    runner = ExperimentRunner(config, first_dummy=context["sanity_check"], schedule=context["schedule"])
+    runner.run()
+    print_results(context["log_directory"])
+
+
+@app.command()
+def baked(
+    bake_directory: pathlib.Path = typer.Argument(
+        help="The directory containing the scenarios baked by rl.environment.bake_scenarios"
+    ),
+):
+    """
+    Run baked scenarios without a simulator (glimpses are synthesized from pre-rendered tiles).
+    """
+    scenario_mapper = MimicScenarioMapper(bake_directory)
+    difficulty_level = DIFFICULTY_LEVELS[scenario_mapper.difficulty]
+    environment = BakedFlySearchEnv(
+        bake_directory,
+        give_class_image=difficulty_level.show_visual_sample,
+        capture_mode=context["capture_mode"],
+    )
+
+    validator_factories = [
+        AltitudeValidatorFactory(difficulty_level.max_uav_altitude),
+        OutOfBoundsFlightValidatorFactory(
+            fs2_behavior=difficulty_level == DifficultySettings.FS_2
+        ),
+    ]
+    if difficulty_level == DifficultySettings.FS_1:
+        validator_factories.append(RecklessFlyingValidatorFactory())
+
+    config = ExperimentConfig(
+        agent_factory=context["agent_factory"],
+        scenario_mapper=scenario_mapper,
+        environment=environment,
+        logger_factories=context["logger_factories"],
+        validator_factories=validator_factories,
+        forgiveness=difficulty_level.max_retries,
+        number_of_runs=context["number_of_runs"],
+        continue_from_idx=context["continue_from_idx"],
+        number_of_glimpses=difficulty_level.max_steps,
+        prompt_factory=PROMPT_FACTORIES[difficulty_level.prompt_type],
+    )
+
+    # There is no simulator to run concurrently on.
+    runner = ExperimentRunner(config, first_dummy=context["sanity_check"], schedule=context["schedule"])
     runner.run()
     print_results(context["log_directory"])
 
@@ -163,20 +347,29 @@ def random_scenarios(
     # TODO: make better abstraction for this on refactor.
     if difficulty == DifficultySettings.FS_2:
         kwargs["random_sun"] = True
+    if scenario_type in [Scenarios.CITY, Scenarios.CITY_ANOMALY]:
+        # Locations known to fail the environment's checks are then skipped.
+        kwargs["require_object_in_sight"] = difficulty_level.target_line_of_sight_assured
     scenario_mapper = SCENARIO_CLASSES[scenario_type](
         drone_alt_min=difficulty_level.starting_uav_altitude_range[0],
         drone_alt_max=difficulty_level.starting_uav_altitude_range[1],
         alpha=difficulty_level.starting_uav_position_offset,
         **kwargs,
     )
-    environment = ENVIRONMENTS[
-        EnvironmentType.CITY
-        if scenario_type in [Scenarios.CITY, Scenarios.CITY_ANOMALY]
-        else EnvironmentType.FOREST
-    ](
+    environment_factory = functools.partial(
+        ENVIRONMENTS[
+            EnvironmentType.CITY
+            if scenario_type in [Scenarios.CITY, Scenarios.CITY_ANOMALY]
+            else EnvironmentType.FOREST
+        ],
         give_class_image=difficulty_level.show_visual_sample,
         require_object_in_sight=difficulty_level.target_line_of_sight_assured,
+        standby_simulator=context["standby_simulator"],
+        capture_mode=context["capture_mode"],
+        transport=context["transport"],
+        render_cache=context["render_cache"],
     )
+    environment = environment_factory()
 
     validator_factories = [
         AltitudeValidatorFactory(difficulty_level.max_uav_altitude),
@@ -198,9 +391,12 @@ def random_scenarios(
         continue_from_idx=context["continue_from_idx"],
         number_of_glimpses=difficulty_level.max_steps,
         prompt_factory=PROMPT_FACTORIES[difficulty_level.prompt_type],
+        environment_factory=environment_factory,
     )
 
-    runner = ExperimentRunner(config, first_dummy=context["sanity_check"])
+    runner = ExperimentRunner(
+        config, first_dummy=context["sanity_check"], simulators=context["simulators"], schedule=context["schedule"]
+    )
     runner.run()
     print_results(context["log_directory"])
 
@@ -0,0 +1,30 @@
+from typing import Optional, Tuple
+
+from glimpse_generators.replay_glimpse_generator import Position, ReplayGlimpseGenerator
+from glimpse_generators.tile_pyramid import TilePyramid
+from glimpse_generators.unreal_glimpse_generator import CaptureMode
+from misc.cv2_and_numpy import Frame
+
+
+class BakedGlimpseGenerator(ReplayGlimpseGenerator):
+    """
+    Synthesizes glimpses for any position from a baked `TilePyramid`, so no simulator is needed.
+
+    There are no collisions: the drone always ends up where it was asked to fly.
+    """
+
+    def __init__(self, splits_w: int, splits_h: int, capture_mode: CaptureMode = CaptureMode.LEGACY,
+                 resolution: int = 500):
+        super().__init__(splits_w, splits_h, capture_mode=capture_mode, resolution=resolution)
+
+        self.pyramid: Optional[TilePyramid] = None
+
+    def load_pyramid(self, pyramid: TilePyramid, start_relative_position: Position) -> None:
+        self.pyramid = pyramid
+        self.relative_position = start_relative_position
+
+    def get_camera_frame(self, rel_position_m: Tuple[int, int, int] = (0, 0, 0), force_move=False) -> Frame:
+        self.relative_position = tuple(int(round(coordinate)) for coordinate in rel_position_m)
+        glimpse = self.pyramid.synthesize(*self.relative_position, size=self.glimpse_size)
+
+        return self._draw_grid(glimpse)
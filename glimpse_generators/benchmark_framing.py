@@ -0,0 +1,127 @@
+import multiprocessing
+import socket
+import struct
+import time
+from typing import Callable, List
+
+import typer
+
+from glimpse_generators.unrealcv_fix import Client, SocketMessage
+
+
+class LargeResponseServer:
+    """
+    Local UnrealCV-like server answering every request with a `response_size` bytes payload, like `lit` captures do.
+    It runs in its own process (so that it doesn't compete with the client for the GIL) and sends a prepared payload,
+    so it is (much) faster than the client being measured.
+    """
+
+    def __init__(self, response_size: int):
+        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server_socket.bind(("127.0.0.1", 0))
+        self.server_socket.listen(1)
+        self.endpoint = self.server_socket.getsockname()
+
+        self.process = multiprocessing.Process(target=self._serve, args=(self.server_socket, response_size),
+                                               daemon=True)
+        self.process.start()
+
+    @staticmethod
+    def _send(connection, *parts: bytes):
+        header = SocketMessage.header.pack(SocketMessage.magic, sum(len(part) for part in parts))
+        connection.sendall(header + parts[0])
+
+        for part in parts[1:]:
+            connection.sendall(part)
+
+    @staticmethod
+    def _serve(server_socket, response_size: int):
+        body = bytes(bytearray(range(256)) * (response_size // 256 + 1))[:response_size]
+
+        connection, _ = server_socket.accept()
+        LargeResponseServer._send(connection, b"connected to LargeResponseServer")
+
+        while True:
+            payload = SocketMessage.ReceivePayload(connection)
+            if payload is None:
+                break
+
+            message_id = bytes(payload).split(b":", 1)[0]
+            LargeResponseServer._send(connection, message_id + b":", body)
+
+        connection.close()
+
+    def close(self):
+        self.process.join(timeout=5)
+        self.server_socket.close()
+
+
+def legacy_receive_payload(sock):
+    """Receiving as done before the framing layer: small header reads and a payload grown by concatenation."""
+    raw_magic = b''
+    while len(raw_magic) < 4:
+        raw_magic += sock.recv(4)
+
+    payload_size = struct.unpack('I', sock.recv(4))[0]
+
+    payload = b''
+    remain_size = payload_size
+    while remain_size > 0:
+        data = sock.recv(remain_size)
+        payload += data
+        remain_size -= len(data)
+
+    return payload
+
+
+def measure(receive_payload: Callable, response_size: int, requests: int) -> float:
+    """Returns the throughput (in MB/s) of `requests` sequential requests with responses of `response_size` bytes."""
+    server = LargeResponseServer(response_size)
+    client = Client(server.endpoint)
+    original_receive_payload = SocketMessage.ReceivePayload
+
+    try:
+        SocketMessage.ReceivePayload = staticmethod(receive_payload)
+        assert client.connect()
+
+        # Warm-up
+        client.request("vget /camera/1/lit npy")
+
+        start = time.perf_counter()
+        for _ in range(requests):
+            client.request("vget /camera/1/lit npy")
+        elapsed = time.perf_counter() - start
+    finally:
+        client.disconnect()
+        server.close()
+        SocketMessage.ReceivePayload = original_receive_payload
+
+    return requests * response_size / elapsed / 1e6
+
+
+def main(
+    sizes_mb: List[float] = typer.Option(
+        default=[0.75, 3.0, 12.0],
+        help="Response sizes (in MB) to measure; 3 MB is a raw 1000x1000 RGB frame",
+    ),
+    requests: int = typer.Option(default=20, help="The number of requests per measurement"),
+):
+    """
+    Measure how fast the UnrealCV client receives large responses from a local fake server, with the current framing and
+    with the one used before.
+    """
+    current_receive_payload = SocketMessage.ReceivePayload
+
+    print(f"{'size (MB)':>10} {'current (MB/s)':>15} {'legacy (MB/s)':>15}")
+
+    for size_mb in sizes_mb:
+        response_size = int(size_mb * 1e6)
+        current = measure(current_receive_payload, response_size, requests)
+        legacy = measure(legacy_receive_payload, response_size, requests)
+
+        print(f"{size_mb:>10.2f} {current:>15.1f} {legacy:>15.1f}")
+
+
+if __name__ == "__main__":
+    typer.run(main)
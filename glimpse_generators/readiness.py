@@ -0,0 +1,208 @@
+import logging
+import socket
+from dataclasses import dataclass, field
+from time import monotonic, sleep
+from typing import Callable, Optional, Sequence, Union
+
+import numpy as np
+
+from glimpse_generators.rpc_tracer import RpcTracer
+
+logger = logging.getLogger(__name__)
+
+
+class ReadinessTimeoutException(Exception):
+    pass
+
+
+@dataclass
+class RequestDeadlines:
+    """
+    Deadlines (in seconds) of UnrealCV requests, by command class. A simulator that doesn't answer in time is
+    considered dead. A batch of pipelined requests gets the longest deadline of its commands.
+    """
+    capture_seconds: float = 30.0  # Rendering, e.g. `vget /camera/1/lit png`
+    set_seconds: float = 5.0  # `vset`, including camera moves
+    get_seconds: float = 5.0  # Every other `vget`
+    blueprint_seconds: float = 10.0  # `vbp` (Blueprint calls, e.g. starting PCG)
+    default_seconds: float = 5.0
+
+    # Last resort for the receive thread, which only waits on the socket when a response is due.
+    socket_timeout_seconds: float = 60.0
+
+    CAPTURE_MODES = ("lit", "depth", "normal", "object_mask")
+
+    def for_command(self, message: Union[str, bytes]) -> float:
+        if isinstance(message, bytes):
+            message = message.decode("utf-8", errors="replace")
+
+        words = message.split()
+        verb = words[0] if words else ""
+
+        if verb == "vget" and len(words) > 1 and words[1].startswith("/camera/") and \
+                words[1].rsplit("/", 1)[-1] in self.CAPTURE_MODES:
+            return self.capture_seconds
+
+        return {
+            "vset": self.set_seconds,
+            "vget": self.get_seconds,
+            "vbp": self.blueprint_seconds,
+        }.get(verb, self.default_seconds)
+
+    def for_batch(self, messages: Sequence[Union[str, bytes]]) -> float:
+        return max((self.for_command(message) for message in messages), default=self.default_seconds)
+
+
+@dataclass
+class ReadinessConfig:
+    """
+    Deadlines and polling schedule of the readiness probes. Probes are polled with exponential backoff, starting at
+    `initial_interval_seconds` and growing by `backoff_factor` up to `max_interval_seconds`.
+    """
+    initial_interval_seconds: float = 0.05
+    max_interval_seconds: float = 1.0
+    backoff_factor: float = 2.0
+
+    # Hard deadlines: if exceeded, the simulator is considered stuck and ReadinessTimeoutException is raised
+    # (except for the startup deadline, after which we try to connect anyway, as we used to after a fixed sleep).
+    startup_deadline_seconds: float = 120.0
+    partition_deadline_seconds: float = 120.0
+    pcg_deadline_seconds: float = 120.0
+
+    # Soft deadlines: if exceeded, only a warning is logged. They match the fixed sleeps used before, so that waiting
+    # never takes longer than it used to.
+    frame_stability_deadline_seconds: float = 5.0
+    niagara_warmup_deadline_seconds: float = 10.0
+
+    # The scene is considered settled after `stable_frames` consecutive frames with mean absolute difference (in 0-255
+    # intensity units) of at most `frame_tolerance`.
+    stable_frames: int = 2
+    frame_tolerance: float = 0.5
+
+    # Niagara effects (fire) are considered warmed up once the frame differs from the one captured before by more
+    # than `niagara_frame_tolerance`.
+    niagara_frame_tolerance: float = 2.0
+
+    request_deadlines: RequestDeadlines = field(default_factory=RequestDeadlines)
+
+    # Watchdog of simulators that are alive, but hung: once no response has arrived for `heartbeat_interval_seconds`
+    # (the connection is idle or a request is stuck), a heartbeat is sent, and if it isn't answered within
+    # `heartbeat_deadline_seconds`, the connection is aborted and the simulator restarted. None disables the watchdog.
+    heartbeat_interval_seconds: Optional[float] = 30.0
+    heartbeat_deadline_seconds: float = 10.0
+
+
+def wait_until(probe: Callable[[], bool], description: str, deadline_seconds: float,
+               config: Optional[ReadinessConfig] = None, raise_on_timeout: bool = True,
+               tracer: Optional[RpcTracer] = None) -> bool:
+    """
+    Polls `probe` with exponential backoff until it returns True or `deadline_seconds` pass.
+
+    Returns whether the probe succeeded. If it did not and `raise_on_timeout` is set, raises ReadinessTimeoutException.
+    The whole wait is recorded in `tracer` (if given) as `wait <description>`.
+    """
+    config = config or ReadinessConfig()
+
+    start = monotonic()
+    interval = config.initial_interval_seconds
+
+    while True:
+        if probe():
+            logger.debug(f"Readiness: {description} after {monotonic() - start:.2f}s")
+
+            if tracer is not None:
+                tracer.record(f"wait {description}", monotonic() - start)
+
+            return True
+
+        elapsed = monotonic() - start
+        if elapsed >= deadline_seconds:
+            break
+
+        logger.debug(f"Readiness: waiting for {description} ({elapsed:.2f}s elapsed)")
+        sleep(min(interval, deadline_seconds - elapsed))
+        interval = min(interval * config.backoff_factor, config.max_interval_seconds)
+
+    if tracer is not None:
+        tracer.record(f"wait {description}", monotonic() - start, outcome="failed")
+
+    if raise_on_timeout:
+        raise ReadinessTimeoutException(f"Timed out after {deadline_seconds}s waiting for {description}")
+
+    logger.warning(f"Readiness: gave up waiting for {description} after {deadline_seconds}s")
+    return False
+
+
+# Probes
+
+def port_is_open(host: str, port: int, timeout: float = 0.5) -> bool:
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def partition_loaded(client) -> bool:
+    return "false" not in str(client.request("vget /camera/1/partition_loaded")).lower()
+
+
+def pcg_ready(client, pcg_id: str) -> bool:
+    return "false" not in str(client.request(f"vbp {pcg_id} IsPCGReady")).lower()
+
+
+def frame_difference(first: np.ndarray, second: np.ndarray) -> float:
+    # Subsampled, as we are interested in the scene changing, not in single pixels.
+    first = first[::4, ::4].astype(np.int16)
+    second = second[::4, ::4].astype(np.int16)
+
+    if first.shape != second.shape:
+        return float("inf")
+
+    return float(np.abs(first - second).mean())
+
+
+class FrameStabilityProbe:
+    """Succeeds once `stable_frames` consecutive frames are (almost) identical, i.e. nothing is streaming in anymore."""
+
+    def __init__(self, capture_frame: Callable[[], np.ndarray], tolerance: float, stable_frames: int):
+        self.capture_frame = capture_frame
+        self.tolerance = tolerance
+        self.stable_frames = stable_frames
+
+        self.previous_frame: Optional[np.ndarray] = None
+        self.stable_count = 0
+
+    def __call__(self) -> bool:
+        frame = self.capture_frame()
+
+        if self.previous_frame is not None and frame_difference(self.previous_frame, frame) <= self.tolerance:
+            self.stable_count += 1
+        else:
+            self.stable_count = 0
+
+        self.previous_frame = frame
+
+        return self.stable_count >= self.stable_frames
+
+
+class FrameChangeProbe:
+    """
+    Succeeds once the frame differs from the first one captured. Used as a warm-up signal of Niagara effects (fire),
+    which start invisible and only then spread and animate.
+    """
+
+    def __init__(self, capture_frame: Callable[[], np.ndarray], tolerance: float):
+        self.capture_frame = capture_frame
+        self.tolerance = tolerance
+
+        self.reference_frame: Optional[np.ndarray] = None
+
+    def __call__(self) -> bool:
+        frame = self.capture_frame()
+
+        if self.reference_frame is None:
+            self.reference_frame = frame
+            return False
+
+        return frame_difference(self.reference_frame, frame) > self.tolerance
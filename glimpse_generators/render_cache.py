@@ -0,0 +1,150 @@
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import threading
+from typing import Dict, List, Optional, Tuple, Union
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+class RenderCache:
+    """
+    Content-addressed on-disk cache of rendered glimpses.
+
+    Entries are keyed by a hash of everything that determines a glimpse (see `make_key`): the scene, the camera pose
+    and the capture settings. Every entry holds the glimpse image and JSON metadata (e.g. where the camera ended up).
+    Metadata-only entries (`get_meta`/`put_meta`) are used for per-scene information, such as the object's bounding box.
+
+    The cache is bounded by `max_size_bytes`; least recently used entries are evicted first. It's thread-safe, so that
+    environments running concurrently can share it.
+    """
+
+    def __init__(self, directory: Union[str, pathlib.Path], max_size_bytes: int = 4 * 1024 ** 3):
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_size_bytes = max_size_bytes
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._size_bytes = sum(path.stat().st_size for path in self._entry_files())
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        serialized = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[Image.Image, Dict]]:
+        image_path, meta_path = self._image_path(key), self._meta_path(key)
+
+        try:
+            with Image.open(image_path) as stored_image:
+                image = stored_image.convert("RGB")
+            meta = json.loads(meta_path.read_text())
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        self._touch(image_path, meta_path)
+
+        return image, meta
+
+    def put(self, key: str, image: Image.Image, meta: Dict) -> None:
+        image_path = self._image_path(key)
+        image_path.parent.mkdir(exist_ok=True)
+
+        # Low compression level: we care about the time it takes to read the image back much more than about its size.
+        self._write_atomically(image_path, lambda path: image.save(path, format="PNG", compress_level=1))
+        self.put_meta(key, meta)
+
+    def get_meta(self, key: str) -> Optional[Dict]:
+        meta_path = self._meta_path(key)
+
+        try:
+            meta = json.loads(meta_path.read_text())
+        except (OSError, ValueError):
+            return None
+
+        self._touch(meta_path)
+
+        return meta
+
+    def put_meta(self, key: str, meta: Dict) -> None:
+        meta_path = self._meta_path(key)
+        meta_path.parent.mkdir(exist_ok=True)
+
+        self._write_atomically(meta_path, lambda path: path.write_text(json.dumps(meta)))
+
+    def clear(self) -> None:
+        with self._lock:
+            for path in self._entry_files():
+                path.unlink(missing_ok=True)
+
+            self._size_bytes = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size_bytes
+
+    def _image_path(self, key: str) -> pathlib.Path:
+        return self.directory / key[:2] / f"{key}.png"
+
+    def _meta_path(self, key: str) -> pathlib.Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _entry_files(self):
+        return [path for path in self.directory.glob("*/*") if path.suffix in (".png", ".json")]
+
+    @staticmethod
+    def _touch(*paths: pathlib.Path) -> None:
+        # Modification time is used as the last access time for LRU eviction.
+        for path in paths:
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+
+    def _write_atomically(self, path: pathlib.Path, write) -> None:
+        # Readers (possibly other processes sharing the cache) must never see half-written entries.
+        temporary_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        write(temporary_path)
+        size = temporary_path.stat().st_size
+
+        with self._lock:
+            previous_size = path.stat().st_size if path.exists() else 0
+            os.replace(temporary_path, path)
+            self._size_bytes += size - previous_size
+
+            if self._size_bytes > self.max_size_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        # Evict down to 90% of the budget, so that we don't have to scan the directory on every write.
+        target = int(self.max_size_bytes * 0.9)
+
+        # The image and the metadata of an entry are evicted together, once neither of them was used recently.
+        entries: Dict[str, List[Tuple[pathlib.Path, os.stat_result]]] = {}
+        for path in self._entry_files():
+            try:
+                entries.setdefault(path.stem, []).append((path, path.stat()))
+            except OSError:
+                # Evicted by another process sharing the cache
+                pass
+
+        for files in sorted(entries.values(), key=lambda files: max(stat.st_mtime for _, stat in files)):
+            if self._size_bytes <= target:
+                break
+
+            for path, stat in files:
+                path.unlink(missing_ok=True)
+                self._size_bytes -= stat.st_size
+
+        logger.info(f"Render cache evicted entries down to {self._size_bytes} bytes.")
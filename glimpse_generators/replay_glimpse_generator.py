@@ -0,0 +1,145 @@
+import pathlib
+from enum import Enum
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from glimpse_generators.render_cache import RenderCache
+from glimpse_generators.unreal_glimpse_generator import CaptureMode, UnrealGridGlimpseGenerator
+from misc.add_guardrails import draw_unreal_grid
+from misc.cv2_and_numpy import Frame
+
+Position = Tuple[int, int, int]
+
+
+class UnvisitedPositionPolicy(str, Enum):
+    """What to serve when the agent flies to a position that wasn't recorded (nor cached)."""
+    NEAREST = "nearest"  # The glimpse recorded at the closest visited position
+    BLANK = "blank"  # A black glimpse (with the grid drawn on it)
+    RAISE = "raise"  # UnvisitedPositionException
+
+
+class UnvisitedPositionException(Exception):
+    pass
+
+
+class ReplayGlimpseGenerator(UnrealGridGlimpseGenerator):
+    """
+    Serves glimpses recorded in logs instead of rendering them, so no simulator is needed.
+
+    Recorded glimpses already have the grid drawn on them. Positions that weren't recorded are looked up in the render
+    cache (if the scene is known, see `set_scene`) and otherwise handled according to `unvisited_policy`. The drone
+    always ends up where it was asked to fly, unless the render cache says otherwise.
+    """
+
+    def __init__(self, splits_w: int, splits_h: int,
+                 unvisited_policy: UnvisitedPositionPolicy = UnvisitedPositionPolicy.NEAREST,
+                 capture_mode: CaptureMode = CaptureMode.LEGACY, resolution: int = 500,
+                 render_cache: Optional[RenderCache] = None):
+        # Deliberately doesn't call super().__init__, as there is no simulator to talk to.
+        self.client = None
+        self.splits_w = splits_w
+        self.splits_h = splits_h
+        self.unvisited_policy = UnvisitedPositionPolicy(unvisited_policy)
+        self.capture_mode = CaptureMode(capture_mode)
+        self.resolution = resolution
+        self.glimpse_size = resolution if self.capture_mode == CaptureMode.NATIVE else 500
+
+        self.start_position = (0.0, 0.0, 0.0)
+        self.relative_position: Position = (0, 0, 0)
+
+        self.frame_paths: Dict[Position, pathlib.Path] = {}
+        # Decoded recorded glimpses (RGB), read-only as they are served to every episode replaying them.
+        self.frames: Dict[Position, np.ndarray] = {}
+
+        self.render_cache = render_cache
+        self.scene_key: Optional[str] = None
+        self.deferred_scene_setup = None
+        self.virtual_camera_location = None
+
+        self.recorded_glimpses = 0
+        self.cached_glimpses = 0
+        self.unvisited_glimpses = 0
+
+    def load_frames(self, frame_paths: Dict[Position, pathlib.Path], start_relative_position: Position) -> None:
+        """Replaces the recorded glimpses (indexed by relative position, as in `get_relative_from_start`)."""
+        self.frame_paths = dict(frame_paths)
+        self.frames = {}
+        self.relative_position = start_relative_position
+
+    def reset_camera(self):
+        self.relative_position = (0, 0, 100)
+
+    def disconnect(self):
+        pass
+
+    def get_unreal_camera_coordinates(self) -> Tuple[float, float, float]:
+        return tuple(start + relative * 100 for start, relative in zip(self.start_position, self.relative_position))
+
+    def get_relative_from_start(self):
+        return self.relative_position
+
+    def get_camera_frame(self, rel_position_m: Tuple[int, int, int] = (0, 0, 0), force_move=False) -> Frame:
+        position = tuple(int(round(coordinate)) for coordinate in rel_position_m)
+
+        if position in self.frame_paths:
+            self.recorded_glimpses += 1
+            self.relative_position = position
+            return Frame(self._load_frame(position))
+
+        image = self._get_cached_image(position, force_move)
+
+        if image is not None:
+            self.cached_glimpses += 1
+            return self._draw_grid(np.array(image))
+
+        self.unvisited_glimpses += 1
+
+        if self.unvisited_policy == UnvisitedPositionPolicy.RAISE:
+            raise UnvisitedPositionException(f"Position {position} wasn't visited in the recorded episode.")
+
+        self.relative_position = position
+
+        if self.unvisited_policy == UnvisitedPositionPolicy.BLANK or not self.frame_paths:
+            return self._draw_grid(np.zeros((self.glimpse_size, self.glimpse_size, 3), dtype=np.uint8))
+
+        return Frame(self._load_frame(self._nearest_visited(position)))
+
+    def _load_frame(self, position: Position) -> np.ndarray:
+        # Episodes are short, so decoded frames are kept for as long as the episode is replayed.
+        if position not in self.frames:
+            with Image.open(self.frame_paths[position]) as frame:
+                self.frames[position] = np.asarray(frame.convert("RGB"))
+
+        return self.frames[position]
+
+    def _nearest_visited(self, position: Position) -> Position:
+        visited = list(self.frame_paths)
+        distances = np.linalg.norm(np.array(visited) - np.array(position), axis=1)
+
+        return visited[int(np.argmin(distances))]
+
+    def _get_cached_image(self, position: Position, force_move: bool) -> Optional[Image.Image]:
+        location = tuple(start + relative * 100 for start, relative in zip(self.start_position, position))
+        cache_key = self._render_cache_key(location, force_move)
+
+        if cache_key is None:
+            return None
+
+        cached = self.render_cache.get(cache_key)
+
+        if cached is None:
+            return None
+
+        image, meta = cached
+        self.relative_position = tuple(
+            int((coordinate - start) / 100) for coordinate, start in zip(meta["camera_location"], self.start_position)
+        )
+
+        return image
+
+    def _draw_grid(self, rgb: np.ndarray) -> Frame:
+        draw_unreal_grid(rgb, self.splits_w, self.splits_h, drone_height=self.relative_position[2])
+
+        return Frame(rgb)
@@ -0,0 +1,131 @@
+import threading
+from bisect import bisect_left
+from collections import deque
+from time import time
+from typing import Dict, List, NamedTuple, Optional, Union
+
+# Upper bounds (in seconds) of the latency histogram buckets: 0.5 ms doubling up to ~65 s, plus an overflow bucket.
+BUCKET_BOUNDS = tuple(0.0005 * 2 ** i for i in range(18))
+BUCKET_LABELS = tuple(f"<={bound:g}s" for bound in BUCKET_BOUNDS) + (f">{BUCKET_BOUNDS[-1]:g}s",)
+
+
+class RpcRecord(NamedTuple):
+    timestamp: float  # Wall-clock time at which the request finished
+    command_class: str
+    latency_seconds: float
+    payload_bytes: int
+    outcome: str  # "ok", "error" (the simulator answered with an error) or "failed" (no answer, e.g. it died)
+
+
+def command_class(message: Union[str, bytes]) -> str:
+    """
+    Groups commands by what they do rather than by their arguments, e.g. `vget /camera/1/lit png` is `vget /camera/lit`,
+    `vset /object/<id>/location 1 2 3` is `vset /object/location` and `vbp <pcg id> RunPCG 3` is `vbp RunPCG`.
+    """
+    if isinstance(message, (bytes, bytearray)):
+        message = bytes(message).decode("utf-8", errors="replace")
+
+    words = message.split()
+
+    if not words:
+        return "empty"
+
+    verb = words[0]
+
+    if verb == "vbp":
+        return f"vbp {words[2]}" if len(words) > 2 else verb
+
+    if len(words) < 2:
+        return verb
+
+    segments = [segment for segment in words[1].split("/") if segment]
+
+    if len(segments) > 2:
+        segments = [segments[0], segments[-1]]
+
+    return f"{verb} /{'/'.join(segments)}"
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.bucket_counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.failures = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.payload_bytes = 0
+
+    def add(self, latency_seconds: float, payload_bytes: int, outcome: str) -> None:
+        self.bucket_counts[bisect_left(BUCKET_BOUNDS, latency_seconds)] += 1
+        self.count += 1
+        self.failures += outcome != "ok"
+        self.total_seconds += latency_seconds
+        self.max_seconds = max(self.max_seconds, latency_seconds)
+        self.payload_bytes += payload_bytes
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket the `q`-th percentile falls into (exact up to a factor of 2)."""
+        rank = q / 100 * self.count
+        seen = 0
+
+        for bound, bucket_count in zip(BUCKET_BOUNDS, self.bucket_counts):
+            seen += bucket_count
+            if bucket_count and seen >= rank:
+                return min(bound, self.max_seconds)
+
+        return self.max_seconds
+
+    def to_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "failures": self.failures,
+            "total_seconds": self.total_seconds,
+            "mean_seconds": self.total_seconds / self.count if self.count else 0.0,
+            "p50_seconds": self.percentile(50),
+            "p95_seconds": self.percentile(95),
+            "max_seconds": self.max_seconds,
+            "payload_bytes": self.payload_bytes,
+            "buckets": {label: bucket_count for label, bucket_count in zip(BUCKET_LABELS, self.bucket_counts)
+                        if bucket_count},
+        }
+
+
+class RpcTracer:
+    """
+    Low-overhead trace of simulator requests (and of readiness waits, whose class starts with `wait`). The last
+    `capacity` requests are kept in a ring buffer, for post-mortems; latencies are also aggregated in per-command-class
+    histograms, which are reset at the start of every episode and exported with its logs.
+    """
+
+    def __init__(self, capacity: int = 4096):
+        self.records = deque(maxlen=capacity)
+        self.histograms: Dict[str, LatencyHistogram] = {}
+
+        # Requests finish on the receive thread, heartbeats are sent by the watchdog.
+        self._lock = threading.Lock()
+
+    def record(self, command: str, latency_seconds: float, payload_bytes: int = 0, outcome: str = "ok") -> None:
+        with self._lock:
+            self.records.append(RpcRecord(time(), command, latency_seconds, payload_bytes, outcome))
+
+            histogram = self.histograms.get(command)
+            if histogram is None:
+                histogram = self.histograms[command] = LatencyHistogram()
+
+            histogram.add(latency_seconds, payload_bytes, outcome)
+
+    def recent(self, n: Optional[int] = None) -> List[RpcRecord]:
+        with self._lock:
+            records = list(self.records)
+
+        return records if n is None else records[-n:]
+
+    def reset_histograms(self) -> None:
+        with self._lock:
+            self.histograms = {}
+
+    def export_histograms(self) -> Dict[str, Dict]:
+        """Histograms by command class, the ones taking the most time in total first."""
+        with self._lock:
+            histograms = sorted(self.histograms.items(), key=lambda item: item[1].total_seconds, reverse=True)
+            return {command: histogram.to_dict() for command, histogram in histograms}
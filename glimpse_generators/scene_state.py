@@ -0,0 +1,116 @@
+from dataclasses import dataclass
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+Vector = Tuple[float, float, float]
+
+
+@dataclass
+class ObjectState:
+    # None means "unknown", i.e. we never pushed this property to the simulator (or we forgot about it).
+    location: Optional[Vector] = None
+    rotation: Optional[Vector] = None
+    visible: Optional[bool] = None
+    # Raw `vget /object/<id>/bounds` response; invalidated whenever the object is moved or rotated.
+    bounds: Optional[str] = None
+
+
+def _as_vector(values: Iterable[float]) -> Vector:
+    return tuple(float(value) for value in values)  # type: ignore
+
+
+class SceneState:
+    """
+    Client-side model of the last state pushed to the simulator: object locations, rotations and visibility (this
+    includes the sun), PCG parameters and the camera location. Object bounds read back from the simulator are cached
+    here as well.
+
+    It is used to compute the commands that actually differ from the requested scene. Unknown properties always produce
+    commands, so the model can only make us skip redundant commands, never miss required ones. It has to be cleared
+    whenever the simulator is (re)started.
+    """
+
+    def __init__(self):
+        self.objects: Dict[str, ObjectState] = {}
+        self.pcg_params: Dict[str, Tuple[Hashable, ...]] = {}
+        self.camera_location: Optional[Vector] = None
+
+    def clear(self) -> None:
+        self.objects = {}
+        self.pcg_params = {}
+        self.camera_location = None
+
+    # Objects
+
+    def object_commands(self, object_id: str, location: Optional[Iterable[float]] = None,
+                        rotation: Optional[Iterable[float]] = None, visible: Optional[bool] = None) -> List[str]:
+        """
+        Returns UnrealCV commands needed to bring the object to the requested state. Properties passed as None are
+        left untouched. Commands are ordered as location, rotation, visibility.
+        """
+        current = self.objects.get(object_id, ObjectState())
+        commands = []
+
+        if location is not None:
+            location = _as_vector(location)
+            if current.location != location:
+                commands.append(f"vset /object/{object_id}/location {location[0]} {location[1]} {location[2]}")
+
+        if rotation is not None:
+            rotation = _as_vector(rotation)
+            if current.rotation != rotation:
+                commands.append(f"vset /object/{object_id}/rotation {rotation[0]} {rotation[1]} {rotation[2]}")
+
+        if visible is not None and current.visible != visible:
+            commands.append(f"vset /object/{object_id}/{'show' if visible else 'hide'}")
+
+        return commands
+
+    def update_object(self, object_id: str, location: Optional[Iterable[float]] = None,
+                      rotation: Optional[Iterable[float]] = None, visible: Optional[bool] = None) -> None:
+        """Records that the object was brought to the given state. Properties passed as None are left untouched."""
+        current = self.objects.setdefault(object_id, ObjectState())
+
+        if location is not None:
+            location = _as_vector(location)
+            if current.location != location:
+                current.bounds = None
+            current.location = location
+
+        if rotation is not None:
+            rotation = _as_vector(rotation)
+            if current.rotation != rotation:
+                current.bounds = None
+            current.rotation = rotation
+
+        if visible is not None:
+            current.visible = visible
+
+    def forget_object(self, object_id: str) -> None:
+        self.objects.pop(object_id, None)
+
+    def object_bounds(self, object_id: str) -> Optional[str]:
+        current = self.objects.get(object_id)
+        return current.bounds if current is not None else None
+
+    def update_object_bounds(self, object_id: str, bounds: str) -> None:
+        self.objects.setdefault(object_id, ObjectState()).bounds = bounds
+
+    # PCG
+
+    def pcg_changed(self, pcg_id: str, params: Tuple[Hashable, ...]) -> bool:
+        return self.pcg_params.get(pcg_id) != tuple(params)
+
+    def update_pcg(self, pcg_id: str, params: Tuple[Hashable, ...]) -> None:
+        self.pcg_params[pcg_id] = tuple(params)
+
+    def forget_pcg(self, pcg_id: str) -> None:
+        self.pcg_params.pop(pcg_id, None)
+
+    # Camera
+
+    def camera_location_changed(self, location: Iterable[float]) -> bool:
+        return self.camera_location != _as_vector(location)
+
+    def update_camera_location(self, location: Optional[Iterable[float]]) -> None:
+        """Records the camera location. Pass None if it is no longer known (e.g. after `moveto` with collisions)."""
+        self.camera_location = _as_vector(location) if location is not None else None
@@ -0,0 +1,178 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, TypeVar
+
+from glimpse_generators.unreal_client_wrapper import UnrealClientWrapper, UnrealDiedException
+
+logger = logging.getLogger(__name__)
+
+Item = TypeVar("Item")
+Result = TypeVar("Result")
+
+
+class PooledSimulator:
+    def __init__(self, index: int, client: UnrealClientWrapper):
+        self.index = index
+        self.client = client
+        self.leased = False
+        self.lease_count = 0
+        # Number of UnrealDiedExceptions that escaped a lease of this simulator.
+        self.failures = 0
+
+    @property
+    def is_alive(self) -> bool:
+        # Hung simulators (see UnrealWatchdog) are as good as dead.
+        return self.client.is_responsive
+
+    def restart(self) -> None:
+        self.client.restart()
+
+    def health(self) -> Dict:
+        return {
+            "index": self.index,
+            "port": self.client.guardian.unrealcv_port,
+            "alive": self.is_alive,
+            "leased": self.leased,
+            "leases": self.lease_count,
+            "failures": self.failures,
+            "restarts": self.client.guardian.restart_count,
+        }
+
+
+class SimulatorPool:
+    """
+    Runs `size` simulator instances, each supervised by its own guardian and listening on its own UnrealCV port, and
+    leases their clients to episodes. Instances that died are restarted before being leased again.
+
+    `client_factory` creates a connected client together with its simulator, e.g. `BaseFlySearchEnv.get_client`.
+    """
+
+    def __init__(self, client_factory: Callable[[], UnrealClientWrapper], size: int):
+        if size < 1:
+            raise ValueError("Simulator pool must have at least one simulator")
+
+        self.client_factory = client_factory
+        self.size = size
+        self.simulators: List[PooledSimulator] = []
+        self._available = threading.Condition()
+
+    def start(self) -> None:
+        """Starts the missing simulators concurrently. If any of them fails to start, the others are disconnected."""
+        indices = range(len(self.simulators), self.size)
+
+        def start_simulator(index: int) -> UnrealClientWrapper:
+            logger.info(f"Simulator pool is starting simulator {index + 1}/{self.size}.")
+            return self.client_factory()
+
+        with ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="SimulatorPoolStart") as executor:
+            launches = [executor.submit(start_simulator, index) for index in indices]
+
+        failed = [launch for launch in launches if launch.exception() is not None]
+
+        if failed:
+            for launch in launches:
+                if launch.exception() is None:
+                    launch.result().disconnect()
+
+            raise failed[0].exception()
+
+        self.simulators.extend(PooledSimulator(index, launch.result()) for index, launch in zip(indices, launches))
+
+    def close(self) -> None:
+        for simulator in self.simulators:
+            simulator.client.disconnect()
+
+        self.simulators = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *_, **__):
+        self.close()
+        return False
+
+    @contextmanager
+    def lease(self) -> Iterator[UnrealClientWrapper]:
+        """Blocks until a simulator is free and leases its client for the duration of the `with` block."""
+        simulator = self._acquire()
+
+        try:
+            if not simulator.is_alive:
+                logger.warning(f"Simulator {simulator.index} is dead, restarting it before leasing.")
+                simulator.restart()
+
+            yield simulator.client
+        except UnrealDiedException:
+            simulator.failures += 1
+            raise
+        finally:
+            self._release(simulator)
+
+    def map(self, function: Callable[[UnrealClientWrapper, Item], Result], items: Iterable[Item],
+            retries: int = 1) -> List[Result]:
+        """
+        Calls `function(client, item)` for every item, concurrently on all simulators of the pool (one item per
+        simulator at a time), and returns the results in the order of `items`. Items failing with UnrealDiedException
+        are retried up to `retries` times, on whichever simulator is free next (dead ones are restarted first).
+        """
+
+        def run(item: Item) -> Result:
+            for attempt in range(retries + 1):
+                try:
+                    with self.lease() as client:
+                        return function(client, item)
+                except UnrealDiedException:
+                    if attempt == retries:
+                        raise
+
+                    logger.warning(f"Simulator died while processing {item}, retrying ({attempt + 1}/{retries}).")
+
+        with ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="SimulatorPool") as executor:
+            return list(executor.map(run, items))
+
+    def restart_dead(self) -> int:
+        """Restarts free simulators that died. Returns how many of them were restarted."""
+        restarted = 0
+
+        for simulator in self.simulators:
+            with self._available:
+                if simulator.leased or simulator.is_alive:
+                    continue
+
+                # Nobody can lease it while it restarts.
+                simulator.leased = True
+
+            try:
+                logger.warning(f"Simulator {simulator.index} is dead, restarting it.")
+                simulator.restart()
+                restarted += 1
+            finally:
+                self._release(simulator)
+
+        return restarted
+
+    def health(self) -> List[Dict]:
+        with self._available:
+            return [simulator.health() for simulator in self.simulators]
+
+    def _acquire(self) -> PooledSimulator:
+        if not self.simulators:
+            raise RuntimeError("Simulator pool must be started before leasing simulators")
+
+        with self._available:
+            while True:
+                for simulator in self.simulators:
+                    if not simulator.leased:
+                        simulator.leased = True
+                        simulator.lease_count += 1
+                        return simulator
+
+                self._available.wait()
+
+    def _release(self, simulator: PooledSimulator) -> None:
+        with self._available:
+            simulator.leased = False
+            self._available.notify()
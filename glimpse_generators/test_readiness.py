@@ -0,0 +1,79 @@
+import socket
+
+import numpy as np
+import pytest
+
+from glimpse_generators.readiness import (
+    FrameChangeProbe,
+    FrameStabilityProbe,
+    ReadinessConfig,
+    ReadinessTimeoutException,
+    RequestDeadlines,
+    port_is_open,
+    wait_until,
+)
+
+FAST_CONFIG = ReadinessConfig(initial_interval_seconds=0.001, max_interval_seconds=0.01)
+
+
+def frames(*values):
+    return iter([np.full((8, 8, 3), value, dtype=np.uint8) for value in values])
+
+
+class TestWaitUntil:
+    def test_returns_as_soon_as_probe_succeeds(self):
+        answers = iter([False, False, True, False])
+
+        assert wait_until(lambda: next(answers), "probe", 1.0, FAST_CONFIG)
+        assert next(answers) is False
+
+    def test_raises_after_deadline(self):
+        with pytest.raises(ReadinessTimeoutException):
+            wait_until(lambda: False, "probe", 0.05, FAST_CONFIG)
+
+    def test_soft_deadline_returns_false(self):
+        assert not wait_until(lambda: False, "probe", 0.05, FAST_CONFIG, raise_on_timeout=False)
+
+
+class TestProbes:
+    def test_port_is_open(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(("127.0.0.1", 0))
+        server.listen(1)
+        port = server.getsockname()[1]
+
+        assert port_is_open("127.0.0.1", port)
+
+        server.close()
+        assert not port_is_open("127.0.0.1", port)
+
+    def test_frame_stability_requires_consecutive_stable_frames(self):
+        captured = frames(0, 50, 50, 100, 100, 100)
+        probe = FrameStabilityProbe(lambda: next(captured), tolerance=0.5, stable_frames=2)
+
+        assert [probe() for _ in range(6)] == [False, False, False, False, False, True]
+
+    def test_frame_change_compares_with_first_frame(self):
+        captured = frames(0, 1, 0, 30)
+        probe = FrameChangeProbe(lambda: next(captured), tolerance=2.0)
+
+        assert [probe() for _ in range(4)] == [False, False, False, True]
+
+
+class TestRequestDeadlines:
+    def test_deadlines_by_command_class(self):
+        deadlines = RequestDeadlines(capture_seconds=30, set_seconds=1, get_seconds=2, blueprint_seconds=3,
+                                     default_seconds=4)
+
+        assert deadlines.for_command("vget /camera/1/lit png") == 30
+        assert deadlines.for_command(b"vget /camera/1/lit npy") == 30
+        assert deadlines.for_command("vget /camera/1/cansee obj") == 2
+        assert deadlines.for_command("vset /camera/1/moveto 0 0 0") == 1
+        assert deadlines.for_command("vbp forest RunPCG 1") == 3
+        assert deadlines.for_command("vrun something") == 4
+
+    def test_batch_gets_longest_deadline(self):
+        deadlines = RequestDeadlines(capture_seconds=30, set_seconds=1)
+
+        assert deadlines.for_batch(["vset /object/a/show", "vget /camera/1/lit png"]) == 30
+        assert deadlines.for_batch(["vset /object/a/show", "vset /object/b/show"]) == 1
@@ -0,0 +1,105 @@
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from glimpse_generators.render_cache import RenderCache
+from glimpse_generators.test_unreal_glimpse_generator import UnrealClientMock
+from glimpse_generators.unreal_glimpse_generator import UnrealGlimpseGenerator
+
+
+def random_frame(seed: int = 0, size: int = 500) -> np.ndarray:
+    return np.random.default_rng(seed).integers(0, 256, (size, size, 3), dtype=np.uint8)
+
+
+def random_image(seed: int) -> Image.Image:
+    return Image.fromarray(random_frame(seed, size=64))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return RenderCache(tmp_path / "cache")
+
+
+class TestRenderCache:
+    def test_put_and_get(self, cache):
+        image = random_image(0)
+        cache.put("abc", image, {"camera_location": [1, 2, 3]})
+
+        cached_image, meta = cache.get("abc")
+
+        assert np.array_equal(np.asarray(cached_image), np.asarray(image))
+        assert meta == {"camera_location": [1, 2, 3]}
+        assert cache.hits == 1
+
+    def test_miss(self, cache):
+        assert cache.get("missing") is None
+        assert cache.get_meta("missing") is None
+        assert cache.misses == 1
+
+    def test_keys_are_stable(self):
+        assert RenderCache.make_key("scene", {"a": 1, "b": (2, 3)}) == RenderCache.make_key("scene", {"b": [2, 3], "a": 1})
+        assert RenderCache.make_key("scene", (0, 0, 10)) != RenderCache.make_key("scene", (0, 0, 11))
+
+    def test_size_survives_reopening(self, cache):
+        cache.put("abc", random_image(0), {})
+
+        assert RenderCache(cache.directory).size_bytes == cache.size_bytes > 0
+
+    def test_least_recently_used_entries_are_evicted(self, tmp_path):
+        cache = RenderCache(tmp_path / "cache")
+        cache.put("aa", random_image(0), {})
+        cache.max_size_bytes = int(cache.size_bytes * 2.5)
+
+        cache.put("bb", random_image(1), {})
+        cache.get("aa")
+        cache.put("cc", random_image(2), {})
+
+        assert cache.size_bytes <= cache.max_size_bytes
+        assert cache.get("aa") is not None
+        assert cache.get("bb") is None
+
+    def test_entries_are_evicted_whole(self, tmp_path):
+        cache = RenderCache(tmp_path / "cache")
+        cache.put("aa", random_image(0), {})
+        cache.max_size_bytes = int(cache.size_bytes * 2.5)
+        cache.put("bb", random_image(1), {})
+
+        # The image of "aa" is the oldest file, but its metadata was used most recently, so "bb" is the oldest entry.
+        for mtime, path in enumerate([cache._image_path("aa"), cache._image_path("bb"), cache._meta_path("bb"),
+                                      cache._meta_path("aa")], start=1):
+            os.utime(path, (mtime, mtime))
+
+        cache.put("cc", random_image(2), {})
+
+        assert all(cache._image_path(key).exists() == cache._meta_path(key).exists() for key in ("aa", "bb", "cc"))
+        assert cache.get("aa") is not None
+        assert cache.get("bb") is None
+        assert cache.size_bytes == sum(path.stat().st_size for path in cache._entry_files())
+
+
+class TestGlimpseGeneratorCache:
+    def test_cached_glimpse_skips_simulator(self, cache):
+        client = UnrealClientMock(random_frame())
+        generator = UnrealGlimpseGenerator(client, render_cache=cache)
+        generator.set_scene("scene")
+
+        rendered = generator.get_camera_image((0, 0, 10), force_move=True)
+        requests = len(client.requests)
+        cached = generator.get_camera_image((0, 0, 10), force_move=True)
+
+        assert len(client.requests) == requests
+        assert np.array_equal(np.asarray(cached), np.asarray(rendered))
+
+    def test_deferred_setup_runs_on_first_miss(self, cache):
+        generator = UnrealGlimpseGenerator(UnrealClientMock(random_frame()), render_cache=cache)
+        setups = []
+
+        generator.set_scene("scene", deferred_setup=lambda: setups.append(generator.scene_key))
+        generator.set_virtual_camera_location((0, 0, 1000))
+        generator.get_camera_image((0, 0, 10), force_move=True)
+
+        # The setup itself doesn't see the cache.
+        assert setups == [None]
+        assert generator.deferred_scene_setup is None
@@ -0,0 +1,96 @@
+import pytest
+
+from glimpse_generators.readiness import ReadinessConfig, ReadinessTimeoutException, wait_until
+from glimpse_generators.rpc_tracer import LatencyHistogram, RpcTracer, command_class
+from glimpse_generators.test_unrealcv_fix import FakeUnrealCVServer
+from glimpse_generators.unreal_client_wrapper import UnrealCVWrapper, UnrealException
+
+
+class TestCommandClass:
+    @pytest.mark.parametrize("message, expected", [
+        ("vget /camera/1/lit png", "vget /camera/lit"),
+        (b"vget /camera/1/partition_loaded", "vget /camera/partition_loaded"),
+        ("vset /object/BP_Car_C_UAID_123/location 1 2 3", "vset /object/location"),
+        ("vbp PCGSpawner RunPCG 3", "vbp RunPCG"),
+        ("vget /unrealcv/status", "vget /unrealcv/status"),
+        ("", "empty"),
+    ])
+    def test_arguments_are_dropped(self, message, expected):
+        assert command_class(message) == expected
+
+
+class TestRpcTracer:
+    def test_histogram_percentiles_are_bucket_bounds(self):
+        histogram = LatencyHistogram()
+
+        for _ in range(90):
+            histogram.add(0.003, 10, "ok")
+        for _ in range(10):
+            histogram.add(1.5, 10, "failed")
+
+        exported = histogram.to_dict()
+
+        assert exported["count"] == 100
+        assert exported["failures"] == 10
+        assert exported["p50_seconds"] == 0.004
+        assert exported["p95_seconds"] == 1.5
+        assert exported["buckets"] == {"<=0.004s": 90, "<=2.048s": 10}
+
+    def test_ring_buffer_keeps_the_last_records(self):
+        tracer = RpcTracer(capacity=3)
+
+        for i in range(5):
+            tracer.record("vget /camera/lit", i)
+
+        assert [record.latency_seconds for record in tracer.recent()] == [2, 3, 4]
+        assert tracer.export_histograms()["vget /camera/lit"]["count"] == 5
+
+    def test_histograms_are_ordered_by_total_time(self):
+        tracer = RpcTracer()
+        tracer.record("vset /camera/location", 0.01)
+        tracer.record("wait PCG spawner", 2.0)
+
+        assert list(tracer.export_histograms()) == ["wait PCG spawner", "vset /camera/location"]
+
+        tracer.reset_histograms()
+        assert tracer.export_histograms() == {}
+        assert len(tracer.recent()) == 2
+
+    def test_waits_are_traced(self):
+        tracer = RpcTracer()
+        config = ReadinessConfig(initial_interval_seconds=0.01)
+
+        wait_until(lambda: True, "partition", 1.0, config, tracer=tracer)
+        with pytest.raises(ReadinessTimeoutException):
+            wait_until(lambda: False, "partition", 0.05, config, tracer=tracer)
+
+        assert [record.outcome for record in tracer.recent()] == ["ok", "failed"]
+        assert tracer.recent()[1].latency_seconds >= 0.05
+
+
+class TestTracedClient:
+    def test_requests_are_traced_with_their_outcome(self):
+        server = FakeUnrealCVServer()
+        tracer = RpcTracer()
+        client = UnrealCVWrapper(("127.0.0.1", server.port), tracer=tracer)
+        assert client.connect()
+
+        try:
+            client.request_many(["vget /camera/1/lit png", "vset /camera/1/location 0 0 0"])
+            with pytest.raises(UnrealException):
+                client.request("vget /error")
+
+            # Requests are recorded by the receive thread right after their response is delivered.
+            wait_until(lambda: len(tracer.recent()) == 3, "all requests traced", 1.0)
+        finally:
+            client.disconnect()
+            server.close()
+
+        records = tracer.recent()
+
+        assert [(record.command_class, record.outcome) for record in records] == [
+            ("vget /camera/lit", "ok"),
+            ("vset /camera/location", "ok"),
+            ("vget /error", "error"),
+        ]
+        assert records[0].payload_bytes == len("echo vget /camera/1/lit png")
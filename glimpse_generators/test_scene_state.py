@@ -0,0 +1,77 @@
+from glimpse_generators.scene_state import SceneState
+
+
+class TestSceneState:
+    def test_unknown_object_produces_all_requested_commands(self):
+        state = SceneState()
+
+        assert state.object_commands("car", location=(1, 2, 3), rotation=(0, 90, 0), visible=True) == [
+            "vset /object/car/location 1.0 2.0 3.0",
+            "vset /object/car/rotation 0.0 90.0 0.0",
+            "vset /object/car/show",
+        ]
+
+    def test_known_state_produces_only_differing_commands(self):
+        state = SceneState()
+        state.update_object("car", location=(1, 2, 3), visible=True)
+
+        assert state.object_commands("car", location=(1.0, 2.0, 3.0), visible=True) == []
+        assert state.object_commands("car", location=(1, 2, 4), visible=True) == [
+            "vset /object/car/location 1.0 2.0 4.0"
+        ]
+        assert state.object_commands("car", visible=False) == ["vset /object/car/hide"]
+
+    def test_properties_not_pushed_stay_unknown(self):
+        state = SceneState()
+        state.update_object("car", location=(1, 2, 3))
+
+        assert state.object_commands("car", rotation=(0, 0, 0)) == ["vset /object/car/rotation 0.0 0.0 0.0"]
+
+    def test_forgotten_and_cleared_state_is_unknown(self):
+        state = SceneState()
+        state.update_object("car", location=(1, 2, 3))
+        state.update_object("tree", location=(1, 2, 3))
+        state.update_pcg("pcg", (1, 2))
+        state.update_camera_location((0, 0, 100))
+
+        state.forget_object("car")
+        assert state.object_commands("car", location=(1, 2, 3)) != []
+        assert state.object_commands("tree", location=(1, 2, 3)) == []
+
+        state.clear()
+        assert state.object_commands("tree", location=(1, 2, 3)) != []
+        assert state.pcg_changed("pcg", (1, 2))
+        assert state.camera_location_changed((0, 0, 100))
+
+    def test_pcg_params(self):
+        state = SceneState()
+
+        assert state.pcg_changed("pcg", (0.5, 0.1, 42))
+
+        state.update_pcg("pcg", (0.5, 0.1, 42))
+        assert not state.pcg_changed("pcg", (0.5, 0.1, 42))
+        assert state.pcg_changed("pcg", (0.5, 0.1, 43))
+
+    def test_camera_location(self):
+        state = SceneState()
+        state.update_camera_location((0, 0, 100))
+
+        assert not state.camera_location_changed((0.0, 0.0, 100.0))
+
+        state.update_camera_location(None)
+        assert state.camera_location_changed((0, 0, 100))
+
+    def test_bounds_are_dropped_when_object_moves(self):
+        state = SceneState()
+        state.update_object("car", location=(1, 2, 3), rotation=(0, 0, 0))
+        state.update_object_bounds("car", "0 0 0 1 1 1")
+
+        state.update_object("car", location=(1, 2, 3), visible=True)
+        assert state.object_bounds("car") == "0 0 0 1 1 1"
+
+        state.update_object("car", rotation=(0, 90, 0))
+        assert state.object_bounds("car") is None
+
+        state.update_object_bounds("car", "0 0 0 1 1 1")
+        state.update_object("car", location=(1, 2, 4))
+        assert state.object_bounds("car") is None
@@ -0,0 +1,153 @@
+import threading
+import time
+
+import pytest
+
+from glimpse_generators.simulator_pool import SimulatorPool
+from glimpse_generators.unreal_client_wrapper import UnrealDiedException
+
+
+class GuardianMock:
+    def __init__(self):
+        self.is_alive = True
+        self.unrealcv_port = None
+        self.restart_count = 0
+
+
+class ClientMock:
+    def __init__(self):
+        self.guardian = GuardianMock()
+        self.disconnected = False
+
+    @property
+    def is_responsive(self):
+        return self.guardian.is_alive
+
+    def restart(self):
+        self.guardian.restart_count += 1
+        self.guardian.is_alive = True
+
+    def disconnect(self):
+        self.disconnected = True
+
+
+@pytest.fixture
+def pool():
+    with SimulatorPool(ClientMock, 2) as pool:
+        yield pool
+
+
+class TestSimulatorPool:
+    def test_leases_distinct_clients(self, pool):
+        with pool.lease() as first, pool.lease() as second:
+            assert first is not second
+
+    def test_lease_blocks_until_client_is_released(self, pool):
+        leased = []
+
+        with pool.lease() as first, pool.lease():
+            thread = threading.Thread(target=lambda: leased.append(pool.lease().__enter__()))
+            thread.start()
+            thread.join(timeout=0.1)
+            assert not leased
+
+        thread.join(timeout=5)
+        assert len(leased) == 1
+
+    def test_dead_simulator_is_restarted_before_lease(self, pool):
+        for simulator in pool.simulators:
+            simulator.client.guardian.is_alive = False
+
+        with pool.lease() as client:
+            assert client.guardian.is_alive
+            assert client.guardian.restart_count == 1
+
+    def test_restart_dead_skips_alive_simulators(self, pool):
+        pool.simulators[1].client.guardian.is_alive = False
+
+        assert pool.restart_dead() == 1
+        assert [health["restarts"] for health in pool.health()] == [0, 1]
+
+    def test_failures_are_recorded(self, pool):
+        with pytest.raises(UnrealDiedException):
+            with pool.lease():
+                raise UnrealDiedException()
+
+        assert sum(health["failures"] for health in pool.health()) == 1
+        assert not any(health["leased"] for health in pool.health())
+
+    def test_close_disconnects_clients(self):
+        pool = SimulatorPool(ClientMock, 2)
+        pool.start()
+        clients = [simulator.client for simulator in pool.simulators]
+
+        pool.close()
+
+        assert all(client.disconnected for client in clients)
+
+    def test_map_runs_items_concurrently_in_order(self, pool):
+        both_leased = threading.Barrier(2, timeout=5)
+
+        def work(client, item):
+            # Would time out if items weren't processed on both simulators at once.
+            if item < 2:
+                both_leased.wait()
+            return item * 10, client
+
+        results = pool.map(work, range(6))
+
+        assert [result for result, _ in results] == [0, 10, 20, 30, 40, 50]
+        assert len({id(client) for _, client in results}) == 2
+
+    def test_map_retries_when_simulator_dies(self, pool):
+        attempts = []
+
+        def work(client, item):
+            attempts.append(item)
+            if len(attempts) == 1:
+                client.guardian.is_alive = False
+                raise UnrealDiedException()
+            return item
+
+        assert pool.map(work, ["scenario"]) == ["scenario"]
+        assert attempts == ["scenario", "scenario"]
+        assert sum(health["failures"] for health in pool.health()) == 1
+
+    def test_map_gives_up_after_retries(self, pool):
+        def work(client, item):
+            raise UnrealDiedException()
+
+        with pytest.raises(UnrealDiedException):
+            pool.map(work, [1], retries=2)
+
+    def test_simulators_start_concurrently(self):
+        def slow_client_factory():
+            time.sleep(0.5)
+            return ClientMock()
+
+        start = time.monotonic()
+
+        with SimulatorPool(slow_client_factory, 4) as pool:
+            assert time.monotonic() - start < 1.5
+            assert [simulator.index for simulator in pool.simulators] == [0, 1, 2, 3]
+
+    def test_started_simulators_are_disconnected_if_one_fails(self):
+        clients = []
+        lock = threading.Lock()
+
+        def client_factory():
+            with lock:
+                if len(clients) == 1:
+                    clients.append(None)
+                    raise UnrealDiedException()
+
+                clients.append(ClientMock())
+                return clients[-1]
+
+        pool = SimulatorPool(client_factory, 3)
+
+        with pytest.raises(UnrealDiedException):
+            pool.start()
+
+        assert pool.simulators == []
+        assert all(client.disconnected for client in clients if client is not None)
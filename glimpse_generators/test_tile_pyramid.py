@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from glimpse_generators.tile_pyramid import TilePyramid, bake_pyramid
+
+GLIMPSE_SIZE = 64
+
+
+def world_color(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    # 4 m checkerboard, with the axes encoded in the other channels.
+    checker = ((np.floor(x / 4) + np.floor(y / 4)) % 2) * 255
+    return np.stack([checker, np.clip(x + 128, 0, 255), np.clip(y + 128, 0, 255)], axis=-1).astype(np.uint8)
+
+
+def render(position, size=GLIMPSE_SIZE) -> Image.Image:
+    """Top-down orthographic glimpse with a 90° FOV: columns follow x, rows follow y."""
+    x, y, z = position
+    offsets = (np.arange(size) + 0.5) * (2 * z / size) - z
+    xs, ys = np.meshgrid(x + offsets, y + offsets)
+    return Image.fromarray(world_color(xs, ys))
+
+
+@pytest.fixture
+def pyramid(tmp_path):
+    return bake_pyramid(render, tmp_path / "pyramid", GLIMPSE_SIZE, extent=80, altitudes=(5, 10, 20),
+                        scene_meta={"object_bbox": "0 0 0 0 0 0"})
+
+
+class TestTilePyramid:
+    def test_levels_cover_extent(self, pyramid):
+        assert [level.tiles_per_side for level in pyramid.levels] == [8, 4, 2]
+        assert all(level.extent() >= 80 for level in pyramid.levels)
+        assert pyramid.meta == {"object_bbox": "0 0 0 0 0 0"}
+
+    def test_finest_sufficient_level_is_chosen(self, pyramid):
+        assert pyramid.choose_level(5) == 0
+        assert pyramid.choose_level(15) == 1
+        assert pyramid.choose_level(2) == 0
+        assert pyramid.choose_level(100) == 2
+
+    @pytest.mark.parametrize("position", [(0, 0, 10), (3, -7, 12), (-11, 5, 6)])
+    def test_synthesized_glimpse_matches_rendered(self, pyramid, position):
+        synthesized = pyramid.synthesize(*position).astype(np.int16)
+        rendered = np.asarray(render(position)).astype(np.int16)
+
+        # Resampling moves the checkerboard's edges by at most a pixel.
+        assert np.mean(np.abs(synthesized - rendered) > 2) < 0.1
+
+    def test_outside_of_extent_is_black(self, pyramid):
+        glimpse = pyramid.synthesize(100, 0, 10)
+
+        assert not glimpse.any()
+
+    def test_reopened_pyramid_is_memory_mapped(self, pyramid):
+        reopened = TilePyramid(pyramid.directory)
+
+        assert isinstance(reopened.arrays[0], np.memmap)
+        assert np.array_equal(reopened.synthesize(1, 2, 8), pyramid.synthesize(1, 2, 8))
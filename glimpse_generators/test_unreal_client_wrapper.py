@@ -0,0 +1,74 @@
+import pytest
+
+from glimpse_generators import unreal_client_wrapper
+from glimpse_generators.readiness import ReadinessConfig
+from glimpse_generators.rpc_tracer import RpcTracer
+from glimpse_generators.test_unrealcv_fix import FakeUnrealCVServer
+from glimpse_generators.unreal_client_wrapper import UnrealClientWrapper, UnrealTransport
+
+
+def make_wrapper(host, transport):
+    # Only the connection part is exercised, so no simulator process is started.
+    wrapper = UnrealClientWrapper.__new__(UnrealClientWrapper)
+    wrapper.host = host
+    wrapper.transport = UnrealTransport(transport)
+    wrapper.readiness_config = ReadinessConfig()
+    wrapper.tracer = RpcTracer()
+    wrapper.client = None
+
+    return wrapper
+
+
+@pytest.fixture
+def servers(tmp_path, monkeypatch):
+    """A TCP server, and the Unix domain socket path UnrealCV would create for its port."""
+    monkeypatch.setattr(unreal_client_wrapper, "UDS_PATH_TEMPLATE", str(tmp_path / "unrealcv_{port}.socket"))
+    started = []
+
+    def start(with_uds: bool):
+        tcp_server = FakeUnrealCVServer()
+        started.append(tcp_server)
+        uds_path = tmp_path / f"unrealcv_{tcp_server.port}.socket"
+
+        if with_uds:
+            started.append(FakeUnrealCVServer(unix_path=uds_path))
+
+        return tcp_server.port, uds_path
+
+    yield start
+
+    for server in started:
+        server.close()
+
+
+class TestTransport:
+    def test_local_simulator_is_reached_over_uds(self, servers):
+        port, uds_path = servers(with_uds=True)
+        wrapper = make_wrapper("localhost", UnrealTransport.AUTO)
+
+        assert wrapper._connect(port)
+        assert wrapper.client.type == "unix" and wrapper.client.endpoint == str(uds_path)
+        assert wrapper.client.request("vget /unrealcv/status") == "echo vget /unrealcv/status"
+
+        wrapper.client.disconnect()
+
+    def test_stale_uds_falls_back_to_tcp(self, servers):
+        port, uds_path = servers(with_uds=False)
+        uds_path.touch()  # Left behind by a simulator that died
+        wrapper = make_wrapper("localhost", UnrealTransport.AUTO)
+
+        assert wrapper._connect(port)
+        assert wrapper.client.type == "inet"
+
+        wrapper.client.disconnect()
+
+    @pytest.mark.parametrize("host, transport, expected", [
+        ("localhost", UnrealTransport.TCP, ["inet"]),
+        ("localhost", UnrealTransport.UDS, ["unix"]),
+        ("192.0.2.1", UnrealTransport.AUTO, ["inet"]),
+    ])
+    def test_endpoints(self, servers, host, transport, expected):
+        port, _ = servers(with_uds=True)
+        wrapper = make_wrapper(host, transport)
+
+        assert [socket_type for socket_type, _ in wrapper._endpoints(port)] == expected
@@ -0,0 +1,102 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from glimpse_generators.readiness import ReadinessConfig
+from glimpse_generators.rpc_tracer import RpcTracer
+from glimpse_generators import unreal_glimpse_generator
+from glimpse_generators.scene_state import SceneState
+from glimpse_generators.unreal_glimpse_generator import CaptureMode, FrameTransport, UnrealGlimpseGenerator, \
+    UnrealGridGlimpseGenerator
+
+
+class UnrealClientMock:
+    def __init__(self, frame: np.ndarray):
+        self.frame = frame
+        self.scene_state = SceneState()
+        self.readiness_config = ReadinessConfig()
+        self.tracer = RpcTracer()
+        self.requests = []
+
+    def request(self, message, *args, **kwargs):
+        self.requests.append(message)
+
+        if message.startswith("vget /camera/1/lit"):
+            transport = message.split(" ")[-1]
+            buffer = io.BytesIO()
+
+            if transport == "npy":
+                np.save(buffer, self.frame)
+            else:
+                Image.fromarray(self.frame).save(buffer, format="PNG")
+
+            return buffer.getvalue()
+
+        if message == "vget /camera/1/location":
+            return "0.0 0.0 0.0"
+
+        return "true"
+
+    def request_many(self, messages, *args, **kwargs):
+        return [self.request(message) for message in messages]
+
+
+@pytest.fixture
+def frame():
+    return np.random.default_rng(0).integers(0, 256, (500, 500, 3), dtype=np.uint8)
+
+
+class TestCaptureModes:
+    def test_legacy_mode_renders_at_1000(self, frame):
+        client = UnrealClientMock(frame)
+        generator = UnrealGlimpseGenerator(client, capture_mode=CaptureMode.LEGACY, resolution=250)
+
+        assert "vset /camera/1/size 1000 1000" in client.requests
+        assert generator.frame_transport == FrameTransport.PNG
+        assert generator.get_camera_image((0, 0, 10)).size == (500, 500)
+
+    def test_native_mode_renders_at_resolution_with_raw_arrays(self, frame):
+        client = UnrealClientMock(frame)
+        generator = UnrealGlimpseGenerator(client, capture_mode=CaptureMode.NATIVE, resolution=500)
+
+        assert "vset /camera/1/size 500 500" in client.requests
+        assert generator.frame_transport == FrameTransport.NPY
+
+        native = generator.get_camera_image((0, 0, 10))
+        legacy = Image.fromarray(frame).transpose(Image.Transpose.ROTATE_270)
+
+        # Same orientation as the legacy pipeline.
+        assert np.array_equal(np.asarray(native), np.asarray(legacy))
+
+    def test_legacy_mode_matches_pil_pipeline(self):
+        frame = np.random.default_rng(1).integers(0, 256, (1000, 1000, 3), dtype=np.uint8)
+        generator = UnrealGlimpseGenerator(UnrealClientMock(frame), capture_mode=CaptureMode.LEGACY)
+
+        expected = Image.fromarray(frame).resize((500, 500), Image.Resampling.BILINEAR)
+        expected = expected.transpose(Image.Transpose.ROTATE_270)
+
+        assert np.array_equal(np.asarray(generator.get_camera_image((0, 0, 10))), np.asarray(expected))
+
+    def test_latencies_are_kept_for_the_latest_glimpses_only(self, frame, monkeypatch):
+        monkeypatch.setattr(unreal_glimpse_generator, "GLIMPSE_LATENCY_WINDOW", 3)
+        generator = UnrealGlimpseGenerator(UnrealClientMock(frame), capture_mode=CaptureMode.NATIVE)
+
+        for _ in range(5):
+            generator.capture_frame()
+
+        assert len(generator.glimpse_latencies[FrameTransport.NPY]) == 3
+        assert generator.get_glimpse_latency_stats()["npy"]["count"] == 3
+
+
+class TestGridFrames:
+    def test_frame_is_the_image_with_grid(self, frame):
+        generator = UnrealGridGlimpseGenerator(6, 6, UnrealClientMock(frame), capture_mode=CaptureMode.NATIVE)
+
+        grid_frame = generator.get_camera_frame((0, 0, 10))
+
+        # Observations are BGR views of the RGB buffer the grid was drawn onto.
+        assert np.shares_memory(grid_frame, grid_frame.rgb)
+        assert np.array_equal(grid_frame[:, :, 0], grid_frame.rgb[:, :, 2])
+        assert np.array_equal(np.asarray(grid_frame.to_pil()), np.asarray(generator.get_camera_image((0, 0, 10))))
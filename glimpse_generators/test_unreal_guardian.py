@@ -0,0 +1,125 @@
+import socket
+import stat
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from glimpse_generators.readiness import ReadinessConfig
+from glimpse_generators.unreal_guardian import UnrealGuardian, listening_ports
+
+# Stands in for the Unreal binary: like UnrealCV, it listens on the first free port of the range.
+FAKE_UNREAL = """#!{python}
+import os
+import socket
+import time
+
+time.sleep(float(os.environ.get("FAKE_UNREAL_STARTUP_SECONDS", "0")))
+
+server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+for port in range({first_port}, {last_port}):
+    try:
+        server.bind(("127.0.0.1", port))
+        break
+    except OSError:
+        continue
+server.listen(8)
+
+while True:
+    connection, _ = server.accept()
+    connection.close()
+"""
+
+
+def free_port_range(length: int) -> range:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+        probe.bind(("127.0.0.1", 0))
+        first_port = probe.getsockname()[1]
+
+    first_port = min(first_port, 65535 - length)
+    return range(first_port, first_port + length)
+
+
+@pytest.fixture
+def guardian_factory(tmp_path, monkeypatch):
+    monkeypatch.setenv("UNREAL_LOG_PATH", str(tmp_path / "logs"))
+    ports = free_port_range(4)
+
+    binary = tmp_path / "FakeUnreal.sh"
+    binary.write_text(FAKE_UNREAL.format(python=sys.executable, first_port=ports.start, last_port=ports.stop))
+    binary.chmod(binary.stat().st_mode | stat.S_IEXEC)
+
+    guardians = []
+
+    def factory(**kwargs):
+        guardian = UnrealGuardian(
+            binary,
+            startup_wait_seconds=10,
+            unrealcv_host="127.0.0.1",
+            unrealcv_ports=ports,
+            readiness_config=ReadinessConfig(initial_interval_seconds=0.01, max_interval_seconds=0.1),
+            **kwargs,
+        )
+        guardians.append(guardian)
+        return guardian
+
+    yield factory, ports
+
+    for guardian in guardians:
+        guardian.close()
+
+
+class TestUnrealGuardian:
+    def test_detects_unrealcv_port(self, guardian_factory):
+        factory, ports = guardian_factory
+        guardian = factory()
+
+        assert guardian.is_alive
+        assert guardian.unrealcv_port == ports[0]
+
+    def test_reset_starts_new_process(self, guardian_factory):
+        factory, ports = guardian_factory
+        guardian = factory()
+        old_process = guardian.process
+
+        guardian.reset()
+
+        assert guardian.is_alive
+        assert guardian.process is not old_process
+        assert old_process.poll() is not None
+        assert guardian.restart_count == 1
+
+    def test_reset_switches_to_standby(self, guardian_factory):
+        factory, ports = guardian_factory
+        guardian = factory(standby=True)
+        guardian._standby_thread.join()
+        standby_process, standby_port = guardian.standby_process, guardian.standby_port
+
+        assert standby_port == ports[1]
+
+        guardian.reset()
+
+        assert guardian.process is standby_process
+        assert guardian.unrealcv_port == standby_port
+
+        # A new standby is warmed up in the background.
+        guardian._standby_thread.join()
+        assert guardian.standby_process.poll() is None
+        assert guardian.standby_port in ports and guardian.standby_port != guardian.unrealcv_port
+
+    def test_concurrent_launches_detect_their_own_ports(self, guardian_factory, monkeypatch):
+        factory, ports = guardian_factory
+        monkeypatch.setenv("FAKE_UNREAL_STARTUP_SECONDS", "1")
+
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            guardians = list(executor.map(lambda _: factory(), range(2)))
+        elapsed = time.monotonic() - start
+
+        # Processes start at the same time, rather than one after another.
+        assert elapsed < 1.9
+
+        assert {guardian.unrealcv_port for guardian in guardians} == {ports[0], ports[1]}
+        for guardian in guardians:
+            assert guardian.unrealcv_port in listening_ports(guardian.process.pid)
@@ -0,0 +1,47 @@
+import time
+
+import pytest
+
+from glimpse_generators.test_unrealcv_fix import FakeUnrealCVServer
+from glimpse_generators.unreal_watchdog import HEARTBEAT_COMMAND, UnrealWatchdog
+from glimpse_generators.unrealcv_fix import Client
+
+
+@pytest.fixture
+def watched_client():
+    server = FakeUnrealCVServer()
+    client = Client(("127.0.0.1", server.port))
+    assert client.connect()
+
+    watchdog = UnrealWatchdog(lambda: client, interval_seconds=0.1, deadline_seconds=0.2)
+
+    yield client, server, watchdog
+
+    watchdog.stop()
+    client.disconnect()
+    server.close()
+
+
+class TestUnrealWatchdog:
+    def test_heartbeats_only_when_idle(self, watched_client):
+        client, server, watchdog = watched_client
+
+        assert watchdog.check()
+        assert HEARTBEAT_COMMAND not in server.received
+
+        time.sleep(0.15)
+        assert watchdog.check()
+        assert server.received == [HEARTBEAT_COMMAND]
+
+    def test_stall_aborts_connection(self, watched_client):
+        client, server, watchdog = watched_client
+        server.hung.set()
+
+        watchdog.start()
+        pending = client.request_async("vget /camera/1/lit png")
+
+        with pytest.raises(ConnectionError):
+            pending.result(timeout=5)
+
+        assert client.aborted
+        assert watchdog.stalls_detected == 1
@@ -0,0 +1,191 @@
+import socket
+import struct
+import threading
+import time
+
+import pytest
+
+from glimpse_generators.unrealcv_fix import Client, SocketMessage
+
+
+class FakeUnrealCVServer:
+    """
+    Minimal UnrealCV-like server: confirms the connection and answers every request with `echo <command>`.
+    Requests are answered in order, just like the real plugin does. Once `hung` is set, requests are no longer answered
+    (as if the simulator froze). If `unix_path` is given, it listens on a Unix domain socket there instead of on TCP.
+    """
+
+    def __init__(self, unix_path=None):
+        if unix_path is None:
+            self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.server_socket.bind(("127.0.0.1", 0))
+            self.port = self.server_socket.getsockname()[1]
+        else:
+            self.server_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.server_socket.bind(str(unix_path))
+            self.port = None
+        self.server_socket.listen(1)
+        self.received = []
+        self.hung = threading.Event()
+
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    @staticmethod
+    def _send(connection, payload: bytes):
+        connection.sendall(struct.pack("I", SocketMessage.magic) + struct.pack("I", len(payload)) + payload)
+
+    @staticmethod
+    def _receive(connection):
+        header = b""
+        while len(header) < 8:
+            data = connection.recv(8 - len(header))
+            if not data:
+                return None
+            header += data
+
+        _, size = struct.unpack("II", header)
+        payload = b""
+        while len(payload) < size:
+            data = connection.recv(size - len(payload))
+            if not data:
+                return None
+            payload += data
+
+        return payload
+
+    def _serve(self):
+        connection, _ = self.server_socket.accept()
+        self._send(connection, b"connected to FakeUnrealCV")
+
+        while True:
+            payload = self._receive(connection)
+            if payload is None:
+                break
+
+            message_id, command = payload.split(b":", 1)
+            self.received.append(command.decode(errors="replace"))
+
+            if self.hung.is_set():
+                continue
+
+            self._send(connection, message_id + b":echo " + command)
+
+        connection.close()
+
+    def close(self):
+        self.server_socket.close()
+
+
+@pytest.fixture
+def connected_client():
+    server = FakeUnrealCVServer()
+    client = Client(("127.0.0.1", server.port), socket_timeout=2)
+    assert client.connect()
+
+    yield client, server
+
+    client.disconnect()
+    server.close()
+
+
+class TestClient:
+    def test_request_returns_response(self, connected_client):
+        client, _ = connected_client
+
+        assert client.request("vget /unrealcv/status") == "echo vget /unrealcv/status"
+
+    def test_request_many_returns_responses_in_order(self, connected_client):
+        client, server = connected_client
+        messages = [f"vset /object/obj_{i}/location {i} {i} 0" for i in range(50)]
+
+        responses = client.request_many(messages)
+
+        assert responses == [f"echo {message}" for message in messages]
+        assert server.received == messages
+
+    def test_request_async_futures_are_matched_with_their_responses(self, connected_client):
+        client, _ = connected_client
+
+        futures = [client.request_async(f"vget /object/obj_{i}/bounds") for i in range(10)]
+
+        assert [future.result(timeout=5) for future in futures] == [
+            f"echo vget /object/obj_{i}/bounds" for i in range(10)
+        ]
+
+    def test_sequential_and_pipelined_requests_can_be_mixed(self, connected_client):
+        client, _ = connected_client
+
+        assert client.request("a") == "echo a"
+        assert client.request_many(["b", "c"]) == ["echo b", "echo c"]
+        assert client.request("d") == "echo d"
+        assert client.send_message_id == client.recv_message_id == 4
+
+    def test_large_binary_responses_are_received_whole(self, connected_client):
+        client, _ = connected_client
+        # Not valid UTF-8, like PNG or NPY frames.
+        payload = b"\x89" + bytes(range(256)) * 20000
+
+        response = client.request(payload, timeout=10)
+
+        assert isinstance(response, bytearray)
+        assert response == b"echo " + payload
+
+    def test_hung_server_times_out(self, connected_client):
+        client, server = connected_client
+        server.hung.set()
+
+        start = time.monotonic()
+        with pytest.raises(ConnectionError):
+            client.request("vget /unrealcv/status", timeout=0.2)
+
+        assert time.monotonic() - start < 1
+        assert client.stalled_for() > 0
+
+    def test_socket_timeout_fails_requests_in_flight(self, connected_client):
+        client, server = connected_client
+        server.hung.set()
+
+        future = client.request_async("vget /unrealcv/status")
+
+        with pytest.raises(ConnectionError):
+            future.result(timeout=5)
+
+        assert client.aborted
+        with pytest.raises(ConnectionError):
+            client.request("vget /unrealcv/status")
+
+    def test_abort_fails_requests_in_flight(self, connected_client):
+        client, server = connected_client
+        server.hung.set()
+
+        futures = [client.request_async(f"vget /object/obj_{i}/bounds") for i in range(3)]
+        client.abort()
+
+        for future in futures:
+            with pytest.raises(ConnectionError):
+                future.result(timeout=1)
+
+        assert client.stalled_for() == 0
+
+    def test_unconfirmed_connection_times_out_on_any_thread(self):
+        # Accepts connections (the kernel does), but never confirms them, like a simulator that froze while starting.
+        server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server_socket.bind(("127.0.0.1", 0))
+        server_socket.listen(1)
+
+        errors = []
+
+        def connect():
+            try:
+                Client(server_socket.getsockname()).connect(timeout=0.2)
+            except ConnectionError as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=connect)
+        thread.start()
+        thread.join(timeout=5)
+        server_socket.close()
+
+        assert len(errors) == 1
@@ -0,0 +1,142 @@
+import json
+import math
+import pathlib
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+# Altitudes (in meters above the scenario's start position) at which each pyramid level is captured, finest first.
+DEFAULT_ALTITUDES = (20, 40, 80, 160, 320)
+
+
+@dataclass
+class PyramidLevel:
+    altitude: float  # Altitude the level's tiles were captured from (meters)
+    tiles_per_side: int
+    file: str
+
+    def footprint(self) -> float:
+        # Side of the square seen by a 90° FOV camera looking straight down (see `dot_matrix_two_dimensional_unreal`).
+        return 2 * self.altitude
+
+    def extent(self) -> float:
+        return self.tiles_per_side * self.footprint()
+
+
+class TilePyramid:
+    """
+    Multi-resolution top-down mosaics of a scene, centered on the scenario's start position.
+
+    Each level is a single (memory-mapped) RGB array made of glimpses captured from a fixed altitude; columns grow with
+    Unreal's x axis and rows with Unreal's y axis, as in the glimpses themselves. Glimpses for any position are then
+    synthesized by resampling the level with the closest (but not coarser) ground resolution.
+
+    Mosaics are orthographic approximations: parallax (e.g. building walls) differs from real glimpses.
+    """
+
+    META_FILE = "pyramid.json"
+
+    def __init__(self, directory: Union[str, pathlib.Path]):
+        self.directory = pathlib.Path(directory)
+
+        with open(self.directory / self.META_FILE) as f:
+            meta = json.load(f)
+
+        self.glimpse_size: int = meta["glimpse_size"]
+        self.levels: List[PyramidLevel] = [PyramidLevel(**level) for level in meta["levels"]]
+        self.meta: Dict = meta["scene"]
+
+        # Memory-mapped, so that workers replaying the same scenario share the pages.
+        self.arrays: List[np.ndarray] = [np.load(self.directory / level.file, mmap_mode="r") for level in self.levels]
+
+    def ground_resolution(self, level: PyramidLevel) -> float:
+        return level.footprint() / self.glimpse_size
+
+    def choose_level(self, altitude: float) -> int:
+        wanted = 2 * altitude / self.glimpse_size
+        finer = [i for i, level in enumerate(self.levels) if self.ground_resolution(level) <= wanted]
+
+        if not finer:
+            return min(range(len(self.levels)), key=lambda i: self.ground_resolution(self.levels[i]))
+
+        return max(finer, key=lambda i: self.ground_resolution(self.levels[i]))
+
+    def synthesize(self, x: float, y: float, z: float, size: Optional[int] = None) -> np.ndarray:
+        """
+        Returns the RGB glimpse (`size` x `size`, glimpse size by default) seen from `(x, y, z)` meters relative to the
+        start position (Unreal axes). Areas outside of the baked extent are black.
+        """
+        size = size or self.glimpse_size
+        z = max(z, 1e-3)
+
+        level_index = self.choose_level(z)
+        level, array = self.levels[level_index], self.arrays[level_index]
+        resolution = self.ground_resolution(level)
+
+        # Centers of the output pixels, in the level's pixel coordinates.
+        offsets = (np.arange(size) + 0.5) * (2 * z / size) - z
+        columns = np.floor((x + offsets + level.extent() / 2) / resolution).astype(np.int64)
+        rows = np.floor((y + offsets + level.extent() / 2) / resolution).astype(np.int64)
+
+        valid_columns = (columns >= 0) & (columns < array.shape[1])
+        valid_rows = (rows >= 0) & (rows < array.shape[0])
+
+        glimpse = np.zeros((size, size, 3), dtype=np.uint8)
+
+        if valid_columns.any() and valid_rows.any():
+            # Fancy indexing on a memory map reads only the pages that are needed.
+            glimpse[np.ix_(valid_rows, valid_columns)] = array[np.ix_(rows[valid_rows], columns[valid_columns])]
+
+        return glimpse
+
+
+def bake_pyramid(capture: Callable[[Tuple[float, float, float]], Image.Image],
+                 directory: Union[str, pathlib.Path], glimpse_size: int, extent: float,
+                 altitudes: Sequence[float] = DEFAULT_ALTITUDES, scene_meta: Optional[Dict] = None) -> TilePyramid:
+    """
+    Captures a tile pyramid covering (at least) `extent` x `extent` meters around the start position and stores it in
+    `directory`. `capture` returns the glimpse (without the grid) seen from a position relative to the start position.
+    """
+    directory = pathlib.Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    levels = []
+
+    for index, altitude in enumerate(altitudes):
+        tiles_per_side = max(1, math.ceil(extent / (2 * altitude)))
+        level = PyramidLevel(altitude=altitude, tiles_per_side=tiles_per_side, file=f"level_{index}.npy")
+        side = tiles_per_side * glimpse_size
+
+        # Written straight to disk, as the finest levels easily get larger than the memory.
+        mosaic = np.lib.format.open_memmap(directory / level.file, mode="w+", dtype=np.uint8, shape=(side, side, 3))
+
+        for row in range(tiles_per_side):
+            for column in range(tiles_per_side):
+                x = (column - (tiles_per_side - 1) / 2) * level.footprint()
+                y = (row - (tiles_per_side - 1) / 2) * level.footprint()
+
+                tile = capture((x, y, altitude)).convert("RGB")
+
+                if tile.size != (glimpse_size, glimpse_size):
+                    tile = tile.resize((glimpse_size, glimpse_size))
+
+                mosaic[row * glimpse_size:(row + 1) * glimpse_size,
+                       column * glimpse_size:(column + 1) * glimpse_size] = np.asarray(tile)
+
+        mosaic.flush()
+        del mosaic
+
+        levels.append(level)
+
+    meta = {
+        "glimpse_size": glimpse_size,
+        "levels": [asdict(level) for level in levels],
+        "scene": scene_meta or {},
+    }
+
+    with open(directory / TilePyramid.META_FILE, "w") as f:
+        json.dump(meta, f, indent=4)
+
+    return TilePyramid(directory)
@@ -1,8 +1,25 @@
-from time import sleep
+import ipaddress
+import logging
+import os
+import socket
+from concurrent.futures import Future
+from enum import Enum
+from functools import partial
+from time import perf_counter, sleep
+from typing import List, Optional, Tuple
 
+from glimpse_generators.readiness import ReadinessConfig, RequestDeadlines
+from glimpse_generators.rpc_tracer import RpcTracer, command_class
+from glimpse_generators.scene_state import SceneState
 from glimpse_generators.unreal_guardian import UnrealGuardian
+from glimpse_generators.unreal_watchdog import UnrealWatchdog
 from glimpse_generators.unrealcv_fix import Client
 
+logger = logging.getLogger(__name__)
+
+# UnrealCV creates this socket on startup, next to its TCP port (on platforms with Unix domain sockets).
+UDS_PATH_TEMPLATE = "/tmp/unrealcv_{port}.socket"
+
 
 class UnrealDiedException(Exception):
     pass
@@ -12,8 +29,33 @@ class UnrealException(Exception):
     pass
 
 
+class UnrealTransport(str, Enum):
+    """How to connect to the simulator."""
+    # Unix domain socket if the simulator runs on this machine and its socket exists, TCP otherwise (or if it fails)
+    AUTO = "auto"
+    TCP = "tcp"
+    # Unix domain socket only
+    UDS = "uds"
+
+
+def is_local_host(host: str) -> bool:
+    try:
+        return ipaddress.ip_address(socket.gethostbyname(host)).is_loopback
+    except (OSError, ValueError):
+        return False
+
+
 class UnrealCVWrapper(Client):
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, request_deadlines: Optional[RequestDeadlines] = None,
+                 tracer: Optional[RpcTracer] = None, **kwargs):
+        """
+        Requests sent without an explicit timeout get the deadline of their command class. If a `tracer` is given,
+        every request is recorded in it once it finishes.
+        """
+        self.request_deadlines = request_deadlines or RequestDeadlines()
+        self.tracer = tracer
+        kwargs.setdefault("socket_timeout", self.request_deadlines.socket_timeout_seconds)
+
         super().__init__(*args, **kwargs)
 
     def connect(self, *args, **kwargs):
@@ -22,37 +64,122 @@ class UnrealCVWrapper(Client):
         except ConnectionError:
             raise UnrealDiedException()
 
+    def request_async(self, message):
+        start = perf_counter()
+        future = super().request_async(message)
+
+        if self.tracer is not None:
+            future.add_done_callback(partial(self._trace, command_class(message), start))
+
+        return future
+
+    def _trace(self, command: str, start: float, future: Future) -> None:
+        # Called on the receive thread, so it must stay cheap.
+        latency = perf_counter() - start
+
+        if future.exception() is not None:
+            self.tracer.record(command, latency, outcome="failed")
+            return
+
+        response = future.result()
+        outcome = "error" if isinstance(response, str) and "error" in response else "ok"
+        self.tracer.record(command, latency, len(response) if response is not None else 0, outcome)
+
     def request(self, *args, **kwargs):
+        kwargs.setdefault("timeout", None)
+
         try:
             response = super().request(*args, **kwargs)
         except ConnectionError:
             raise UnrealDiedException()
-        print("Unreal CV Wrapper: request params", args, kwargs, "response", response)
 
-        if "error" in response:
-            raise UnrealException(response)
+        self._check_response(args, kwargs, response)
 
         return response
 
+    def request_many(self, messages, timeout=None, raise_on_error=True):
+        if timeout is None:
+            timeout = self.request_deadlines.for_batch(messages)
+
+        try:
+            responses = super().request_many(messages, timeout=timeout)
+        except ConnectionError:
+            raise UnrealDiedException()
+
+        errors = []
+
+        for message, response in zip(messages, responses):
+            try:
+                self._check_response((message,), {}, response)
+            except UnrealException as e:
+                errors.append(e)
+
+        # All responses are read before raising, so that the connection stays in sync.
+        if errors and raise_on_error:
+            raise errors[0]
+
+        return responses
+
+    @staticmethod
+    def _check_response(args, kwargs, response):
+        # Binary responses (e.g. in-memory frames) never carry error messages.
+        if isinstance(response, (bytes, bytearray)):
+            return
+
+        if "error" in response:
+            logger.debug(f"UnrealCV request {args} failed: {response}")
+            raise UnrealException(response)
+
 
 class UnrealClientWrapper:
-    def __init__(self, host, port, unreal_binary_path):
-        self.guardian = UnrealGuardian(unreal_binary_path)
+    def __init__(self, host, port, unreal_binary_path, readiness_config: Optional[ReadinessConfig] = None,
+                 standby: bool = False, transport: UnrealTransport = UnrealTransport.AUTO):
+        """
+        If `standby` is set, a second simulator process is kept warm, so that restarts after a crash are (nearly) instant.
+
+        Local simulators are talked to over a Unix domain socket by default, which saves the loopback TCP overhead on
+        every (large) frame; see `UnrealTransport`.
+        """
+        self.transport = UnrealTransport(transport)
+        self.readiness_config = readiness_config or ReadinessConfig()
+        self.guardian = UnrealGuardian(
+            unreal_binary_path,
+            startup_wait_seconds=self.readiness_config.startup_deadline_seconds,
+            unrealcv_host=host,
+            unrealcv_ports=range(port, port + 11),
+            readiness_config=self.readiness_config,
+            standby=standby,
+        )
         self.host = host
         self.port = port
         self.client = None
+        self.scene_state = SceneState()
+        # Shared by all clients, so that the trace survives simulator restarts.
+        self.tracer = RpcTracer()
 
         self._initialize_client()
 
+        self.watchdog = None
+        if self.readiness_config.heartbeat_interval_seconds is not None:
+            self.watchdog = UnrealWatchdog(lambda: self.client, self.readiness_config.heartbeat_interval_seconds,
+                                           self.readiness_config.heartbeat_deadline_seconds)
+            self.watchdog.start()
+
     def _initialize_client(self):
+        # Whatever we pushed to the previous simulator process is gone.
+        self.scene_state.clear()
+
         for _ in range(3):
             try:
-                for i in range(11):
-                    print(f"Trying to connect to UnrealCV server on port {self.port + i}")
-                    self.client = UnrealCVWrapper((self.host, self.port + i))
-                    connection_result = self.client.connect()
+                ports = [self.port + i for i in range(11)]
 
-                    if connection_result:
+                # The guardian knows on which port our process is listening, so we start there.
+                if self.guardian.unrealcv_port in ports:
+                    ports.remove(self.guardian.unrealcv_port)
+                    ports.insert(0, self.guardian.unrealcv_port)
+
+                for port in ports:
+                    if self._connect(port):
                         break
 
                     sleep(3)
@@ -60,25 +187,83 @@ class UnrealClientWrapper:
                     raise ConnectionError("Failed to connect to UnrealCV server; is it running?")
 
 
-                self.client.request('vget /unrealcv/status')
-                self.client.request('vset /cameras/spawn')
-                self.client.request('vset /camera/1/rotation -90 0 0')
+                self.client.request_many([
+                    'vget /unrealcv/status',
+                    'vset /cameras/spawn',
+                    'vset /camera/1/rotation -90 0 0',
+                ])
                 return
             except UnrealDiedException:
                 self.guardian.reset()
 
+    def _endpoints(self, port: int) -> List[Tuple[str, object]]:
+        """Endpoints (as `Client` socket type and address) to try for the simulator listening on `port`, in order."""
+        endpoints = []
+        uds_path = UDS_PATH_TEMPLATE.format(port=port)
+
+        if self.transport != UnrealTransport.TCP and hasattr(socket, "AF_UNIX") and is_local_host(self.host) and \
+                os.path.exists(uds_path):
+            endpoints.append(("unix", uds_path))
+
+        if self.transport != UnrealTransport.UDS:
+            endpoints.append(("inet", (self.host, port)))
+
+        return endpoints
+
+    def _connect(self, port: int) -> bool:
+        for socket_type, endpoint in self._endpoints(port):
+            logger.info(f"Trying to connect to UnrealCV server at {endpoint}")
+            self.client = UnrealCVWrapper(endpoint, type=socket_type,
+                                          request_deadlines=self.readiness_config.request_deadlines,
+                                          tracer=self.tracer)
+
+            if self.client.connect():
+                return True
+
+        return False
+
+    def restart(self):
+        """Restarts the simulator process and reconnects to it."""
+        if self.client is not None:
+            # Responses of the old process must not reach anyone anymore (and its receive thread must not reconnect).
+            self.client.abort()
+
+        self.guardian.reset()
+        self._initialize_client()
+
+    @property
+    def is_responsive(self) -> bool:
+        """Whether the simulator is alive and its connection wasn't aborted (e.g. by the watchdog, after a stall)."""
+        return self.guardian.is_alive and self.client is not None and not self.client.aborted
+
     def request(self, *args, **kwargs):
-        if not self.guardian.is_alive:
-            self.guardian.reset()
-            self._initialize_client()
+        if not self.is_responsive:
+            self.restart()
             raise UnrealDiedException()
         try:
             return self.client.request(*args, **kwargs)
         except UnrealDiedException as e:
-            self.guardian.reset()
-            self._initialize_client()
+            self.restart()
+            raise e
+
+    def request_many(self, messages, timeout=None, raise_on_error=True):
+        """
+        Sends a batch of independent commands back-to-back (pipelined) and returns their responses in order.
+        Only one round trip is paid for the whole batch. Without a `timeout`, the batch gets the longest deadline of
+        its commands (see `RequestDeadlines`).
+        """
+        if not self.is_responsive:
+            self.restart()
+            raise UnrealDiedException()
+        try:
+            return self.client.request_many(messages, timeout=timeout, raise_on_error=raise_on_error)
+        except UnrealDiedException as e:
+            self.restart()
             raise e
 
     def disconnect(self):
+        if self.watchdog is not None:
+            self.watchdog.stop()
+
         self.client.disconnect()
         self.guardian.close()
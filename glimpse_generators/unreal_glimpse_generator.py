@@ -1,23 +1,81 @@
-from time import sleep
-from typing import Tuple
+import io
+import logging
+import os
+import tempfile
+from collections import deque
+from enum import Enum
+from time import perf_counter
+from typing import Callable, Deque, Dict, Optional, Tuple
 
 import numpy as np
 from PIL import Image
 
 from conversation.abstract_conversation import Role
-from glimpse_generators.unreal_client_wrapper import UnrealClientWrapper
-from misc.add_guardrails import dot_matrix_two_dimensional_unreal
-from misc.cv2_and_numpy import opencv_to_pil, pil_to_opencv
+from glimpse_generators.readiness import partition_loaded, wait_until
+from glimpse_generators.render_cache import RenderCache
+from glimpse_generators.unreal_client_wrapper import UnrealClientWrapper, UnrealException
+from misc.add_guardrails import draw_unreal_grid
+from misc.cv2_and_numpy import Frame
+
+
+logger = logging.getLogger(__name__)
+
+# Capture latencies are kept for this many of the latest glimpses (per transport), so long runs don't grow them forever.
+GLIMPSE_LATENCY_WINDOW = 1000
 
 
 class OutOfBoundsException(Exception):
     pass
 
 
+class FrameTransport(str, Enum):
+    """How a rendered frame travels from Unreal to the glimpse generator."""
+    FILE = "file"  # Unreal writes a PNG to disk, we read it back (legacy behaviour)
+    PNG = "png"  # PNG bytes are sent back over the UnrealCV socket
+    NPY = "npy"  # Raw array (.npy) bytes are sent back over the UnrealCV socket
+
+
+class CaptureMode(str, Enum):
+    """How glimpses are rendered and turned into images."""
+    # Camera renders at 1000x1000, frames are resized to 500x500 and rotated on the CPU (as in the paper)
+    LEGACY = "legacy"
+    # Camera renders at the requested resolution and frames arrive as raw arrays, so there is no resizing or decoding;
+    # frames are still rotated on the CPU (one copy per glimpse)
+    NATIVE = "native"
+
+
 class UnrealGlimpseGenerator:
-    def __init__(self, client: UnrealClientWrapper, start_position=(3300.289, -26305.121, 0)):
+    def __init__(self, client: UnrealClientWrapper, start_position=(3300.289, -26305.121, 0),
+                 frame_transport: FrameTransport = FrameTransport.PNG,
+                 capture_mode: CaptureMode = CaptureMode.LEGACY, resolution: int = 500,
+                 render_cache: Optional[RenderCache] = None):
         self.client = client
         self.start_position = start_position
+        self.capture_mode = CaptureMode(capture_mode)
+        # Resolution of glimpses in native mode; legacy glimpses are always 500x500.
+        self.resolution = resolution
+
+        # Native mode doesn't want any encoding on the way, so raw arrays are requested.
+        self.frame_transport = FrameTransport.NPY if self.capture_mode == CaptureMode.NATIVE else FrameTransport(
+            frame_transport
+        )
+        self.camera_size = resolution if self.capture_mode == CaptureMode.NATIVE else 1000
+
+        # Used only by the file transport (or as a fallback); unique per generator so that many of them can share a host.
+        self.frame_path = os.path.join(tempfile.gettempdir(), f"flysearch_camera_{os.getpid()}_{id(self)}.png")
+
+        # Per-glimpse capture latency (seconds) of the latest glimpses, grouped by the transport that actually delivered
+        # the frame.
+        self.glimpse_latencies: Dict[FrameTransport, Deque[float]] = {
+            transport: deque(maxlen=GLIMPSE_LATENCY_WINDOW) for transport in FrameTransport
+        }
+
+        # Glimpses are served from the render cache only when the scene is known (see `set_scene`).
+        self.render_cache = render_cache
+        self.scene_key: Optional[str] = None
+        self.deferred_scene_setup: Optional[Callable[[], None]] = None
+        # Where the camera would be if the simulator rendered the glimpses we served from the cache.
+        self.virtual_camera_location: Optional[Tuple[float, float, float]] = None
 
         self._initialize_client()
 
@@ -25,54 +83,84 @@ class UnrealGlimpseGenerator:
     def change_start_position(self, new_start_position: Tuple[float, float, float]):
         self.start_position = new_start_position
 
+    def set_scene(self, scene_key: Optional[str], deferred_setup: Optional[Callable[[], None]] = None) -> None:
+        """
+        Sets the key of the current scene for the render cache (None disables the cache). If `deferred_setup` is given,
+        the scene hasn't been set up in the simulator yet; it's called before the first glimpse that isn't cached.
+        """
+        self.scene_key = scene_key
+        self.deferred_scene_setup = deferred_setup
+
+    def set_virtual_camera_location(self, location: Tuple[float, float, float]) -> None:
+        """Pretends the camera is at `location`; the simulator is moved there only once a glimpse isn't cached."""
+        self.virtual_camera_location = tuple(location)
+
     def _initialize_client(self):
 
-        self.client.request('vget /unrealcv/status')
-        self.client.request('vset /cameras/spawn')
-        self.client.request('vset /camera/1/rotation -90 0 0')
-        self.client.request('vset /camera/1/size 1000 1000')
+        self.client.request_many([
+            'vget /unrealcv/status',
+            'vset /cameras/spawn',
+            'vset /camera/1/rotation -90 0 0',
+            f'vset /camera/1/size {self.camera_size} {self.camera_size}',
+        ])
 
         self.reset_camera()
 
-        while not self.is_unreal_ready():
-            print("Unreal Glimpse Generator: Waiting for Unreal to give something meaningful...")
-            sleep(0.5)
+        config = self.client.readiness_config
+        wait_until(self.is_unreal_ready, "Unreal to give something meaningful", config.startup_deadline_seconds, config,
+                   tracer=self.client.tracer)
 
-        print("Unreal Glimpse Generator: Unreal is ready to go!")
+        logger.info("Unreal is ready to go!")
 
     def reset_camera(self):
         start_position = self.start_position
 
-        self.client.request(
-            f'vset /camera/1/location {start_position[0]} {start_position[1]} {start_position[2] + 10000}'
-        )
+        location = (start_position[0], start_position[1], start_position[2] + 10000)
+        self.virtual_camera_location = None
+
+        self.client.request(f'vset /camera/1/location {location[0]} {location[1]} {location[2]}')
+        self.client.scene_state.update_camera_location(location)
 
     def disconnect(self):
         self.client.disconnect()
 
+        if os.path.exists(self.frame_path):
+            os.remove(self.frame_path)
+
+    @staticmethod
+    def _parse_location(response) -> Optional[Tuple[float, float, float]]:
+        if type(response) == str:
+            try:
+                location = tuple(map(float, response.split(" ")))
+            except ValueError:
+                return None
+            return location if len(location) == 3 else None
+        elif type(response) == tuple and len(response) == 3:
+            return response
+
+        return None
+
     def get_unreal_camera_coordinates(self) -> Tuple[float, float, float]:
-        current = self.client.request('vget /camera/1/location')
+        if self.virtual_camera_location is not None:
+            return self.virtual_camera_location
 
-        if type(current) == str:
-            current = current.split(" ")
-            assert len(current) == 3
-            current = tuple(map(float, current))
-        elif type(current) != tuple:
-            raise ValueError("Unexpected type for current position received from UnrealCV. Got: ", type(current),
-                             current)
+        scene_state = self.client.scene_state
 
-        return current
+        # The location is cached until the camera is moved in a way that doesn't tell us where it ended up.
+        if scene_state.camera_location is None:
+            current = self.client.request('vget /camera/1/location')
+            location = self._parse_location(current)
 
-    def get_relative_from_start(self):
-        current = self.client.request('vget /camera/1/location')
+            if location is None:
+                raise ValueError("Unexpected type for current position received from UnrealCV. Got: ", type(current),
+                                 current)
+
+            scene_state.update_camera_location(location)
 
-        if type(current) == str:
-            current = current.split(" ")
-            assert len(current) == 3
-            current = tuple(map(float, current))
-        elif type(current) != tuple:
-            raise ValueError("Unexpected type for current position received from UnrealCV. Got: ", type(current),
-                             current)
+        return scene_state.camera_location
+
+    def get_relative_from_start(self):
+        current = self.get_unreal_camera_coordinates()
 
         x, y, z = current
 
@@ -88,37 +176,205 @@ class UnrealGlimpseGenerator:
         return int(x), int(y), int(z)
 
     def wait_for_unreal_to_finish(self):
-        while "false" in self.client.request("vget /camera/1/partition_loaded").lower():
-            print("Unreal Glimpse Generator: Waiting for Unreal to finish loading the PARTITION...")
-            sleep(0.5)
+        config = self.client.readiness_config
+        wait_until(
+            lambda: partition_loaded(self.client), "Unreal to finish loading the PARTITION",
+            config.partition_deadline_seconds, config, tracer=self.client.tracer
+        )
 
     def is_unreal_ready(self):
-        img = self.__get_img(rel_position_m=(0, 0, 200), force_move=True)
-        img = pil_to_opencv(img)
+        img = self.__get_rgb(rel_position_m=(0, 0, 200), force_move=True)
 
         blank = np.isclose(img, 0, atol=0.001).all()
         return not blank
 
-    def __get_img(self, rel_position_m: Tuple[int, int, int] = (0, 0, 0), force_move=False) -> Image.Image:
+    def __get_rgb(self, rel_position_m: Tuple[int, int, int] = (0, 0, 0), force_move=False) -> np.ndarray:
+        """Returns the glimpse as an RGB array of the caller's own, so that e.g. the grid can be drawn onto it in place."""
         start_position = self.start_position
 
         location = (start_position[0] + rel_position_m[0] * 100, start_position[1] + rel_position_m[1] * 100,
                     start_position[2] + rel_position_m[2] * 100)
 
-        move_type = "location" if force_move else "moveto"
+        cache_key = self._render_cache_key(location, force_move)
+
+        if cache_key is not None:
+            cached = self.render_cache.get(cache_key)
+
+            if cached is not None:
+                image, meta = cached
+                self.virtual_camera_location = tuple(meta["camera_location"])
+                return np.array(image)
+
+        self._sync_with_simulator()
+
+        rgb = self._render(location, force_move)
+
+        if cache_key is not None:
+            self.render_cache.put(cache_key, Image.fromarray(rgb),
+                                  {"camera_location": list(self.get_unreal_camera_coordinates())})
+
+        return rgb
+
+    def _render_cache_key(self, location, force_move: bool) -> Optional[str]:
+        if self.render_cache is None or self.scene_key is None:
+            return None
+
+        # Teleports end up exactly where requested, but where `moveto` ends up depends on where it started from.
+        start_location = None if force_move else self.get_unreal_camera_coordinates()
+
+        return RenderCache.make_key(
+            self.scene_key, start_location, location, force_move, self.capture_mode.value, self.resolution
+        )
+
+    def _sync_with_simulator(self) -> None:
+        """Brings the simulator to the state we pretended it was in while serving glimpses from the render cache."""
+        location, self.virtual_camera_location = self.virtual_camera_location, None
+
+        if self.deferred_scene_setup is not None:
+            setup, self.deferred_scene_setup = self.deferred_scene_setup, None
+            # Glimpses taken during the setup must be real ones.
+            scene_key, self.scene_key = self.scene_key, None
+
+            try:
+                setup()
+            finally:
+                self.scene_key = scene_key
 
-        self.client.request(f'vset /camera/1/{move_type} {location[0]} {location[1]} {location[2]}')
-        if force_move:
+        scene_state = self.client.scene_state
+
+        if location is not None and scene_state.camera_location_changed(location):
+            self.client.request(f'vset /camera/1/location {location[0]} {location[1]} {location[2]}')
             self.wait_for_unreal_to_finish()
-        self.client.request('vget /camera/1/lit /tmp/camera.png')
-        image = Image.open('/tmp/camera.png')
-        image = image.resize((500, 500), Image.Resampling.BILINEAR)
-        image = image.transpose(Image.Transpose.ROTATE_270)
-        return image
+            scene_state.update_camera_location(location)
+
+    def _render(self, location, force_move: bool) -> np.ndarray:
+        scene_state = self.client.scene_state
+
+        if not force_move:
+            response = self.client.request(f'vset /camera/1/moveto {location[0]} {location[1]} {location[2]}')
+            # `moveto` respects collisions, so unless the response tells us where the camera has ended up, we don't know.
+            scene_state.update_camera_location(self._parse_location(response))
+        elif scene_state.camera_location_changed(location):
+            self.client.request(f'vset /camera/1/location {location[0]} {location[1]} {location[2]}')
+            self.wait_for_unreal_to_finish()
+            scene_state.update_camera_location(location)
+
+        frame = self.capture_frame()
+
+        if self.capture_mode == CaptureMode.LEGACY:
+            frame = np.asarray(Image.fromarray(frame).resize((500, 500), Image.Resampling.BILINEAR))
+
+        # Same as PIL's ROTATE_270; np.rot90 is a view, so the rotated glimpse is the only copy. Rolling the camera
+        # instead would save this copy, but would have to be checked against the orientation of every map first.
+        return np.ascontiguousarray(np.rot90(frame, k=-1))
+
+    def capture_frame(self) -> np.ndarray:
+        """
+        Asks Unreal for the current view of the camera (without moving it) and returns it as an RGB uint8 array.
+
+        Frames are transferred in-memory over the UnrealCV socket unless the file transport was selected. If Unreal
+        does not send back bytes (e.g. older UnrealCV plugin), we fall back to the file transport.
+        """
+        transport = self.frame_transport
+        start = perf_counter()
+
+        frame = None
+        if transport != FrameTransport.FILE:
+            frame = self._capture_frame_in_memory(transport)
+
+            if frame is None:
+                logger.warning(f"In-memory frame transfer ({transport.value}) failed, falling back to file transport.")
+                transport = FrameTransport.FILE
+                self.frame_transport = FrameTransport.FILE
+
+        if frame is None:
+            frame = self._capture_frame_from_file()
+
+        latency = perf_counter() - start
+        self.glimpse_latencies[transport].append(latency)
+        logger.debug(f"Captured glimpse with {transport.value} transport in {latency * 1000:.1f} ms")
+
+        return frame
+
+    def _capture_frame_in_memory(self, transport: FrameTransport):
+        try:
+            response = self.client.request(f'vget /camera/1/lit {transport.value}')
+        except UnrealException:
+            return None
+
+        if not isinstance(response, (bytes, bytearray)):
+            return None
+
+        if transport == FrameTransport.NPY:
+            frame = self._decode_npy(response)
+        else:
+            frame = np.asarray(Image.open(io.BytesIO(response)).convert("RGB"))
+
+        return self._to_rgb(frame)
+
+    def _capture_frame_from_file(self) -> np.ndarray:
+        self.client.request(f'vget /camera/1/lit {self.frame_path}')
+
+        with Image.open(self.frame_path) as image:
+            frame = np.asarray(image.convert("RGB"))
+
+        return frame
+
+    @staticmethod
+    def _decode_npy(buffer: bytes | bytearray) -> np.ndarray:
+        """Decodes an .npy payload without copying its data: the array is a view of `buffer`."""
+        view = memoryview(buffer)
+
+        # Magic string (6 bytes) and version (2 bytes), followed by the length of the header (2 bytes in version 1.0,
+        # 4 bytes in later ones).
+        major_version = view[6]
+        length_size = 2 if major_version == 1 else 4
+        data_offset = 8 + length_size + int.from_bytes(view[8:8 + length_size], "little")
+
+        header = io.BytesIO(view[:data_offset].tobytes())
+        version = np.lib.format.read_magic(header)
+        read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+        shape, fortran_order, dtype = read_header(header)
+
+        frame = np.frombuffer(buffer, dtype=dtype, count=int(np.prod(shape)), offset=data_offset)
+        return frame.reshape(shape, order="F" if fortran_order else "C")
+
+    @staticmethod
+    def _to_rgb(frame: np.ndarray) -> np.ndarray:
+        # UnrealCV returns RGBA for lit captures; alpha carries no information for us.
+        if frame.ndim == 3 and frame.shape[2] == 4:
+            frame = frame[:, :, :3]
+
+        return np.ascontiguousarray(frame, dtype=np.uint8)
+
+    def get_glimpse_latency_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Summary of per-glimpse capture latency (in seconds) over the last `GLIMPSE_LATENCY_WINDOW` glimpses, for every
+        transport that delivered at least one frame. Useful for comparing in-memory and file-based frame transfer.
+        """
+        stats = {}
+
+        for transport, latencies in self.glimpse_latencies.items():
+            if not latencies:
+                continue
+
+            latencies_array = np.array(latencies)
+            stats[transport.value] = {
+                "count": len(latencies),
+                "mean": float(latencies_array.mean()),
+                "p50": float(np.percentile(latencies_array, 50)),
+                "p95": float(np.percentile(latencies_array, 95)),
+                "max": float(latencies_array.max()),
+            }
+
+        return stats
+
+    def get_camera_frame(self, rel_position_m: Tuple[int, int, int] = (0, 0, 0), force_move=False) -> Frame:
+        return Frame(self.__get_rgb(rel_position_m, force_move=force_move))
 
     def get_camera_image(self,
                          rel_position_m: Tuple[int, int, int] = (0, 0, 0), force_move=False) -> Image.Image:
-        return self.__get_img(rel_position_m, force_move=force_move)
+        return Image.fromarray(self.__get_rgb(rel_position_m, force_move=force_move))
 
 
 class UnrealGridGlimpseGenerator(UnrealGlimpseGenerator):
@@ -128,15 +384,16 @@ class UnrealGridGlimpseGenerator(UnrealGlimpseGenerator):
         self.splits_w = splits_w
         self.splits_h = splits_h
 
-    def get_camera_image(self,
-                         rel_position_m: Tuple[int, int, int] = (0, 0, 0), force_move=False) -> Image.Image:
-        img = super().get_camera_image(rel_position_m, force_move=force_move)
+    def get_camera_frame(self, rel_position_m: Tuple[int, int, int] = (0, 0, 0), force_move=False) -> Frame:
+        frame = super().get_camera_frame(rel_position_m, force_move=force_move)
         rel_position_m = self.get_relative_from_start()
-        img = pil_to_opencv(img)
-        img = dot_matrix_two_dimensional_unreal(img, self.splits_w, self.splits_h, drone_height=rel_position_m[2])
-        img = opencv_to_pil(img)
+        draw_unreal_grid(frame.rgb, self.splits_w, self.splits_h, drone_height=rel_position_m[2])
+
+        return frame
 
-        return img
+    def get_camera_image(self,
+                         rel_position_m: Tuple[int, int, int] = (0, 0, 0), force_move=False) -> Image.Image:
+        return self.get_camera_frame(rel_position_m, force_move=force_move).to_pil()
 
 
 class UnrealDescriptionGlimpseGenerator(UnrealGridGlimpseGenerator):
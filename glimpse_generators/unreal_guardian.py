@@ -1,15 +1,81 @@
 import os
 import pathlib
 import subprocess
+import threading
 
 from datetime import datetime
-from time import sleep
-from typing import IO, Optional, Sequence, Union
+from typing import IO, Dict, List, Optional, Sequence, Set, Tuple, Union
 import logging
 
+from glimpse_generators.readiness import ReadinessConfig, ReadinessTimeoutException, port_is_open, wait_until
+
 
 logger = logging.getLogger(__name__)
 
+# Snapshotting the taken ports and spawning a process happen together, so that a guardian doesn't take the port of a
+# process spawned before it for someone else's. Waiting for the server to start isn't serialized.
+_startup_lock = threading.Lock()
+
+# TCP connection state of listening sockets in /proc/net/tcp
+_TCP_LISTEN = "0A"
+
+
+def _descendant_pids(pid: int) -> Set[int]:
+    """The process and all of its descendants (e.g. the binary started by a launcher script)."""
+    children: Dict[int, List[int]] = {}
+
+    for stat_path in pathlib.Path("/proc").glob("[0-9]*/stat"):
+        try:
+            # The command name is in parentheses and may contain spaces, the parent pid comes right after it.
+            ppid = int(stat_path.read_text().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+
+        children.setdefault(ppid, []).append(int(stat_path.parent.name))
+
+    pids, stack = set(), [pid]
+    while stack:
+        current = stack.pop()
+        if current not in pids:
+            pids.add(current)
+            stack.extend(children.get(current, []))
+
+    return pids
+
+
+def listening_ports(pid: int) -> Optional[Set[int]]:
+    """
+    TCP ports the process (or its descendants) listens on, or None if it can't be told (no procfs, e.g. not Linux).
+    """
+    if not pathlib.Path("/proc/net/tcp").exists():
+        return None
+
+    socket_inodes = set()
+
+    for process_pid in _descendant_pids(pid):
+        try:
+            for fd in pathlib.Path(f"/proc/{process_pid}/fd").iterdir():
+                target = os.readlink(fd)
+                if target.startswith("socket:["):
+                    socket_inodes.add(target[len("socket:["):-1])
+        except OSError:
+            continue  # The process exited, or isn't ours to inspect
+
+    ports = set()
+
+    for table in ("/proc/net/tcp", "/proc/net/tcp6"):
+        try:
+            lines = pathlib.Path(table).read_text().splitlines()[1:]
+        except OSError:
+            continue
+
+        for line in lines:
+            fields = line.split()
+            if fields[3] == _TCP_LISTEN and fields[9] in socket_inodes:
+                ports.add(int(fields[1].rsplit(":", 1)[1], 16))
+
+    return ports
+
 
 class UnrealGuardian:
     """Lifecycle manager for the standalone Unreal simulation process.
@@ -17,6 +83,7 @@ class UnrealGuardian:
     - Spawns the Unreal binary with sensible defaults for headless rendering.
     - Streams stdout/stderr to a timestamped logfile under a configurable directory.
     - Provides reset semantics and liveness checks.
+    - Optionally keeps a second, already started process on standby, which replaces the main one on reset.
     """
 
     def __init__(
@@ -25,11 +92,31 @@ class UnrealGuardian:
         startup_wait_seconds: int = 120,
         extra_args: Optional[Sequence[str]] = None,
         log_dir_env_var: str = "UNREAL_LOG_PATH",
+        unrealcv_host: str = "localhost",
+        unrealcv_ports: Sequence[int] = tuple(range(9000, 9011)),
+        readiness_config: Optional[ReadinessConfig] = None,
+        standby: bool = False,
     ) -> None:
         self.process: Optional[subprocess.Popen[str]] = None
         self.unreal_binary_path = pathlib.Path(unreal_binary_path)
+        # Upper bound on the startup time; we stop waiting as soon as the UnrealCV server accepts connections.
         self.startup_wait_seconds = int(startup_wait_seconds)
         self.extra_args = list(extra_args) if extra_args is not None else []
+        self.log_dir_env_var = log_dir_env_var
+        self.unrealcv_host = unrealcv_host
+        self.unrealcv_ports = list(unrealcv_ports)
+        self.readiness_config = readiness_config or ReadinessConfig()
+        # Port on which the UnrealCV server of our process was detected, if any.
+        self.unrealcv_port: Optional[int] = None
+        self.restart_count = 0
+
+        # Standby process, warmed up in the background while the main one is in use.
+        self.standby = standby
+        self.standby_process: Optional[subprocess.Popen[str]] = None
+        self.standby_port: Optional[int] = None
+        self.standby_logfile: Optional[IO[str]] = None
+        self._standby_thread: Optional[threading.Thread] = None
+        self._standby_count = 0
 
         if not self.unreal_binary_path.is_file():
             raise FileNotFoundError(f"Unreal binary not found: {self.unreal_binary_path}")
@@ -37,8 +124,11 @@ class UnrealGuardian:
         self.logfile: IO[str] = self._create_logfile(log_dir_env_var)
         self._start_unreal()
 
-    def _create_logfile(self, log_dir_env_var: str) -> IO[str]:
-        base_file_name = datetime.now().strftime("%Y-%m-%d-%H:%M:%S-FlySearchUnreal.log")
+        if self.standby:
+            self._warm_standby()
+
+    def _create_logfile(self, log_dir_env_var: str, suffix: str = "") -> IO[str]:
+        base_file_name = datetime.now().strftime(f"%Y-%m-%d-%H:%M:%S-FlySearchUnreal{suffix}.log")
 
         env_dir = os.environ.get(log_dir_env_var)
         if env_dir and env_dir.strip():
@@ -52,6 +142,10 @@ class UnrealGuardian:
 
     def _start_unreal(self) -> None:
         logger.info("Guardian is starting Unreal process.")
+        self.process, self.unrealcv_port = self._launch(self.logfile)
+
+    def _launch(self, logfile: IO[str]) -> Tuple[subprocess.Popen, Optional[int]]:
+        """Starts an Unreal process and waits for its UnrealCV server. Returns the process and the detected port."""
         args = [
             str(self.unreal_binary_path),
             "-RenderOffscreen",
@@ -59,47 +153,147 @@ class UnrealGuardian:
             *self.extra_args,
         ]
 
-        self.process = subprocess.Popen(
-            args,
-            stdout=self.logfile,
-            stderr=subprocess.STDOUT,
+        with _startup_lock:
+            # Ports taken before our process started belong to someone else (e.g. another simulator on the same host).
+            taken_ports = {port for port in self.unrealcv_ports if port_is_open(self.unrealcv_host, port)}
+
+            process = subprocess.Popen(
+                args,
+                stdout=logfile,
+                stderr=subprocess.STDOUT,
+            )
+
+        # Processes launched concurrently (e.g. by a simulator pool) start at the same time, and each one recognizes
+        # its own port by the process listening on it.
+        detected_ports = []
+
+        try:
+            wait_until(
+                lambda: self._unrealcv_server_started(process, taken_ports, detected_ports),
+                "UnrealCV server to start",
+                self.startup_wait_seconds,
+                self.readiness_config,
+            )
+        except ReadinessTimeoutException:
+            logger.warning("UnrealCV server was not detected in time; trying to connect anyway.")
+
+        port = detected_ports[0] if detected_ports else None
+
+        if port is not None:
+            logger.info(f"UnrealCV server detected on port {port}.")
+
+        return process, port
+
+    def _unrealcv_server_started(self, process: subprocess.Popen, taken_ports, detected_ports) -> bool:
+        if process.poll() is not None:
+            logger.error("Unreal process exited during startup.")
+            # Nothing to wait for; connecting will fail just like it would after the fixed sleep we used to have.
+            return True
+
+        own_ports = listening_ports(process.pid)
+
+        for port in self.unrealcv_ports:
+            if port in taken_ports:
+                continue
+
+            # Without procfs, the first newly opened port is assumed to be ours, which may be wrong if other processes
+            # are starting at the same time.
+            if port in own_ports if own_ports is not None else port_is_open(self.unrealcv_host, port):
+                detected_ports.append(port)
+                return True
+
+        return False
+
+    def _warm_standby(self) -> None:
+        self._standby_count += 1
+        self.standby_logfile = self._create_logfile(self.log_dir_env_var, f"-standby-{self._standby_count}")
+
+        def warm():
+            logger.info("Guardian is warming up a standby Unreal process.")
+            self.standby_process, self.standby_port = self._launch(self.standby_logfile)
+
+        self._standby_thread = threading.Thread(target=warm, daemon=True)
+        self._standby_thread.start()
+
+    def _promote_standby(self) -> bool:
+        """Replaces the main process with the standby one, if it's usable. Returns whether it was."""
+        if self._standby_thread is None:
+            return False
+
+        # If the standby is still starting, it's still closer to being ready than a fresh process would be.
+        self._standby_thread.join()
+        self._standby_thread = None
+
+        standby_ready = (
+            self.standby_process is not None
+            and self.standby_process.poll() is None
+            and self.standby_port is not None
         )
 
-        # Give the process time to initialize and start the UnrealCV server.
-        sleep(self.startup_wait_seconds)
+        if not standby_ready:
+            logger.warning("Standby Unreal process is not usable, starting a new one instead.")
+            self._terminate(self.standby_process)
+            self._close_logfile(self.standby_logfile)
+            self.standby_process, self.standby_port, self.standby_logfile = None, None, None
+            return False
 
-    def _terminate_process(self) -> None:
-        if self.process is None:
+        logger.info(f"Guardian is switching to the standby Unreal process on port {self.standby_port}.")
+        self._close_logfile(self.logfile)
+        self.process, self.unrealcv_port, self.logfile = self.standby_process, self.standby_port, self.standby_logfile
+        self.standby_process, self.standby_port, self.standby_logfile = None, None, None
+
+        return True
+
+    @staticmethod
+    def _terminate(process: Optional[subprocess.Popen]) -> None:
+        if process is None or process.poll() is not None:
             return
-        if self.process.poll() is None:
-            try:
-                self.process.terminate()
-                self.process.wait(timeout=10)
-            except subprocess.TimeoutExpired:
-                self.process.kill()
-            finally:
-                self.process = None
-        else:
-            self.process = None
+        try:
+            process.terminate()
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    def _terminate_process(self) -> None:
+        self._terminate(self.process)
+        self.process = None
+
+    @staticmethod
+    def _close_logfile(logfile: Optional[IO[str]]) -> None:
+        try:
+            if logfile is not None and not logfile.closed:
+                logfile.close()
+        except Exception as ex:
+            logger.error(f"Error closing logfile: {ex}")
 
     def reset(self) -> None:
         logger.info("Guardian is resetting Unreal process.")
+        self.restart_count += 1
         self._terminate_process()
-        self._start_unreal()
+
+        if not (self.standby and self._promote_standby()):
+            self._start_unreal()
+
+        if self.standby:
+            self._warm_standby()
 
     def stop(self) -> None:
         """Gracefully stop the Unreal process."""
         logger.info("Guardian is stopping Unreal process.")
         self._terminate_process()
 
+        if self._standby_thread is not None:
+            self._standby_thread.join()
+            self._standby_thread = None
+
+        self._terminate(self.standby_process)
+        self.standby_process, self.standby_port = None, None
+
     def close(self) -> None:
         """Stop the process and close the logfile handle."""
         self.stop()
-        try:
-            if not self.logfile.closed:
-                self.logfile.close()
-        except Exception as ex:
-            logger.error(f"Error closing logfile: {ex}")
+        self._close_logfile(self.logfile)
+        self._close_logfile(self.standby_logfile)
 
     @property
     def is_alive(self) -> bool:
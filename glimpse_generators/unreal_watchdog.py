@@ -0,0 +1,71 @@
+import logging
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from time import monotonic
+from typing import Callable, Optional
+
+from glimpse_generators.unrealcv_fix import Client
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_COMMAND = "vget /unrealcv/status"
+
+
+class UnrealWatchdog:
+    """
+    Detects simulators that are alive (so the guardian doesn't notice anything), but hung. Once no response has arrived
+    for `interval_seconds`, a heartbeat is sent; if it isn't answered within `deadline_seconds`, the connection is
+    aborted. Requests in flight then fail, and the client wrapper restarts the simulator on the next request.
+
+    `get_client` returns the current client, as it's replaced whenever the simulator restarts.
+    """
+
+    def __init__(self, get_client: Callable[[], Optional[Client]], interval_seconds: float, deadline_seconds: float):
+        self.get_client = get_client
+        self.interval_seconds = interval_seconds
+        self.deadline_seconds = deadline_seconds
+        self.stalls_detected = 0
+
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="UnrealWatchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        # Checks are frequent enough for a stall to be detected at most a fraction of the interval late.
+        while not self._stopped.wait(min(self.interval_seconds / 4, 1.0)):
+            self.check()
+
+    def check(self) -> bool:
+        """Sends a heartbeat if one is due. Returns whether the simulator is considered responsive."""
+        client = self.get_client()
+
+        if client is None or not client.isconnected() or client.aborted:
+            return True
+
+        if monotonic() - client.last_progress < self.interval_seconds:
+            return True
+
+        try:
+            client.request_async(HEARTBEAT_COMMAND).result(timeout=self.deadline_seconds)
+            return True
+        except (FutureTimeoutError, TimeoutError, ConnectionError):
+            # The client may have been replaced (and the old one aborted) in the meantime, which isn't a stall.
+            if client is not self.get_client() or client.aborted:
+                return True
+
+        self.stalls_detected += 1
+        logger.error(f"Simulator didn't answer a heartbeat within {self.deadline_seconds}s, aborting the connection.")
+        client.abort()
+
+        return False
@@ -28,19 +28,18 @@ SOFTWARE.
 
 import ctypes
 import logging
-import re
 import socket
 import struct
 import sys
 import threading
 import time
-import signal
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 
 # try:
 #     from Queue import Queue
 # except:
 #     from queue import Queue # for Python 3
-from queue import SimpleQueue
+from queue import Empty, SimpleQueue
 
 _L = logging.getLogger(__name__)
 # _L.addHandler(logging.NullHandler()) # Let client to decide how to do logging
@@ -62,41 +61,49 @@ class SocketMessage:
     """
 
     magic = ctypes.c_uint32(0x9E2B83C1).value
-    fmt = 'I'
+    # Frame header: magic number and payload size.
+    header = struct.Struct('II')
 
     def __init__(self, payload):
         self.payload_size = ctypes.c_uint32(len(payload)).value
 
+    @staticmethod
+    def _receive_into(sock, view):
+        """
+        Fills `view` (a memoryview) with data from `sock`, without intermediate copies.
+        Returns False if the socket was closed before that.
+        """
+        while len(view) > 0:
+            bytes_read = sock.recv_into(view)
+            if not bytes_read:
+                return False
+            view = view[bytes_read:]
+
+        return True
+
     @classmethod
     def ReceivePayload(cls, sock):
         """
-        Return only payload, not the raw message, None if failed.
+        Return only payload (as a bytearray), not the raw message, None if failed.
         sock: a blocking socket for read data.
+        The payload is received directly into a buffer preallocated for its size, as replies can be multi-megabyte images.
         """
-        # print(sock.gettimeout())
-        # rbufsize = -1 # From SocketServer.py
-        # rbufsize = 0
-        # rfile = sock.makefile('rb', rbufsize)
+        header = bytearray(cls.header.size)
+
         try:
-            # raw_magic = rfile.read(4) # socket is disconnected or invalid
-            raw_magic = b''
-            while len(raw_magic) < 4:
-                recv_data = sock.recv(4)
-                if not recv_data:
-                    # socket closed by server
-                    print('Warning: socket disconnected by server')
-                    break
-                raw_magic += recv_data
+            if not cls._receive_into(sock, memoryview(header)):
+                # socket closed by server
+                print('Warning: socket disconnected by server')
+                return None
+        except socket.timeout:
+            # The server is alive (connected), but doesn't answer; the caller decides what to do about it.
+            raise
         except Exception as e:
-            print(f'fail to read raw_magic, exception: {e}')
-            _L.debug('Fail to read raw_magic, exception: "%s"', e)
-            raw_magic = None
-
-        if not raw_magic:
-            # _L.debug('socket disconnect by server')
+            print(f'fail to read message header, exception: {e}')
+            _L.debug('Fail to read message header, exception: "%s"', e)
             return None
 
-        magic = struct.unpack(cls.fmt, raw_magic)[0]  # 'I' means unsigned int
+        magic, payload_size = cls.header.unpack(header)
         if magic != cls.magic:
             print(
                 'Error: receive a malformat message, the message should start from a four bytes uint32 magic number'
@@ -106,33 +113,11 @@ class SocketMessage:
             )
             print('Actually received magic message: %s', repr(magic))
             return None
-            # The next time it will read four bytes again
 
-        # _L.debug('read payload')
-        # raw_payload_size = rfile.read(4)
-        raw_payload_size = sock.recv(4)
-        if not raw_payload_size:
-            print('Warning: socket disconnected by server')
+        payload = bytearray(payload_size)
+        if not cls._receive_into(sock, memoryview(payload)):
+            print('recv data is None!')
             return None
-        # print 'Receive raw payload size: %d, %s' % (len(raw_payload_size), raw_payload_size)
-        payload_size = struct.unpack('I', raw_payload_size)[0]
-        # _L.debug('Receive payload size %d', payload_size)
-
-        # if the message is incomplete, should wait until all the data received
-        payload = b''
-        remain_size = payload_size
-        while remain_size > 0:
-            # data = rfile.read(remain_size)
-            data = sock.recv(remain_size)
-            if not data:
-                print('recv data is None!')
-                return None
-
-            payload += data
-            bytes_read = len(data)  # len(data) is its string length, but we want length of bytes
-            # print 'bytes_read %d, remain_size %d, read_str %s' % (bytes_read, remain_size, data)
-            assert bytes_read <= remain_size
-            remain_size -= bytes_read
 
         return payload
 
@@ -140,26 +125,10 @@ class SocketMessage:
     def WrapAndSendPayload(cls, sock, payload):
         """
         Send payload, true if success, false if failed
+        The whole frame is sent with a single call (requests are small, so joining header and payload is cheap).
         """
         try:
-            # From SocketServer.py
-            # wbufsize = 0, flush immediately
-            wbufsize = -1
-            # Convert
-            socket_message = SocketMessage(payload)
-            wfile = sock.makefile('wb', wbufsize)
-            # Write the message
-            wfile.write(struct.pack(cls.fmt, socket_message.magic))
-            # Need to send the packed version
-            # print 'Sent ', socket_message.magic
-
-            wfile.write(struct.pack(cls.fmt, socket_message.payload_size))
-            # print 'Sent ', socket_message.payload_size
-
-            wfile.write(payload)
-            # print 'Sent ', payload
-            wfile.flush()
-            wfile.close()  # Close file object, not close the socket
+            sock.sendall(cls.header.pack(cls.magic, len(payload)) + payload)
             return True
         except Exception as e:
             print(f'Fail to send message {e}')
@@ -183,26 +152,33 @@ class Client:
     More clients will be rejected
     """
 
-    def __init__(self, endpoint, type='inet'):
+    def __init__(self, endpoint, type='inet', socket_timeout=None):
         """
         Parameters:
         endpoint: a tuple (ip, port)
         type: unix or inet
+        socket_timeout: timeout of socket operations once connected (None blocks forever)
         """
         self.endpoint = endpoint
         self.sock = None  # if socket == None, means client is not connected
-        self.raw_message_regexp = re.compile(rb'(\d{1,}):(.*)')  # A binary regexp
         # self.message_id = 0
         self.wait_response = threading.Event()
         self.send_message_id = 0
         self.recv_message_id = 0
         self.recv_num_q = SimpleQueue()  # inf
-        self.recv_data_q = SimpleQueue()  # inf
         self.type = type
-
-    @staticmethod
-    def _alarm_handler(*_):
-        raise TimeoutError()
+        # Sending a message and registering its response slot must happen atomically, so that responses (which arrive in
+        # the same order as requests) are matched with the right futures even when many requests are in flight.
+        self.send_lock = threading.Lock()
+        # Connecting and disconnecting (which start and stop the receive thread) are serialized as well.
+        self.connection_lock = threading.Lock()
+        self.socket_timeout = socket_timeout
+        # Set once the connection is known to be unusable (e.g. the server stopped answering); requests then fail fast.
+        self.aborted = False
+        # Number of requests waiting for a response, and when the last response arrived (or, if there were no requests
+        # in flight, when the first of the current ones was sent). Used to detect a server that stopped answering.
+        self.pending_requests = 0
+        self.last_progress = time.monotonic()
 
     # TODO: async send
     def send(self, message):
@@ -216,14 +192,18 @@ class Client:
             return False
 
     def raw_message_handler(self, raw_message):
-        match = self.raw_message_regexp.match(raw_message)
+        # Message ids are short, so the separator is looked for only at the start of (possibly huge) messages.
+        separator = raw_message.find(b':', 0, 32)
 
-        if match:
-            [message_id, message_body] = (
-                int(match.group(1)),
-                match.group(2),
-            )
-            message_body = raw_message[len(match.group(1)) + 1 :]
+        if separator > 0 and raw_message[:separator].isdigit():
+            message_id = int(raw_message[:separator])
+
+            if isinstance(raw_message, bytearray):
+                # Dropping the start of a bytearray doesn't copy the rest, so (binary) bodies are never copied.
+                del raw_message[:separator + 1]
+                message_body = raw_message
+            else:
+                message_body = raw_message[separator + 1:]
             # Convert to utf-8 if it's not a byte array (as is the case for images)
             try:
                 message_body = message_body.decode('utf-8')
@@ -240,64 +220,64 @@ class Client:
 
     def connect(self, timeout=5):
         """
-        Try to connect to server, return whether connection successful
+        Try to connect to server, return whether connection successful.
+        Raises ConnectionError if the server accepts the connection, but doesn't confirm it within `timeout` seconds.
+        Only socket timeouts are used (no signals), so clients can be connected from any thread.
         """
-        if self.isconnected():
-            return True
+        with self.connection_lock:
+            if self.isconnected():
+                return True
 
-        signal.signal(signal.SIGALRM, self._alarm_handler)
-        signal.alarm(timeout)
-
-        try:
-            if self.type == 'unix':
-                print('=>Info: using uds socket')
-                s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-            elif self.type == 'inet':
-                print('=>Info: using ip-port socket')
-                s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            else:
-                raise NotImplementedError
-            # Make the socket working in the blocking mode
-            s.connect(self.endpoint)
-            self.sock = s
-            _L.debug('BaseClient: wait for connection confirm')
-
-            message = SocketMessage.ReceivePayload(self.sock)
-            if message is not None:
-                if message.startswith(b'connected'):
-                    _L.info('Got connection confirm: %s', repr(message))
-
-                    # start receive queue here
-                    self.t = threading.Thread(target=self.receive_loop_queue)
-                    self.t.start()
-
-                    return True
-
-            # self.sock = None
-            self.disconnect()
-            _L.error(
-                'Socket is created, but can not get connection confirm from %s. Disconnect!',
-                self.endpoint,
-            )
-            return False
-
-            # only assign self.socket to connected socket
-            # so it is safe to use self.socket != None to check connection status
-            # This does not neccessarily mean connection successful, might be closed by server
-            # Unless explicitly to tell the server to accept new socket
-
-        except TimeoutError:
-            # There is an Unreal instance here, BUT it already managed to die. We need to tell the other parts of the code to deal with it.
-            raise ConnectionError
-        except Exception as e:
-            _L.error('Can not connect to %s', str(self.endpoint))
-            _L.error('Error %s', e)
-            self.disconnect()
-            # self.sock = None
-            return False
-        finally:
-            signal.alarm(0)
+            try:
+                if self.type == 'unix':
+                    _L.debug('BaseClient: using uds socket')
+                    s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                elif self.type == 'inet':
+                    _L.debug('BaseClient: using ip-port socket')
+                    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                else:
+                    raise NotImplementedError
+                s.settimeout(timeout)
+                s.connect(self.endpoint)
+                self.sock = s
+                _L.debug('BaseClient: wait for connection confirm')
+
+                message = SocketMessage.ReceivePayload(self.sock)
+                s.settimeout(self.socket_timeout)
+                if message is not None:
+                    if message.startswith(b'connected'):
+                        _L.info('Got connection confirm: %s', repr(message))
+
+                        # start receive queue here
+                        self.aborted = False
+                        self.t = threading.Thread(target=self.receive_loop_queue, daemon=True)
+                        self.t.start()
+
+                        return True
 
+                # self.sock = None
+                self._disconnect()
+                _L.error(
+                    'Socket is created, but can not get connection confirm from %s. Disconnect!',
+                    self.endpoint,
+                )
+                return False
+
+                # only assign self.socket to connected socket
+                # so it is safe to use self.socket != None to check connection status
+                # This does not neccessarily mean connection successful, might be closed by server
+                # Unless explicitly to tell the server to accept new socket
+
+            except TimeoutError:
+                # There is an Unreal instance here, BUT it already managed to die. We need to tell the other parts of the code to deal with it.
+                self._disconnect()
+                raise ConnectionError
+            except Exception as e:
+                _L.error('Can not connect to %s', str(self.endpoint))
+                _L.error('Error %s', e)
+                self._disconnect()
+                # self.sock = None
+                return False
 
     def isconnected(self):
         """Check whether client is connected to server"""
@@ -305,27 +285,32 @@ class Client:
 
     def disconnect(self):
         """Disconnect from server"""
-        if self.isconnected():
+        with self.connection_lock:
+            self._disconnect()
+
+    def _disconnect(self):
+        sock = self.sock
+
+        if sock is not None:
             _L.debug(
                 'BaseClient, request disconnect from server in %s',
                 threading.current_thread().name,
             )
 
             try:
-                self.sock.shutdown(socket.SHUT_RD)
+                sock.shutdown(socket.SHUT_RD)
             except OSError:
                 # Already shut down
                 pass
             # Because socket is on read in __receiving thread, need to call shutdown to force it to close
-            if self.sock:  # This may also be set to None in the __receiving thread
-                self.sock.close()
-                self.sock = None
+            sock.close()
+            self.sock = None
             time.sleep(0.1)
 
-        if getattr(self, 't', None):
-            if self.t.is_alive():
-                self.recv_num_q.put(None)
-                self.t.join()
+        thread = getattr(self, 't', None)
+        if thread is not None and thread.is_alive() and thread is not threading.current_thread():
+            self.recv_num_q.put(None)
+            thread.join()
 
     def receive(self):
         """
@@ -341,59 +326,96 @@ class Client:
             # _L.debug('Got server raw message with length %d', len(message))
 
             if not message:
-                print('BaseClient: remote disconnected, no more message')
+                # The server closed the connection (e.g. the simulator died) or we aborted it. Requests can't be
+                # matched with responses across connections, so it's up to the caller to reconnect.
                 _L.debug('BaseClient: remote disconnected, no more message')
-                # self.sock = None
-                self.disconnect()
-
-                # try reconnect
-                print('try reconnecting!')
-                for _ in range(5):
-                    flag = self.connect()
-                    if flag:
-                        print('reconnect succeed!')
-                        break
-                    else:
-                        print('reconnect fail! sleep 1s and retry...')
-                        time.sleep(1)
-                print('disconnecting...')
-                self.disconnect()
-                assert 0, 'exit because of abnormal disconnection'
+                raise ConnectionError('connection was closed')
 
             return message
 
     def receive_loop_queue(self):
         while True:
-            num = self.recv_num_q.get()
+            future = self.recv_num_q.get()
 
             # quit signal
-            if num is None:
+            if future is None:
                 break
 
-            if num < 0:
-                # need results
-                for _ in range(-num):
-                    raw_message = self.receive()
-                    message = self.raw_message_handler(raw_message)
-                    self.recv_message_id += (
-                        1  # Increment it only after the request/response cycle finished
-                    )
-                    self.recv_data_q.put(message)
-            else:
-                # do not need results
-                for _ in range(num):
-                    raw_message = self.receive()
-                    self.recv_message_id += 1
+            # the future is resolved with the response to the oldest message in flight
+            try:
+                raw_message = self.receive()
+                message = self.raw_message_handler(raw_message)
+                self.recv_message_id += 1
+                self._record_response()
+                future.set_result(message)
+            except BaseException as e:
+                future.set_exception(ConnectionError(f'failed to receive response: {e}'))
+                # Responses can't be matched with requests anymore.
+                self._fail_pending_requests()
+                break
 
+    def _record_response(self):
+        with self.send_lock:
+            self.pending_requests -= 1
+            self.last_progress = time.monotonic()
 
-    def request(self, message, timeout=5):
-        signal.signal(signal.SIGALRM, self._alarm_handler)
-        signal.alarm(timeout)
+    def _fail_pending_requests(self):
+        with self.send_lock:
+            self.aborted = True
 
-        try:
-            if sys.version_info[0] == 3:
-                if not isinstance(message, bytes):
-                    message = message.encode('utf-8')
+            while True:
+                try:
+                    future = self.recv_num_q.get_nowait()
+                except Empty:
+                    break
+
+                if future is not None:
+                    future.set_exception(ConnectionError('connection was aborted'))
+
+            self.pending_requests = 0
+
+    def abort(self):
+        """
+        Gives up on the connection, e.g. because the server stopped answering: requests in flight fail with
+        ConnectionError, and so do the following ones. Safe to call from any thread.
+        """
+        with self.send_lock:
+            self.aborted = True
+            # Lets the receive thread quit, once it fails the requests in flight.
+            self.recv_num_q.put(None)
+
+        sock = self.sock
+
+        if sock is not None:
+            try:
+                # Wakes the receive thread up.
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def stalled_for(self):
+        """Seconds for which requests have been waiting for a response without any arriving (0 if none are waiting)."""
+        with self.send_lock:
+            if self.pending_requests == 0:
+                return 0.0
+
+            return time.monotonic() - self.last_progress
+
+    def request_async(self, message):
+        """
+        Send a message without waiting for the response.
+        Returns a concurrent.futures.Future that is resolved with the response by the receive thread.
+        Responses are matched to requests by message id, so many requests can be in flight at once.
+        """
+        if sys.version_info[0] == 3:
+            if not isinstance(message, bytes):
+                message = message.encode('utf-8')
+
+        future = Future()
+
+        with self.send_lock:
+            if self.aborted:
+                raise ConnectionError('connection was aborted')
 
             raw_message = b'%d:%s' % (self.send_message_id, message)
             # _L.debug('Request: %s', raw_message.decode("utf-8"))
@@ -403,14 +425,30 @@ class Client:
 
             self.send_message_id += 1
 
-            self.recv_num_q.put(-1)  # negative number indicates need results
-            message = self.recv_data_q.get()
+            if self.pending_requests == 0:
+                self.last_progress = time.monotonic()
+            self.pending_requests += 1
 
-            return message
-        except TimeoutError:
+            self.recv_num_q.put(future)
+
+        return future
+
+    def request(self, message, timeout=5):
+        return self.request_many([message], timeout=timeout)[0]
+
+    def request_many(self, messages, timeout=5):
+        """
+        Send a batch of independent messages back-to-back and wait for all of their responses.
+        Returns the responses in the same order as the messages. Timeout (in seconds, may be fractional) applies to the
+        whole batch.
+        """
+        try:
+            futures = [self.request_async(message) for message in messages]
+
+            deadline = time.monotonic() + timeout
+            return [future.result(timeout=max(deadline - time.monotonic(), 0)) for future in futures]
+        except (TimeoutError, FutureTimeoutError):
             raise ConnectionError()
-        finally:
-            signal.alarm(0)
 
 # To use IPC on Unix, set this path to: /tmp/unrealcv_{portnum}.socket
 # Your executable will create this file on startup.
@@ -1,9 +1,17 @@
 import os
+from functools import lru_cache
+from typing import NamedTuple, Tuple
 
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 
 
+@lru_cache(maxsize=None)
+def load_font(path: str, size: int) -> ImageFont.FreeTypeFont:
+    """Fonts are parsed once per (file, size)."""
+    return ImageFont.truetype(path, size)
+
+
 def get_system_font(size: int) -> ImageFont.FreeTypeFont:
     """
     Load font with priority: FONT_LOCATION env var, then NotoSerif-Bold.
@@ -14,7 +22,7 @@ def get_system_font(size: int) -> ImageFont.FreeTypeFont:
     if font_location:
         if os.path.exists(font_location):
             try:
-                return ImageFont.truetype(font_location, size)
+                return load_font(font_location, size)
             except (OSError, IOError) as e:
                 raise ValueError(f"Cannot load font from FONT_LOCATION '{font_location}': {e}")
         else:
@@ -34,7 +42,7 @@ def get_system_font(size: int) -> ImageFont.FreeTypeFont:
     for font_path in noto_serif_bold_paths:
         if os.path.exists(font_path):
             try:
-                return ImageFont.truetype(font_path, size)
+                return load_font(font_path, size)
             except (OSError, IOError):
                 continue
     
@@ -101,33 +109,36 @@ def carthesian(x, y):
             yield el_x, el_y
 
 
-# It doesn't render dots on the edges of the image.
-def dot_matrix_two_dimensional_unreal(img: np.ndarray, w_dots, h_dots, pixel_per_unit=0.42, drone_height=100):
-    def get_opposite_color(pixel_color):
-        if pixel_color[0] + pixel_color[1] + pixel_color[2] >= 255 * 3 / 2:
-            opposite_color = (0, 0, 0)
-        else:
-            opposite_color = (255, 255, 255)
+class DotSprite(NamedTuple):
+    """A dot of the grid with its label, pre-rendered as an alpha mask placed at (`top`, `left`) of the image."""
+    top: int
+    left: int
+    inverse_mask: np.ndarray  # 255 - alpha, (h, w, 1)
+    white_term: np.ndarray  # 255 * alpha + 128, i.e. the colour's part of PIL's blend when drawing in white
+    sample: Tuple[int, int]  # (row, column) of the pixel whose brightness decides between black and white
 
-        return opposite_color
 
-    img = from_opencv_to_pil(img)
-    width, height = img.size
+class UnrealGridSprites(NamedTuple):
+    sprites: Tuple[DotSprite, ...]
+    sample_rows: np.ndarray
+    sample_columns: np.ndarray
 
-    assert width == height
+
+@lru_cache(maxsize=256)
+def get_unreal_grid_sprites(resolution: int, w_dots: int, h_dots: int, drone_height) -> UnrealGridSprites:
+    """
+    Renders the dots and labels of `dot_matrix_two_dimensional_unreal` once per (resolution, grid, altitude). Labels
+    depend on the altitude only, so the glimpses of an episode reuse a handful of these.
+    """
+    width = height = resolution
 
     # FIXME: This code ignores the pixel_per_unit parameter and assumes camera FOV=90 degrees
-    # pixel_per_unit = (drone_height / 100) * pixel_per_unit
     pixel_per_unit = (2 * drone_height) / width
 
     # Unit -> unit used inside of Unreal Engine
     # Pixel -> pixel used in the image
     # Cell -> cell in the grid
 
-    if img.mode != 'RGB':
-        img = img.convert('RGB')
-    draw = ImageDraw.Draw(img, 'RGB')
-
     font = get_system_font(width // 40)  # Adjust font size if needed; default == width // 40
 
     pixels_per_cell_w = width / w_dots
@@ -136,34 +147,68 @@ def dot_matrix_two_dimensional_unreal(img: np.ndarray, w_dots, h_dots, pixel_per
     w_center = w_dots / 2
     h_center = h_dots / 2
 
+    sprites = []
+
     for x, y in carthesian(range(1, w_dots), range(1, h_dots)):
         x_diff = x - w_center
         y_diff = h_center - y
 
-        x_diff_px = x_diff * pixels_per_cell_w
-        y_diff_px = y_diff * pixels_per_cell_h
-
-        x_diff_unit = x_diff_px * pixel_per_unit
-        y_diff_unit = y_diff_px * pixel_per_unit
-
-        x_diff_unit = int(round(x_diff_unit))
-        y_diff_unit = int(round(y_diff_unit))
+        x_diff_unit = int(round(x_diff * pixels_per_cell_w * pixel_per_unit))
+        y_diff_unit = int(round(y_diff * pixels_per_cell_h * pixel_per_unit))
 
         x_px = x * pixels_per_cell_w
         y_px = y * pixels_per_cell_h
 
-        pixel_color = img.getpixel((x_px, y_px))
-        opposite_color = get_opposite_color(pixel_color)
+        # Drawn exactly as it used to be drawn on the image, so that only compositing is left per glimpse.
+        layer = Image.new("L", (width, height), 0)
+        draw = ImageDraw.Draw(layer)
 
         circle_radius = width // 240
         draw.ellipse([(x_px - circle_radius, y_px - circle_radius), (x_px + circle_radius, y_px + circle_radius)],
-                     fill=opposite_color)
+                     fill=255)
+        draw.text((x_px + 3, y_px), f"({x_diff_unit}, {y_diff_unit})", fill=255, font=font)
 
-        text_x_px, text_y_px = x_px + 3, y_px
+        left, top, right, bottom = layer.getbbox()
+        mask = np.array(layer.crop((left, top, right, bottom)), dtype=np.uint32)[:, :, np.newaxis]
 
-        draw.text((text_x_px, text_y_px), f"({x_diff_unit}, {y_diff_unit})", fill=opposite_color, font=font)
+        # Pixel sampled by the PIL implementation (which truncates coordinates).
+        sample = (min(int(y_px), height - 1), min(int(x_px), width - 1))
 
-    return from_pil_to_opencv(img)
+        sprites.append(DotSprite(top, left, 255 - mask, 255 * mask + 128, sample))
+
+    sample_rows, sample_columns = np.array([sprite.sample for sprite in sprites], dtype=np.intp).reshape(-1, 2).T
+
+    return UnrealGridSprites(tuple(sprites), sample_rows, sample_columns)
+
+
+def draw_unreal_grid(img: np.ndarray, w_dots, h_dots, drone_height=100) -> np.ndarray:
+    """
+    Draws the grid of `dot_matrix_two_dimensional_unreal` onto `img` (RGB or BGR) in place and returns it.
+    """
+    height, width = img.shape[:2]
+
+    assert width == height
+
+    grid = get_unreal_grid_sprites(width, w_dots, h_dots, drone_height)
+
+    # Black dots on bright spots and white ones elsewhere, decided for all dots at once on the image as captured.
+    brightness = img[grid.sample_rows, grid.sample_columns, :3].sum(axis=1, dtype=np.int32)
+    white = brightness < 255 * 3 / 2
+
+    for sprite, is_white in zip(grid.sprites, white):
+        mask_height, mask_width = sprite.inverse_mask.shape[:2]
+        region = img[sprite.top:sprite.top + mask_height, sprite.left:sprite.left + mask_width]
+
+        # PIL's blend of the region with the colour, using the sprite as the alpha channel.
+        blended = region * sprite.inverse_mask + (sprite.white_term if is_white else 128)
+        region[...] = (blended + (blended >> 8)) >> 8
+
+    return img
+
+
+# It doesn't render dots on the edges of the image.
+def dot_matrix_two_dimensional_unreal(img: np.ndarray, w_dots, h_dots, pixel_per_unit=0.42, drone_height=100):
+    return draw_unreal_grid(np.array(img, dtype=np.uint8), w_dots, h_dots, drone_height=drone_height)
 
 
 def from_pil_to_opencv(image):
@@ -1,10 +1,67 @@
+from typing import Optional
+
 import numpy as np
 from PIL import Image
 
 
+class Frame(np.ndarray):
+    """
+    An image in OpenCV (BGR) channel order, as observations always were, that is a reversed-channel view of an RGB
+    buffer. Getting the RGB buffer or a PIL image back doesn't convert it again: `rgb` is the buffer itself, and the PIL
+    image is made once and shared by everyone asking for it (the agent, the loggers...). Hence, frames must not be
+    modified in place once `to_pil` was called.
+    """
+
+    _rgb: Optional[np.ndarray]
+    _pil: Optional[Image.Image]
+
+    def __new__(cls, rgb: np.ndarray) -> "Frame":
+        frame = rgb[:, :, ::-1].view(cls)
+        frame._rgb = rgb
+
+        return frame
+
+    def __array_finalize__(self, obj) -> None:
+        # Slices and results of operations are plain BGR data; the buffer and the PIL image belong to the frame only.
+        self._rgb = None
+        self._pil = None
+
+    def __array_wrap__(self, array, context=None, return_scalar=False):
+        # Only results that are still images are frames; reductions and the like are plain arrays (or scalars).
+        if array.ndim == 3 and array.shape[2] == 3:
+            return super().__array_wrap__(array, context, return_scalar)
+
+        array = array.view(np.ndarray)
+
+        return array[()] if return_scalar else array
+
+    @classmethod
+    def from_pil(cls, image: Image.Image) -> "Frame":
+        frame = cls(np.array(image.convert("RGB") if image.mode != "RGB" else image))
+        frame._pil = image if image.mode == "RGB" else None
+
+        return frame
+
+    @property
+    def rgb(self) -> np.ndarray:
+        if self._rgb is None:
+            return np.ascontiguousarray(self.view(np.ndarray)[:, :, ::-1])
+
+        return self._rgb
+
+    def to_pil(self) -> Image.Image:
+        if self._pil is None:
+            self._pil = Image.fromarray(self.rgb)
+
+        return self._pil
+
+
 def pil_to_opencv(image: Image.Image) -> np.ndarray:
-    return np.array(image)[:, :, ::-1].copy()
+    return Frame.from_pil(image)
 
 
 def opencv_to_pil(image: np.ndarray) -> Image.Image:
+    if isinstance(image, Frame):
+        return image.to_pil()
+
     return Image.fromarray(image[:, :, ::-1].copy())
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from misc.add_guardrails import carthesian, dot_matrix_two_dimensional_unreal, get_system_font
+
+
+def draw_with_pil(img: np.ndarray, w_dots, h_dots, drone_height):
+    """How the grid was drawn before it was pre-rendered: dot by dot, straight onto the image."""
+    image = Image.fromarray(img)
+    draw = ImageDraw.Draw(image, "RGB")
+    width, height = image.size
+    font = get_system_font(width // 40)
+
+    pixel_per_unit = (2 * drone_height) / width
+    cell_w, cell_h = width / w_dots, height / h_dots
+
+    for x, y in carthesian(range(1, w_dots), range(1, h_dots)):
+        x_unit = int(round((x - w_dots / 2) * cell_w * pixel_per_unit))
+        y_unit = int(round((h_dots / 2 - y) * cell_h * pixel_per_unit))
+        x_px, y_px = x * cell_w, y * cell_h
+
+        colour = (0, 0, 0) if sum(image.getpixel((x_px, y_px))) >= 255 * 3 / 2 else (255, 255, 255)
+        radius = width // 240
+        draw.ellipse([(x_px - radius, y_px - radius), (x_px + radius, y_px + radius)], fill=colour)
+        draw.text((x_px + 3, y_px), f"({x_unit}, {y_unit})", fill=colour, font=font)
+
+    return np.array(image)
+
+
+class TestDotMatrixTwoDimensionalUnreal:
+    @pytest.mark.parametrize("resolution, drone_height", [(500, 37), (1000, 120), (256, 10)])
+    def test_matches_drawing_with_pil(self, resolution, drone_height):
+        img = np.random.default_rng(0).integers(0, 256, (resolution, resolution, 3), dtype=np.uint8)
+        img[:, resolution // 2:] //= 4  # Dark half, so that both colours are used
+
+        expected = draw_with_pil(img, 6, 6, drone_height)
+
+        assert np.array_equal(dot_matrix_two_dimensional_unreal(img, 6, 6, drone_height=drone_height), expected)
+
+    def test_input_is_left_untouched(self):
+        img = np.full((500, 500, 3), 200, dtype=np.uint8)
+        result = dot_matrix_two_dimensional_unreal(img, 6, 6, drone_height=50)
+
+        assert np.all(img == 200)
+        assert np.any(result == 0)
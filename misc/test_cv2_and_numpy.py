@@ -0,0 +1,57 @@
+import numpy as np
+from PIL import Image
+
+from misc.cv2_and_numpy import Frame, opencv_to_pil, pil_to_opencv
+
+
+def random_rgb(seed=0):
+    return np.random.default_rng(seed).integers(0, 256, (32, 48, 3), dtype=np.uint8)
+
+
+class TestFrame:
+    def test_frame_is_bgr_view_of_rgb_buffer(self):
+        rgb = random_rgb()
+        frame = Frame(rgb)
+
+        assert frame.rgb is rgb
+        assert np.shares_memory(frame, rgb)
+        assert np.array_equal(frame, rgb[:, :, ::-1])
+
+    def test_pil_image_is_made_once(self):
+        frame = Frame(random_rgb())
+
+        image = opencv_to_pil(frame)
+
+        assert opencv_to_pil(frame) is image
+        assert np.array_equal(np.asarray(image), frame.rgb)
+
+    def test_round_trip_through_pil(self):
+        image = Image.fromarray(random_rgb())
+        frame = pil_to_opencv(image)
+
+        assert isinstance(frame, Frame)
+        assert frame.to_pil() is image
+        assert np.array_equal(np.asarray(frame), np.asarray(image)[:, :, ::-1])
+
+    def test_derived_arrays_are_converted_from_their_data(self):
+        frame = Frame(random_rgb())
+        cropped = frame[4:20, 8:40]
+
+        assert np.array_equal(np.asarray(cropped.to_pil()), frame.rgb[4:20, 8:40])
+        assert np.array_equal(np.asarray(opencv_to_pil(np.ascontiguousarray(frame))), frame.rgb)
+
+    def test_only_image_results_are_frames(self):
+        frame = Frame(random_rgb())
+        rgb = frame.rgb
+
+        assert type(frame + 1) is Frame
+        assert type(np.clip(frame, 10, 200)) is Frame
+
+        assert type(frame.sum(axis=2)) is np.ndarray
+        assert type(frame.mean(axis=(0, 1))) is np.ndarray
+        assert type(np.sum(frame[:, :, 0] > 10, axis=0)) is np.ndarray
+        assert np.array_equal(frame.max(axis=2), rgb.max(axis=2))
+
+        assert type(frame.max()) is np.uint8
+        assert type(frame.mean()) is np.float64
+        assert frame.mean() == rgb.mean()
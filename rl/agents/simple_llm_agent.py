@@ -99,5 +99,6 @@ class SimpleLLMAgent(BaseAgent):
 
     def get_agent_info(self) -> Dict:
         return {
-            "conversation_history": self.conversation.get_conversation()
+            "conversation_history": self.conversation.get_conversation(),
+            "conversation_requests": [stats._asdict() for stats in self.conversation.request_stats],
         }
@@ -0,0 +1,66 @@
+import functools
+import pathlib
+from typing import Dict, List
+
+import typer
+
+from glimpse_generators.simulator_pool import SimulatorPool
+from glimpse_generators.tile_pyramid import DEFAULT_ALTITUDES, TilePyramid
+from glimpse_generators.unreal_glimpse_generator import CaptureMode
+from rl.environment import EnvironmentType
+from rl.environment.baked_fly_search_env import bake_scenario
+from rl.environment.environments import ENVIRONMENTS
+from scenarios.mimic_scenario_mapper import MimicScenarioMapper
+
+
+def main(
+    scenario_directory: pathlib.Path = typer.Argument(
+        help="The directory containing the scenarios to bake (e.g. one of run_templates)"
+    ),
+    output_directory: pathlib.Path = typer.Argument(help="The directory to store the baked scenarios in"),
+    extent: float = typer.Option(
+        # The 400 m search area, plus what can be seen from its edges at 120 m.
+        default=640.0,
+        help="The side (in meters) of the square around the start position to bake",
+    ),
+    altitudes: List[float] = typer.Option(
+        default=list(DEFAULT_ALTITUDES),
+        help="The altitudes (in meters) to capture the pyramid levels from, finest first",
+    ),
+    capture_mode: CaptureMode = typer.Option(default=CaptureMode.LEGACY, help="How glimpses are captured"),
+    simulators: int = typer.Option(default=1, min=1, help="The number of simulator instances to bake on concurrently"),
+):
+    """
+    Render every scenario once, as a tile pyramid that BakedFlySearchEnv synthesizes glimpses from.
+    """
+    scenario_mapper = MimicScenarioMapper(scenario_directory)
+    env_type = EnvironmentType.CITY if scenario_mapper.is_city else EnvironmentType.FOREST
+    environment_factory = functools.partial(
+        ENVIRONMENTS[env_type],
+        skip_object_placement_checks=True, require_object_in_sight=False, capture_mode=capture_mode
+    )
+    environment = environment_factory()
+
+    scenarios = []
+    for scenario in scenario_mapper:
+        if (output_directory / str(scenario["i"]) / TilePyramid.META_FILE).exists():
+            print(f"Skipping scenario {scenario['i']} as it is already baked")
+            continue
+
+        scenarios.append(scenario)
+
+    def bake(client, scenario: Dict):
+        # Every simulator needs its own environment, as environments hold the state of the current episode.
+        worker_environment = environment_factory()
+        worker_environment.use_client(client)
+
+        with worker_environment as running_environment:
+            print(f"Baking scenario {scenario['i']}")
+            bake_scenario(running_environment, scenario, output_directory / str(scenario["i"]), extent, altitudes)
+
+    with SimulatorPool(environment.get_client, simulators) as pool:
+        pool.map(bake, scenarios)
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,69 @@
+import json
+import pathlib
+from typing import Dict, Sequence, Union
+
+from glimpse_generators.baked_glimpse_generator import BakedGlimpseGenerator
+from glimpse_generators.tile_pyramid import DEFAULT_ALTITUDES, TilePyramid, bake_pyramid
+from glimpse_generators.unreal_glimpse_generator import CaptureMode, UnrealGlimpseGenerator
+from rl.environment.base_fly_search_env import BaseFlySearchEnv
+from rl.environment.replay_fly_search_env import ReplayFlySearchEnv, ScenarioNotRecordedException
+
+
+def bake_scenario(environment: BaseFlySearchEnv, scenario: Dict, directory: pathlib.Path, extent: float,
+                  altitudes: Sequence[float] = DEFAULT_ALTITUDES) -> TilePyramid:
+    """
+    Sets the scenario up in `environment` (which must be entered) and bakes its tile pyramid into `directory`, together
+    with the scenario's parameters (as logged by `LocalFSLogger`, so `MimicScenarioMapper` can read them back).
+    """
+    environment.reset(options=scenario)
+    generator = environment.glimpse_generator
+
+    def capture(position):
+        # The plain glimpse, without the grid drawn by the environment's glimpse generator.
+        return UnrealGlimpseGenerator.get_camera_image(generator, position, force_move=True)
+
+    glimpse_size = environment.resolution if environment.capture_mode == CaptureMode.NATIVE else 500
+    scene_meta = {"object_id": scenario.get("object_id"), "object_bbox": environment.get_object_bbox()}
+
+    pyramid = bake_pyramid(capture, directory, glimpse_size, extent, altitudes, scene_meta)
+
+    with open(directory / "scenario_params.json", "w") as f:
+        json.dump({k: str(v) for k, v in scenario.items()}, f)
+
+    return pyramid
+
+
+class BakedFlySearchEnv(ReplayFlySearchEnv):
+    """
+    Synthesizes observations for any position from tile pyramids baked by `bake_scenario`, so evaluation runs don't
+    need the simulator at all. Scenarios are matched with the baked ones by their parameters, as in
+    `ReplayFlySearchEnv`.
+    """
+
+    def __init__(self, bake_directory: Union[str, pathlib.Path], resolution: int = 500, max_altitude: int = 120,
+                 give_class_image: bool = False, capture_mode: CaptureMode = CaptureMode.LEGACY):
+        super().__init__(bake_directory, resolution=resolution, max_altitude=max_altitude,
+                         give_class_image=give_class_image, capture_mode=capture_mode)
+
+        self.pyramid = None
+
+    def get_glimpse_generator(self, client) -> BakedGlimpseGenerator:
+        return BakedGlimpseGenerator(splits_w=6, splits_h=6, capture_mode=self.capture_mode,
+                                     resolution=self.resolution)
+
+    def _configure(self, options: Dict) -> None:
+        directory = self.episode_directories.get(self.get_episode_key(options))
+
+        if directory is None:
+            raise ScenarioNotRecordedException(f"No scenario in {self.log_directory} was baked for {options}.")
+
+        self.pyramid = TilePyramid(directory)
+
+        if self.pyramid.meta.get("object_id") is not None:
+            options["object_id"] = self.pyramid.meta["object_id"]
+
+        start_position = tuple(int(coordinate) for coordinate in options["drone_rel_coords"])
+        self.glimpse_generator.load_pyramid(self.pyramid, start_position)
+
+    def get_object_bbox(self):
+        return self.pyramid.meta["object_bbox"]
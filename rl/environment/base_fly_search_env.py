@@ -1,11 +1,19 @@
-from typing import Optional, Dict, List
+from typing import Collection, Optional, Dict, List
 
 import gymnasium as gym
 import numpy as np
 
-from glimpse_generators.unreal_client_wrapper import UnrealDiedException, UnrealClientWrapper
-from glimpse_generators.unreal_glimpse_generator import UnrealGridGlimpseGenerator, UnrealGlimpseGenerator
-from misc.cv2_and_numpy import pil_to_opencv
+from glimpse_generators.readiness import (
+    FrameChangeProbe,
+    FrameStabilityProbe,
+    ReadinessConfig,
+    ReadinessTimeoutException,
+    wait_until,
+)
+from glimpse_generators.render_cache import RenderCache
+from glimpse_generators.rpc_tracer import RpcTracer
+from glimpse_generators.unreal_client_wrapper import UnrealDiedException, UnrealClientWrapper, UnrealTransport
+from glimpse_generators.unreal_glimpse_generator import CaptureMode, UnrealGridGlimpseGenerator, UnrealGlimpseGenerator
 from scenarios.classes_to_ids import get_classes_to_object_classes
 from scenarios.classes_to_images import classes_to_images
 from scenarios.object_classes.base_object_class import BaseObjectClass
@@ -35,9 +43,14 @@ class BaseFlySearchEnv(gym.Env):
     def get_client(self) -> UnrealClientWrapper:
         raise NotImplementedError()
 
-    @staticmethod
-    def get_glimpse_generator(client: UnrealClientWrapper) -> UnrealGlimpseGenerator:
-        return UnrealGridGlimpseGenerator(client=client, splits_w=6, splits_h=6)
+    # Scenario options that don't affect what is rendered: bookkeeping and the drone's starting position (which is a part
+    # of the camera pose instead).
+    NON_SCENE_OPTIONS = {"object_id", "throws", "passed_object_name", "drop", "i", "difficulty", "cansee_restarts",
+                         "drone_rel_coords"}
+
+    def get_glimpse_generator(self, client: UnrealClientWrapper) -> UnrealGlimpseGenerator:
+        return UnrealGridGlimpseGenerator(client=client, splits_w=6, splits_h=6, capture_mode=self.capture_mode,
+                                          resolution=self.resolution, render_cache=self.render_cache)
 
     def get_reward(self) -> float:
         return 0.0
@@ -61,7 +74,10 @@ class BaseFlySearchEnv(gym.Env):
         raise NotImplementedError()
 
     def __init__(self, resolution: int = 500, max_altitude: int = 120, require_object_in_sight: bool = True,
-                 skip_object_placement_checks: bool = False, give_class_image: bool = False):
+                 skip_object_placement_checks: bool = False, give_class_image: bool = False,
+                 readiness_config: Optional[ReadinessConfig] = None, standby_simulator: bool = False,
+                 capture_mode: CaptureMode = CaptureMode.LEGACY, render_cache: Optional[RenderCache] = None,
+                 transport: UnrealTransport = UnrealTransport.AUTO):
         super().__init__()
 
         # Observations are dictionaries with the agent's and the target's location.
@@ -90,6 +106,8 @@ class BaseFlySearchEnv(gym.Env):
         self.resolution = resolution
 
         self.client: Optional[UnrealClientWrapper] = None
+        # Client provided from outside (e.g. leased from a simulator pool); it's not ours to disconnect.
+        self.external_client: Optional[UnrealClientWrapper] = None
         self.glimpse_generator: Optional[UnrealGlimpseGenerator] = None
         self.classes_to_ids: Optional[Dict] = None
 
@@ -105,11 +123,40 @@ class BaseFlySearchEnv(gym.Env):
 
         self.give_class_image: bool = give_class_image
 
+        # Deadlines and polling schedule used while waiting for the simulator (instead of fixed sleeps).
+        self.readiness_config: ReadinessConfig = readiness_config or ReadinessConfig()
+        # Whether to keep a second simulator process warm for instant failover.
+        self.standby_simulator: bool = standby_simulator
+        # How to connect to the simulator (Unix domain socket if it's local, by default).
+        self.transport: UnrealTransport = UnrealTransport(transport)
+        # Legacy mode reproduces the paper's pipeline (500x500 glimpses regardless of `resolution`); native mode renders
+        # glimpses at `resolution` directly.
+        self.capture_mode: CaptureMode = CaptureMode(capture_mode)
+
+        # Glimpses (and object bounding boxes) of already rendered scenes are served from here if set.
+        self.render_cache: Optional[RenderCache] = render_cache
+        self.cached_object_bbox: Optional[str] = None
+
     def set_require_object_in_sight(self, require_object_in_sight: bool) -> None:
         self.require_object_in_sight = require_object_in_sight
 
+    def use_client(self, client: Optional[UnrealClientWrapper]) -> None:
+        """
+        Makes the environment use an already running simulator instead of starting its own on `__enter__`.
+        Pass None to go back to starting a simulator.
+        """
+        if self.resources_initialized:
+            raise ValueError("Client can't be changed while the environment is entered.")
+
+        self.external_client = client
+
+    @property
+    def rpc_tracer(self) -> Optional[RpcTracer]:
+        """Trace of the simulator requests, or None if the environment doesn't talk to a simulator."""
+        return self.client.tracer if self.client is not None else None
+
     def __enter__(self):
-        self.client = self.get_client()
+        self.client = self.external_client if self.external_client is not None else self.get_client()
 
         success = False
 
@@ -118,7 +165,7 @@ class BaseFlySearchEnv(gym.Env):
                 self.glimpse_generator = self.get_glimpse_generator(client=self.client)
                 self.classes_to_ids = get_classes_to_object_classes(self.client)
                 success = True
-            except UnrealDiedException:
+            except (UnrealDiedException, ReadinessTimeoutException):
                 continue
 
         self.resources_initialized = True
@@ -126,13 +173,27 @@ class BaseFlySearchEnv(gym.Env):
         return self
 
     def __exit__(self, *_, **__):
-        self.client.disconnect()
+        if self.client is not self.external_client:
+            self.client.disconnect()
+
         self.resources_initialized = False
 
         return False
 
     def get_object_bbox(self):
-        return self.client.request(f"vget /object/{self.options['object_id']}/bounds")
+        if self.cached_object_bbox is not None:
+            return self.cached_object_bbox
+
+        object_id = self.options['object_id']
+        scene_state = self.client.scene_state
+
+        # The target doesn't move during an episode, so the bounds are fetched once (the cache is dropped when it moves).
+        bounds = scene_state.object_bounds(object_id)
+        if bounds is None:
+            bounds = self.client.request(f"vget /object/{object_id}/bounds")
+            scene_state.update_object_bounds(object_id, bounds)
+
+        return bounds
 
     def reset(self, seed: Optional[int] = None, options: Dict = None):
         """
@@ -162,7 +223,7 @@ class BaseFlySearchEnv(gym.Env):
         super().reset(seed=options["seed"], options=None)
 
         self.options = options
-        self._configure(options)
+        self._configure_scene(options)
 
         self.relative_position = np.array(self.glimpse_generator.get_relative_from_start())
 
@@ -171,25 +232,22 @@ class BaseFlySearchEnv(gym.Env):
 
         self.trajectory = [first_observers_position]
 
-        pil_image = self.glimpse_generator.get_camera_image(rel_position_m=self.relative_position.tolist(),
-                                                            force_move=True)
-        opencv_image = pil_to_opencv(pil_image)
+        # Frames are shared, without copies, by everything downstream (agent, conversation, loggers).
+        frame = self.glimpse_generator.get_camera_frame(rel_position_m=self.relative_position.tolist(),
+                                                        force_move=True)
 
         altitude = np.array([self.relative_position[2]])
 
         self.started = True
 
         obs = {
-            "image": opencv_image,
+            "image": frame,
             "altitude": altitude,
             "collision": 0,
         }
 
         if self.give_class_image:
-            class_image = classes_to_images[self.options["object_type"]]
-            class_image = class_image.resize((self.resolution, self.resolution))
-            opencv_class_image = pil_to_opencv(class_image)
-            obs["class_image"] = opencv_class_image
+            obs["class_image"] = classes_to_images.get_frame(self.options["object_type"], self.resolution)
 
         return obs, {"real_position": first_observers_position,
                      "object_bbox": self.get_object_bbox()}
@@ -221,8 +279,8 @@ class BaseFlySearchEnv(gym.Env):
         coordinate_change[1] = -coordinate_change[1]  # The rest of the code inverts the y axis. Yeah, I know.
 
         new_ideal_position = self.relative_position + coordinate_change
-        pil_image = self.glimpse_generator.get_camera_image(rel_position_m=new_ideal_position.tolist(),
-                                                            force_move=False)
+        frame = self.glimpse_generator.get_camera_frame(rel_position_m=new_ideal_position.tolist(),
+                                                        force_move=False)
 
         new_real_position = np.array(self.glimpse_generator.get_relative_from_start())
 
@@ -230,41 +288,108 @@ class BaseFlySearchEnv(gym.Env):
         max_diff = np.max(np.abs(new_ideal_position - new_real_position))
         crash = max_diff > max_allowed_diff
 
-        opencv_image = pil_to_opencv(pil_image)
-
         self.relative_position = new_real_position
         self.trajectory.append(self.get_observers_relative_position())
 
         reward = self.get_reward()
 
         observation = {
-            "image": opencv_image,
+            "image": frame,
             "altitude": np.array([new_real_position[2]]),
             "collision": 1 if crash else 0,
         }
 
         if self.give_class_image:
-            class_image = classes_to_images[self.options["object_type"]]
-            class_image = class_image.resize((self.resolution, self.resolution))
-            opencv_class_image = pil_to_opencv(class_image)
-            observation["class_image"] = opencv_class_image
+            observation["class_image"] = classes_to_images.get_frame(self.options["object_type"], self.resolution)
 
         return observation, reward, False, False, {"real_position": self.get_observers_relative_position(),
                                                    "object_bbox": self.get_object_bbox()}
 
     # Bunch of utility functions
 
-    def hide_all_movable_objects(self) -> None:
+    def get_scene_key(self, options: Dict) -> str:
+        scene = {key: value for key, value in options.items() if key not in self.NON_SCENE_OPTIONS}
+        return RenderCache.make_key(self.get_scene_namespace(), scene)
+
+    def get_scene_namespace(self) -> str:
+        return type(self).__name__
+
+    def _can_defer_configuration(self, options: Dict) -> bool:
+        # Placement checks talk to the simulator and may reject the scenario, so they can't be skipped.
+        checks_disabled = self.skip_object_placement_checks and not self.require_object_in_sight
+        return checks_disabled and "object_coords" in options and "drone_rel_coords" in options
+
+    def _configure_scene(self, options: Dict) -> None:
+        """
+        Calls `_configure`, unless the render cache already holds the starting glimpse of this scene. In that case,
+        configuring the simulator is deferred until a glimpse that isn't cached is requested, which may never happen.
+        """
+        self.cached_object_bbox = None
+
+        if self.render_cache is None:
+            self._configure(options)
+            return
+
+        scene_key = self.get_scene_key(options)
+        scene_meta = self.render_cache.get_meta(scene_key) if self._can_defer_configuration(options) else None
+
+        if scene_meta is not None:
+            if scene_meta["object_id"] is not None:
+                options["object_id"] = scene_meta["object_id"]
+            self.cached_object_bbox = scene_meta["object_bbox"]
+
+            # Same as `load_map`, but without touching the simulator.
+            self.glimpse_generator.change_start_position(options["object_coords"])
+            self.glimpse_generator.set_virtual_camera_location(
+                self.rel_to_real(*options["object_coords"], *options["drone_rel_coords"])
+            )
+            self.glimpse_generator.set_scene(scene_key, deferred_setup=lambda: self._configure(options))
+            return
+
+        # Glimpses taken while configuring must be real ones.
+        self.glimpse_generator.set_scene(None)
+        self._configure(options)
+        self.glimpse_generator.set_scene(scene_key)
+
+        self.render_cache.put_meta(scene_key, {
+            "object_id": options.get("object_id"),
+            "object_bbox": self.get_object_bbox() if "object_id" in options else None,
+        })
+
+    def hide_all_movable_objects(self, keep_object_ids: Collection[str] = ()) -> None:
+        # Objects in `keep_object_ids` are about to be placed anyway, so hiding them would only cost extra round trips.
         for object_class in self.classes_to_ids.values():
             if isinstance(object_class, BaseObjectClass):
-                object_class.hide_all_objects()
+                object_class.hide_all_objects(keep_object_ids)
+
+    def wait_for_scene_to_settle(self, wait_for_niagara: bool = False) -> None:
+        """
+        Waits until the configured scene can be rendered reliably: the partition is loaded and consecutive frames are
+        stable or, if `wait_for_niagara` is set, Niagara effects (fire) have started.
+
+        Frames are captured from the current camera position, so this should be called after `load_map`.
+        """
+        config = self.readiness_config
+
+        self.glimpse_generator.wait_for_unreal_to_finish()
+
+        if wait_for_niagara:
+            # Fire keeps on animating, so we can't wait for the frames to become stable.
+            probe = FrameChangeProbe(self.glimpse_generator.capture_frame, config.niagara_frame_tolerance)
+            wait_until(probe, "Niagara warm-up", config.niagara_warmup_deadline_seconds, config, raise_on_timeout=False,
+                       tracer=self.rpc_tracer)
+        else:
+            probe = FrameStabilityProbe(self.glimpse_generator.capture_frame, config.frame_tolerance,
+                                        config.stable_frames)
+            wait_until(probe, "frame stability", config.frame_stability_deadline_seconds, config,
+                       raise_on_timeout=False, tracer=self.rpc_tracer)
 
     # Sets the camera in a given location and asks for camera image, ensuring that the map is loaded
     def load_map(self, x, y, z, drone_rel_x_semi, drone_rel_y_semi, drone_rel_z_semi) -> None:
         # Asking glimpse generator for a glimpse will effectively load the map in a given location
         self.glimpse_generator.change_start_position((x, y, z))
         self.glimpse_generator.reset_camera()
-        self.glimpse_generator.get_camera_image((drone_rel_x_semi, drone_rel_y_semi, drone_rel_z_semi), force_move=True)
+        self.glimpse_generator.get_camera_frame((drone_rel_x_semi, drone_rel_y_semi, drone_rel_z_semi), force_move=True)
 
     def rel_to_real(self, x, y, z, x_rel, y_rel, z_rel):
         x_rel *= 100
@@ -1,7 +1,9 @@
-from time import sleep
-from typing import Dict
+from typing import Dict, Optional, Tuple
 
-from glimpse_generators.unreal_client_wrapper import UnrealClientWrapper
+from glimpse_generators.readiness import ReadinessConfig
+from glimpse_generators.render_cache import RenderCache
+from glimpse_generators.unreal_client_wrapper import UnrealClientWrapper, UnrealTransport
+from glimpse_generators.unreal_glimpse_generator import CaptureMode
 from misc.unreal_utils import get_city_env_binary
 from rl.environment.base_fly_search_env import BaseFlySearchEnv, DroneCannotSeeTargetException, \
     ObjectInBuildingException, ObjectBadPlacementException
@@ -12,16 +14,23 @@ from scenarios.object_classes.pcg_class import PCGClass
 
 class CityFlySearchEnv(BaseFlySearchEnv):
     def __init__(self, resolution: int = 500, max_altitude: int = 120, require_object_in_sight: bool = True,
-                 skip_object_placement_checks: bool = False, give_class_image: bool = False):
+                 skip_object_placement_checks: bool = False, give_class_image: bool = False,
+                 readiness_config: Optional[ReadinessConfig] = None, standby_simulator: bool = False,
+                 capture_mode: CaptureMode = CaptureMode.LEGACY, render_cache: Optional[RenderCache] = None,
+                 transport: UnrealTransport = UnrealTransport.AUTO):
         super().__init__(resolution=resolution, max_altitude=max_altitude,
                          require_object_in_sight=require_object_in_sight,
                          skip_object_placement_checks=skip_object_placement_checks,
-                         give_class_image=give_class_image)
+                         give_class_image=give_class_image, readiness_config=readiness_config,
+                         standby_simulator=standby_simulator, capture_mode=capture_mode, render_cache=render_cache,
+                         transport=transport)
 
     def get_client(self) -> UnrealClientWrapper:
         city_binary_path = get_city_env_binary()
 
-        return UnrealClientWrapper(host="localhost", port=9000, unreal_binary_path=city_binary_path)
+        return UnrealClientWrapper(host="localhost", port=9000, unreal_binary_path=city_binary_path,
+                                   readiness_config=self.readiness_config, standby=self.standby_simulator,
+                                   transport=self.transport)
 
     def _configure(self, options: Dict) -> None:
         if "object_coords" in options:
@@ -33,7 +42,12 @@ class CityFlySearchEnv(BaseFlySearchEnv):
             object_type: BaseObjectClass = options["object_type"]
             object_class = self.classes_to_ids[object_type]
 
-            self.hide_all_movable_objects()
+            city_generator_class: PCGClass = self.classes_to_ids["CITY"]
+
+            # The city generator is hidden too (which clears its props with a PCG pass), so that the checks below don't
+            # depend on the props of the previous episode. The validity index (validated without props too) only
+            # pre-filters locations; these checks still decide whether the scenario is valid.
+            self.hide_all_movable_objects(keep_object_ids={object_class.choose_object_id(seed)})
 
             object_id = object_class.move_and_show(*options["object_coords"], seed)
             options["object_id"] = object_id
@@ -41,42 +55,17 @@ class CityFlySearchEnv(BaseFlySearchEnv):
             if "object_rot" in options:
                 object_class.rotate_object(object_id, *options["object_rot"])
 
-            # NOTE: We assume that things generated by the city generator won't occlude the target
+            # NOTE: We assume that things generated by the city generator won't occlude the target (the checks run with
+            # the props cleared, and they are only generated afterwards)
 
             if self.require_object_in_sight:
-                can_see = "true" in self.glimpse_generator.client.request(f"vget /camera/1/cansee {object_id}")
-                if not can_see:
+                if not self.object_in_sight(object_id):
                     raise DroneCannotSeeTargetException(
                         "Object is not visible from the drone position as required by config"
                     )
             elif not self.skip_object_placement_checks:
-                camera_unreal_coordinates = self.glimpse_generator.get_unreal_camera_coordinates()
-                camera_unreal_coordinates = list(camera_unreal_coordinates)
-                camera_unreal_coordinates[2] = 500 * 100.0
-                cansee_points_coord_str = ":".join(map(str, camera_unreal_coordinates))
-
-                points_count = int(self.glimpse_generator.client.request(
-                    f"vget /camera/1/cansee_points {cansee_points_coord_str}"))
-
-                in_building = (points_count == 0)
-
-                if in_building:
-                    raise ObjectInBuildingException("Object is inside a building")
+                self.check_object_placement(object_id, options["object_coords"])
 
-                object_unreal_coordinates = options["object_coords"]
-                object_unreal_coordinates = list(object_unreal_coordinates)
-                object_unreal_coordinates[2] = 500 * 100.0
-                cansee_points_coord_str = ":".join(map(str, object_unreal_coordinates))
-
-                points_count = int(self.glimpse_generator.client.request(
-                    f"vget /object/{object_id}/cansee_points {cansee_points_coord_str}"
-                ))
-                weird_object_placement = (points_count == 0)
-
-                if weird_object_placement:
-                    raise ObjectBadPlacementException("Object has a bad placement (e.g. inside a wall)")
-
-            city_generator_class: PCGClass = self.classes_to_ids["CITY"]
             city_generator_class.move_and_show(*options["object_coords"], seed)
 
         if "sun_y" in options and "sun_z" in options:
@@ -85,7 +74,38 @@ class CityFlySearchEnv(BaseFlySearchEnv):
             sun_class: SunClass = self.classes_to_ids["CITY_SUN"]
             sun_class.set_sun_rotation(sun_y, sun_z)
 
-        if 'FIRE' in str(options["object_type"]):
-            sleep(10)  # Wait for the fire to start burning -- in case it's needed
-        else:
-            sleep(5)  # wait for the objects to load
+        # Wait for the objects to load (and for the fire to start burning -- in case it's needed)
+        self.wait_for_scene_to_settle(wait_for_niagara='FIRE' in str(options["object_type"]))
+
+    def object_in_sight(self, object_id: str) -> bool:
+        return "true" in self.glimpse_generator.client.request(f"vget /camera/1/cansee {object_id}")
+
+    def check_object_placement(self, object_id: str, object_coords: Tuple[float, float, float]) -> None:
+        """
+        Raises ObjectInBuildingException or ObjectBadPlacementException if the object (at `object_coords`) or the
+        camera can't see the sky above them.
+        """
+        camera_unreal_coordinates = self.glimpse_generator.get_unreal_camera_coordinates()
+        camera_unreal_coordinates = list(camera_unreal_coordinates)
+        camera_unreal_coordinates[2] = 500 * 100.0
+        camera_cansee_points_coord_str = ":".join(map(str, camera_unreal_coordinates))
+
+        object_unreal_coordinates = list(object_coords)
+        object_unreal_coordinates[2] = 500 * 100.0
+        object_cansee_points_coord_str = ":".join(map(str, object_unreal_coordinates))
+
+        # Both checks are independent, so they are pipelined.
+        camera_points_count, object_points_count = map(int, self.glimpse_generator.client.request_many([
+            f"vget /camera/1/cansee_points {camera_cansee_points_coord_str}",
+            f"vget /object/{object_id}/cansee_points {object_cansee_points_coord_str}",
+        ]))
+
+        in_building = (camera_points_count == 0)
+
+        if in_building:
+            raise ObjectInBuildingException("Object is inside a building")
+
+        weird_object_placement = (object_points_count == 0)
+
+        if weird_object_placement:
+            raise ObjectBadPlacementException("Object has a bad placement (e.g. inside a wall)")
@@ -1,7 +1,9 @@
-from time import sleep
-from typing import Dict
+from typing import Dict, Optional
 
-from glimpse_generators.unreal_client_wrapper import UnrealClientWrapper
+from glimpse_generators.readiness import ReadinessConfig
+from glimpse_generators.render_cache import RenderCache
+from glimpse_generators.unreal_client_wrapper import UnrealClientWrapper, UnrealTransport
+from glimpse_generators.unreal_glimpse_generator import CaptureMode
 from misc.unreal_utils import get_forest_env_binary
 from rl.environment.base_fly_search_env import BaseFlySearchEnv
 from scenarios.object_classes.base_object_class import BaseObjectClass
@@ -11,16 +13,23 @@ from scenarios.object_classes.forest_sun_class import SunClass
 
 class ForestFlySearchEnv(BaseFlySearchEnv):
     def __init__(self, resolution: int = 500, max_altitude: int = 120, require_object_in_sight: bool = True,
-                 skip_object_placement_checks=False, give_class_image=False):
+                 skip_object_placement_checks=False, give_class_image=False,
+                 readiness_config: Optional[ReadinessConfig] = None, standby_simulator: bool = False,
+                 capture_mode: CaptureMode = CaptureMode.LEGACY, render_cache: Optional[RenderCache] = None,
+                 transport: UnrealTransport = UnrealTransport.AUTO):
         super().__init__(resolution=resolution, max_altitude=max_altitude,
                          require_object_in_sight=require_object_in_sight,
                          skip_object_placement_checks=skip_object_placement_checks,
-                         give_class_image=give_class_image)
+                         give_class_image=give_class_image, readiness_config=readiness_config,
+                         standby_simulator=standby_simulator, capture_mode=capture_mode, render_cache=render_cache,
+                         transport=transport)
 
     def get_client(self) -> UnrealClientWrapper:
         forest_binary_path = get_forest_env_binary()
 
-        return UnrealClientWrapper(host="localhost", port=9000, unreal_binary_path=forest_binary_path)
+        return UnrealClientWrapper(host="localhost", port=9000, unreal_binary_path=forest_binary_path,
+                                   readiness_config=self.readiness_config, standby=self.standby_simulator,
+                                   transport=self.transport)
 
     def _configure(self, options: Dict) -> None:
         if "object_coords" in options:
@@ -32,7 +41,7 @@ class ForestFlySearchEnv(BaseFlySearchEnv):
             object_type: BaseObjectClass = options["object_type"]
             object_class = self.classes_to_ids[object_type]
 
-            self.hide_all_movable_objects()
+            self.hide_all_movable_objects(keep_object_ids={object_class.choose_object_id(seed)})
 
             object_id = object_class.move_and_show(*options["object_coords"], seed)
             options["object_id"] = object_id
@@ -57,7 +66,5 @@ class ForestFlySearchEnv(BaseFlySearchEnv):
             forest_env_class.run_pcg(seed, forest_live_trees_density, forest_dead_trees_density, forest_stones,
                                      forest_cliffs)
 
-        if 'FIRE' in str(options["object_type"]):
-            sleep(10)  # Wait for the fire to start burning -- in case it's needed
-        else:
-            sleep(5)  # wait for the objects to load
+        # Wait for the objects to load (and for the fire to start burning -- in case it's needed)
+        self.wait_for_scene_to_settle(wait_for_niagara='FIRE' in str(options["object_type"]))
@@ -1,14 +1,18 @@
 import numpy as np
-from PIL import Image
-
+from glimpse_generators.readiness import ReadinessConfig
+from glimpse_generators.rpc_tracer import RpcTracer
+from glimpse_generators.scene_state import SceneState
 from glimpse_generators.unreal_client_wrapper import UnrealClientWrapper
 from glimpse_generators.unreal_glimpse_generator import UnrealGridGlimpseGenerator
+from misc.cv2_and_numpy import Frame
 from rl.environment.base_fly_search_env import BaseFlySearchEnv
 
 
 class MockClient(UnrealClientWrapper):
     def __init__(self):
-        pass
+        self.scene_state = SceneState()
+        self.readiness_config = ReadinessConfig()
+        self.tracer = RpcTracer()
 
     def disconnect(self):
         pass
@@ -16,6 +20,9 @@ class MockClient(UnrealClientWrapper):
     def request(self, *args, **kwargs):
         pass
 
+    def request_many(self, messages, *args, **kwargs):
+        return [None for _ in messages]
+
 
 class MockGlimpseGenerator(UnrealGridGlimpseGenerator):
     def __init__(self, start_unreal_coords=(50000.0, 50000.0, 1000.0), current_relative_coords=(0.0, 0.0, 0.0)):
@@ -29,14 +36,13 @@ class MockGlimpseGenerator(UnrealGridGlimpseGenerator):
             int(self.current_relative_coords[2]),
         ]
 
-    def get_camera_image(self, rel_position_m=(0, 0, 0), force_move=False):
-        # Generate a random RGB image using PIL
+    def get_camera_frame(self, rel_position_m=(0, 0, 0), force_move=False):
+        # Generate a random RGB image
         random_array = np.random.randint(0, 256, (500, 500, 3), dtype=np.uint8)
-        image = Image.fromarray(random_array, mode='RGB')
 
         self.current_relative_coords = rel_position_m
 
-        return image
+        return Frame(random_array)
 
 
 class MockFlySearchEnv(BaseFlySearchEnv):
@@ -49,8 +55,7 @@ class MockFlySearchEnv(BaseFlySearchEnv):
     def _configure(self, options) -> None:
         pass
 
-    @staticmethod
-    def get_glimpse_generator(client):
+    def get_glimpse_generator(self, client):
         return MockGlimpseGenerator()
 
     def get_object_bbox(self):
@@ -0,0 +1,146 @@
+import json
+import pathlib
+from dataclasses import dataclass
+from typing import Dict, Optional, Union
+
+from glimpse_generators.render_cache import RenderCache
+from glimpse_generators.replay_glimpse_generator import Position, ReplayGlimpseGenerator, UnvisitedPositionPolicy
+from glimpse_generators.unreal_glimpse_generator import CaptureMode
+from rl.environment import EnvironmentType
+from rl.environment.base_fly_search_env import BaseFlySearchEnv, InvalidScenarioException
+from rl.environment.environments import ENVIRONMENTS
+from scenarios.mimic_scenario_mapper import parse_scenario, to_tuple
+
+
+class ScenarioNotRecordedException(InvalidScenarioException):
+    pass
+
+
+@dataclass
+class RecordedEpisode:
+    """An episode logged by `LocalFSLogger`."""
+    directory: pathlib.Path
+    scenario: Dict
+    # Glimpses by the relative position they were taken at (with Unreal's y axis, as in `get_relative_from_start`).
+    frame_paths: Dict[Position, pathlib.Path]
+    start_position: Position
+    object_bbox: Optional[str]
+
+    @classmethod
+    def load(cls, directory: pathlib.Path) -> "RecordedEpisode":
+        with open(directory / "scenario_params.json") as f:
+            scenario = parse_scenario(json.load(f))
+
+        coords_paths = {
+            int(path.name.split("_")[0]): path
+            for path in directory.glob("*_coords.txt") if path.name.split("_")[0].isdigit()
+        }
+        glimpse_count = len([path for path in directory.glob("*.png") if path.stem.isdigit()])
+
+        # If the class image was shown, it's saved as `0.png` and the glimpses are shifted by one.
+        offset = 1 if glimpse_count > len(coords_paths) else 0
+
+        frame_paths = {}
+        for glimpse_number in sorted(coords_paths):
+            x, y, z = to_tuple(coords_paths[glimpse_number].read_text().strip())
+            # Logged positions have the y axis inverted (see `BaseFlySearchEnv.get_observers_relative_position`).
+            position = (int(round(x)), -int(round(y)), int(round(z)))
+            frame_paths.setdefault(position, directory / f"{glimpse_number + offset}.png")
+
+        if not frame_paths:
+            raise ValueError(f"Episode {directory} has no recorded glimpses.")
+
+        start_position = next(iter(frame_paths))
+
+        bbox_path = directory / "object_bbox.txt"
+        object_bbox = bbox_path.read_text() if bbox_path.exists() else None
+
+        return cls(directory, scenario, frame_paths, start_position, object_bbox)
+
+
+class ReplayFlySearchEnv(BaseFlySearchEnv):
+    """
+    Serves observations from logged episodes (e.g. `all_logs/`) instead of a simulator, so agents, validators and
+    loggers can be tested quickly on any machine.
+
+    Episodes are matched with scenarios by their options, so scenarios should come from the same logs (e.g. through
+    `MimicScenarioMapper`). Glimpses at positions that weren't visited in the recorded episode are taken from the render
+    cache (if `recorded_environment` is given, so that the scene keys match) or handled by `unvisited_policy`.
+    """
+
+    # Scenario options that are filled in during evaluation, so they can't identify a recorded episode.
+    EVALUATION_OPTIONS = BaseFlySearchEnv.NON_SCENE_OPTIONS - {"drone_rel_coords"}
+
+    def __init__(self, log_directory: Union[str, pathlib.Path],
+                 unvisited_policy: UnvisitedPositionPolicy = UnvisitedPositionPolicy.NEAREST,
+                 recorded_environment: Optional[EnvironmentType] = None, resolution: int = 500,
+                 max_altitude: int = 120, give_class_image: bool = False,
+                 capture_mode: CaptureMode = CaptureMode.LEGACY, render_cache: Optional[RenderCache] = None):
+        super().__init__(resolution=resolution, max_altitude=max_altitude, require_object_in_sight=False,
+                         skip_object_placement_checks=True, give_class_image=give_class_image,
+                         capture_mode=capture_mode, render_cache=render_cache)
+
+        self.log_directory = pathlib.Path(log_directory)
+        self.unvisited_policy = UnvisitedPositionPolicy(unvisited_policy)
+        self.recorded_environment = recorded_environment
+
+        self.episode_directories: Dict[str, pathlib.Path] = {}
+        self.episode: Optional[RecordedEpisode] = None
+
+        for params_path in sorted(self.log_directory.rglob("scenario_params.json")):
+            with open(params_path) as f:
+                self.episode_directories.setdefault(self.get_episode_key(json.load(f)), params_path.parent)
+
+    def get_episode_key(self, options: Dict) -> str:
+        # Logged options are stringified, so ours are too (and both are parsed back the same way).
+        scenario = parse_scenario({
+            key: str(value) for key, value in options.items() if key not in self.EVALUATION_OPTIONS
+        })
+
+        return RenderCache.make_key(scenario)
+
+    def get_scene_namespace(self) -> str:
+        # Render cache entries are shared with the environment the episodes were recorded in.
+        return ENVIRONMENTS[self.recorded_environment].__name__
+
+    def __enter__(self):
+        self.glimpse_generator = self.get_glimpse_generator(client=None)
+        self.classes_to_ids = {}
+        self.resources_initialized = True
+
+        return self
+
+    def __exit__(self, *_, **__):
+        self.resources_initialized = False
+
+        return False
+
+    def get_glimpse_generator(self, client) -> ReplayGlimpseGenerator:
+        return ReplayGlimpseGenerator(splits_w=6, splits_h=6, unvisited_policy=self.unvisited_policy,
+                                      capture_mode=self.capture_mode, resolution=self.resolution,
+                                      render_cache=self.render_cache)
+
+    def _configure_scene(self, options: Dict) -> None:
+        self._configure(options)
+
+        scene_key = self.get_scene_key(options) if self.recorded_environment is not None else None
+        self.glimpse_generator.set_scene(scene_key)
+
+    def _configure(self, options: Dict) -> None:
+        directory = self.episode_directories.get(self.get_episode_key(options))
+
+        if directory is None:
+            raise ScenarioNotRecordedException(f"No episode in {self.log_directory} was recorded for {options}.")
+
+        self.episode = RecordedEpisode.load(directory)
+
+        if "object_id" in self.episode.scenario:
+            options["object_id"] = self.episode.scenario["object_id"]
+
+        if "object_coords" in options:
+            self.glimpse_generator.change_start_position(options["object_coords"])
+
+        self.glimpse_generator.load_frames(self.episode.frame_paths, self.episode.start_position)
+
+    def get_object_bbox(self):
+        return self.episode.object_bbox
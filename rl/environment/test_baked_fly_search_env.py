@@ -0,0 +1,48 @@
+import json
+
+import numpy as np
+import pytest
+
+from glimpse_generators.test_tile_pyramid import GLIMPSE_SIZE, render
+from glimpse_generators.tile_pyramid import bake_pyramid
+from rl.environment.baked_fly_search_env import BakedFlySearchEnv
+from rl.environment.replay_fly_search_env import ScenarioNotRecordedException
+
+SCENARIO = {
+    "seed": 3,
+    "object_coords": (1000.0, 2000.0, 0.0),
+    "drone_rel_coords": (0.0, 0.0, 10.0),
+    "set_object": True,
+}
+
+
+@pytest.fixture
+def bakes(tmp_path):
+    directory = tmp_path / "0"
+    bake_pyramid(render, directory, GLIMPSE_SIZE, extent=80, altitudes=(5, 10, 20),
+                 scene_meta={"object_id": "target", "object_bbox": "1 2 3 4 5 6"})
+    (directory / "scenario_params.json").write_text(json.dumps({k: str(v) for k, v in SCENARIO.items()}))
+
+    return tmp_path
+
+
+class TestBakedFlySearchEnv:
+    def test_synthesizes_glimpses_anywhere(self, bakes):
+        with BakedFlySearchEnv(bakes, resolution=GLIMPSE_SIZE, capture_mode="native") as env:
+            options = dict(SCENARIO, i=0, drop=False)
+            observation, info = env.reset(options=options)
+
+            assert options["object_id"] == "target"
+            assert info["object_bbox"] == "1 2 3 4 5 6"
+            assert observation["image"].shape == (GLIMPSE_SIZE, GLIMPSE_SIZE, 3)
+
+            observation, _, _, _, info = env.step({"found": 0, "coordinate_change": np.array([7, -3, 5])})
+
+            assert tuple(info["real_position"]) == (7, -3, 15)
+            assert observation["collision"] == 0
+            assert observation["altitude"][0] == 15
+
+    def test_unbaked_scenario_is_invalid(self, bakes):
+        with BakedFlySearchEnv(bakes) as env:
+            with pytest.raises(ScenarioNotRecordedException):
+                env.reset(options=dict(SCENARIO, seed=4))
@@ -0,0 +1,94 @@
+import json
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from glimpse_generators.replay_glimpse_generator import UnvisitedPositionException, UnvisitedPositionPolicy
+from rl.environment.replay_fly_search_env import ReplayFlySearchEnv, ScenarioNotRecordedException
+
+SCENARIO = {
+    "seed": 7,
+    "object_coords": (1000.0, 2000.0, 0.0),
+    "drone_rel_coords": (0.0, 0.0, 100.0),
+    "set_object": True,
+}
+
+# Positions as logged (observer's y axis, which is inverted).
+TRAJECTORY = [(0, 0, 100), (10, 5, 80), (10, 5, 40)]
+
+
+def record_episode(directory, scenario, trajectory, class_image=False):
+    directory.mkdir(parents=True)
+    (directory / "scenario_params.json").write_text(json.dumps({k: str(v) for k, v in scenario.items()}))
+    (directory / "object_bbox.txt").write_text("1.0 2.0 3.0 4.0 5.0 6.0")
+
+    offset = 0
+    if class_image:
+        Image.new("RGB", (500, 500), (255, 0, 0)).save(directory / "0.png")
+        offset = 1
+
+    for glimpse_number, position in enumerate(trajectory):
+        glimpse = Image.new("RGB", (500, 500), (glimpse_number + 1, 0, 0))
+        glimpse.save(directory / f"{glimpse_number + offset}.png")
+        (directory / f"{glimpse_number}_coords.txt").write_text(f"({position[0]}, {position[1]}, {position[2]})")
+
+
+def glimpse_number(observation):
+    # Glimpses are recorded as solid colors; the (OpenCV, BGR) red channel is the glimpse number + 1.
+    return int(observation["image"][0, 0, 2]) - 1
+
+
+def move(env, current, target):
+    change = np.array(target) - np.array(current)
+    return env.step({"found": 0, "coordinate_change": change})
+
+
+@pytest.fixture
+def logs(tmp_path):
+    record_episode(tmp_path / "0", SCENARIO, TRAJECTORY)
+    return tmp_path
+
+
+class TestReplayFlySearchEnv:
+    def test_replays_recorded_glimpses(self, logs):
+        with ReplayFlySearchEnv(logs) as env:
+            observation, info = env.reset(options=dict(SCENARIO, i=0, drop=False))
+
+            assert glimpse_number(observation) == 0
+            assert tuple(info["real_position"]) == TRAJECTORY[0]
+            assert info["object_bbox"] == "1.0 2.0 3.0 4.0 5.0 6.0"
+
+            observation, _, _, _, info = move(env, TRAJECTORY[0], TRAJECTORY[1])
+
+            assert glimpse_number(observation) == 1
+            assert tuple(info["real_position"]) == TRAJECTORY[1]
+            assert observation["collision"] == 0
+
+    def test_class_image_is_skipped(self, tmp_path):
+        record_episode(tmp_path / "0", SCENARIO, TRAJECTORY, class_image=True)
+
+        with ReplayFlySearchEnv(tmp_path) as env:
+            observation, _ = env.reset(options=dict(SCENARIO))
+
+            assert glimpse_number(observation) == 0
+
+    def test_unvisited_position_gets_nearest_glimpse(self, logs):
+        with ReplayFlySearchEnv(logs, unvisited_policy=UnvisitedPositionPolicy.NEAREST) as env:
+            env.reset(options=dict(SCENARIO))
+            observation, _, _, _, info = move(env, TRAJECTORY[0], (10, 5, 50))
+
+            assert glimpse_number(observation) == 2
+            assert tuple(info["real_position"]) == (10, 5, 50)
+
+    def test_unvisited_position_raises(self, logs):
+        with ReplayFlySearchEnv(logs, unvisited_policy=UnvisitedPositionPolicy.RAISE) as env:
+            env.reset(options=dict(SCENARIO))
+
+            with pytest.raises(UnvisitedPositionException):
+                move(env, TRAJECTORY[0], (-30, 0, 100))
+
+    def test_unrecorded_scenario_is_invalid(self, logs):
+        with ReplayFlySearchEnv(logs) as env:
+            with pytest.raises(ScenarioNotRecordedException):
+                env.reset(options=dict(SCENARIO, seed=8))
@@ -0,0 +1,116 @@
+import pathlib
+from typing import Iterable, List, Optional
+
+import pandas as pd
+import typer
+
+from rl.environment.base_fly_search_env import ObjectBadPlacementException, ObjectInBuildingException
+from rl.environment.city_fly_search_env import CityFlySearchEnv
+from scenarios.city_scenario_mapper import CityScenarioMapper
+from scenarios.city_validity_index import (
+    REFERENCE_ALTITUDE,
+    LocationValidity,
+    get_validity_index_path,
+    load_validity_index,
+)
+
+# How often (in locations) the index is written to disk, so an interrupted pass can be resumed.
+CHECKPOINT_EVERY = 100
+
+
+def validate_location(environment: CityFlySearchEnv, location: pd.Series,
+                      object_types: Iterable[CityScenarioMapper.ObjectType]) -> dict:
+    """
+    Runs the checks done by `CityFlySearchEnv._configure` for every object type placed at `location`, with the camera
+    straight above it. Returns `LocationValidity` flags by object type name.
+
+    Only the object of seed 0 is checked for each type, so the flags only pre-filter locations that are bad for the type
+    as a whole; the checks of the environment stay authoritative for the scenarios actually drawn.
+    """
+    object_coords = (location["X"], location["Y"], location["Z"])
+    environment.load_map(*object_coords, 0, 0, REFERENCE_ALTITUDE)
+    environment.hide_all_movable_objects()
+
+    results = {}
+
+    for object_type in object_types:
+        object_class = environment.classes_to_ids[object_type]
+        object_id = object_class.move_and_show(*object_coords, seed=0)
+        object_class.rotate_object(object_id, location["P"], location["Q"], location["R"])
+
+        flags = LocationValidity.VALIDATED
+
+        try:
+            environment.check_object_placement(object_id, object_coords)
+            flags |= LocationValidity.PLACEMENT_OK
+        except (ObjectInBuildingException, ObjectBadPlacementException):
+            pass
+
+        if environment.object_in_sight(object_id):
+            flags |= LocationValidity.VISIBLE
+
+        results[object_type.name] = int(flags)
+        object_class.hide_all_objects()
+
+    return results
+
+
+def validate_locations(environment: CityFlySearchEnv, locations: pd.DataFrame,
+                       object_types: List[CityScenarioMapper.ObjectType], index_path: str,
+                       index: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """Fills in (and periodically saves) the validity index for locations that weren't validated yet."""
+    if index is None:
+        index = pd.DataFrame(index=locations.index)
+
+    for object_type in object_types:
+        if object_type.name not in index.columns:
+            index[object_type.name] = 0
+
+    index = index.reindex(locations.index.union(index.index), fill_value=0)
+    names = [object_type.name for object_type in object_types]
+
+    validated = (index.loc[locations.index, names] & int(LocationValidity.VALIDATED)) != 0
+    pending = locations.index[~validated.all(axis=1)]
+    print(f"Validating {len(pending)} of {len(locations)} locations")
+
+    for count, row in enumerate(pending, start=1):
+        for name, flags in validate_location(environment, locations.loc[row], object_types).items():
+            index.loc[row, name] = flags
+
+        if count % CHECKPOINT_EVERY == 0 or count == len(pending):
+            index.to_csv(index_path)
+            print(f"Validated {count} of {len(pending)} locations")
+
+    return index
+
+
+def main(
+    index_path: Optional[pathlib.Path] = typer.Option(
+        default=None,
+        help="Where to store the index (defaults to LOCATIONS_CITY_INDEX_PATH or locations_city_validity.csv)",
+    ),
+    object_types: Optional[List[str]] = typer.Option(
+        default=None,
+        help="Names of the object types to validate (all of them by default)",
+    ),
+):
+    """
+    Check every location of locations_city.csv for every object type once, so random scenarios skip invalid ones.
+    Interrupted runs are resumed.
+    """
+    index_path = str(index_path or get_validity_index_path())
+
+    # The mapper is only used to read (all of) the locations.
+    mapper = CityScenarioMapper({}, drone_z_rel_min=0, drone_z_rel_max=0)
+    types = [CityScenarioMapper.ObjectType[name] for name in object_types] if object_types else list(
+        CityScenarioMapper.ObjectType
+    )
+
+    environment = CityFlySearchEnv(require_object_in_sight=False, skip_object_placement_checks=True)
+
+    with environment:
+        validate_locations(environment, mapper.possible_locations, types, index_path, load_validity_index(index_path))
+
+
+if __name__ == "__main__":
+    typer.run(main)
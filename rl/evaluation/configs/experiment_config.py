@@ -1,4 +1,4 @@
-from typing import List, Callable
+from typing import Callable, List, Optional
 
 from rl.agents.base_agent_factory import BaseAgentFactory
 from rl.environment.base_fly_search_env import BaseFlySearchEnv
@@ -12,7 +12,12 @@ class ExperimentConfig:
                  scenario_mapper: BaseScenarioMapper, logger_factories: List[BaseLoggerFactory],
                  validator_factories: List[BaseValidatorFactory],
                  forgiveness: int, number_of_runs: int, continue_from_idx: int, number_of_glimpses: int,
-                 prompt_factory: Callable[[int, str, int], str]):
+                 prompt_factory: Callable[[int, str, int], str],
+                 environment_factory: Optional[Callable[[], BaseFlySearchEnv]] = None):
+        """
+        `environment_factory` makes new environments configured like `environment`. It's needed to run episodes on
+        several simulators concurrently, as every one of them needs its own environment.
+        """
         self.agent_factory = agent_factory
         self.environment = environment
         self.scenario_mapper = scenario_mapper
@@ -23,3 +28,4 @@ class ExperimentConfig:
         self.continue_from_idx = continue_from_idx
         self.number_of_glimpses = number_of_glimpses
         self.prompt_factory = prompt_factory
+        self.environment_factory = environment_factory
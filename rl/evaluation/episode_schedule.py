@@ -0,0 +1,81 @@
+from enum import Enum
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+# Cells per side of the grid object coordinates are quantized to before computing their Hilbert indices.
+HILBERT_ORDER = 16
+
+
+class EpisodeSchedule(str, Enum):
+    IN_ORDER = "in-order"
+    HILBERT = "hilbert"
+    NEAREST_NEIGHBOUR = "nearest-neighbour"
+
+
+def hilbert_indices(points: np.ndarray, order: int = HILBERT_ORDER) -> np.ndarray:
+    """Positions of (N, 2) `points` along a Hilbert curve covering their bounding box."""
+    side = 2 ** order
+    low = points.min(axis=0)
+    span = np.maximum(points.max(axis=0) - low, 1e-9)
+
+    cells = np.minimum(((points - low) / span * side).astype(np.int64), side - 1)
+    x, y = cells[:, 0].copy(), cells[:, 1].copy()
+    indices = np.zeros(len(points), dtype=np.int64)
+
+    s = side // 2
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        indices += s * s * ((3 * rx) ^ ry)
+
+        # Rotates the quadrant, so that the curve is continuous.
+        flip = ~ry & rx
+        x = np.where(flip, side - 1 - x, x)
+        y = np.where(flip, side - 1 - y, y)
+        x, y = np.where(~ry, y, x), np.where(~ry, x, y)
+
+        s //= 2
+
+    return indices
+
+
+def nearest_neighbour_tour(points: np.ndarray) -> np.ndarray:
+    """Greedy tour over (N, 2) `points`, starting from the first one."""
+    remaining = np.ones(len(points), dtype=bool)
+    tour = np.empty(len(points), dtype=np.int64)
+    current = 0
+
+    for step in range(len(points)):
+        tour[step] = current
+        remaining[current] = False
+
+        if step + 1 < len(points):
+            distances = np.sum((points - points[current]) ** 2, axis=1)
+            distances[~remaining] = np.inf
+            current = int(np.argmin(distances))
+
+    return tour
+
+
+def schedule_scenarios(scenarios: Sequence[Dict], schedule: EpisodeSchedule) -> List[int]:
+    """
+    Returns the order (positions in `scenarios`) in which the scenarios should be run, so that consecutive episodes
+    load nearby parts of the map.
+
+    Forest scenarios aren't grouped by the parameters the forest is generated from: these include the scenario's own
+    seed, so the forest is regenerated for every scenario anyway.
+    """
+    if schedule == EpisodeSchedule.IN_ORDER or len(scenarios) == 0:
+        return list(range(len(scenarios)))
+
+    points = np.array([scenario["object_coords"][:2] for scenario in scenarios], dtype=np.float64)
+
+    if schedule == EpisodeSchedule.HILBERT:
+        tour = np.argsort(hilbert_indices(points), kind="stable")
+    elif schedule == EpisodeSchedule.NEAREST_NEIGHBOUR:
+        tour = nearest_neighbour_tour(points)
+    else:
+        raise ValueError(f"Unknown schedule: {schedule}")
+
+    return tour.tolist()
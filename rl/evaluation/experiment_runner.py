@@ -1,15 +1,41 @@
 import random
-from typing import Sequence
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from queue import Empty, SimpleQueue
+from typing import List, Sequence, Tuple
 
+from glimpse_generators.simulator_pool import SimulatorPool
 from rl.environment.base_fly_search_env import BaseFlySearchEnv
 from rl.evaluation.configs.experiment_config import ExperimentConfig
+from rl.evaluation.episode_schedule import EpisodeSchedule, schedule_scenarios
 from rl.evaluation.trajectory_evaluator import TrajectoryEvaluator
+from scenarios.base_scenario_mapper import EpisodeIteratorMapper
+from scenarios.pregenerated_scenario_mapper import PregeneratedScenarioMapper
 
 
 class ExperimentRunner:
-    def __init__(self, config: ExperimentConfig, first_dummy: bool = True):
+    def __init__(self, config: ExperimentConfig, first_dummy: bool = True, simulators: int = 1,
+                 schedule: EpisodeSchedule = EpisodeSchedule.IN_ORDER):
+        """
+        With `simulators` > 1, that many simulator instances are started and episodes are run concurrently, one per
+        simulator, so that simulators don't sit idle while agents are thinking. Random scenarios are then generated up
+        front, so that every run gets the same scenario however the episodes end up spread over the simulators.
+
+        With a `schedule` other than in-order, episodes are run in an order that keeps consecutive ones close to each
+        other on the map (so less of it has to be streamed in), but are still logged under their original indices.
+        Random scenarios are then generated up front.
+        """
+        if simulators > 1 and config.environment_factory is None:
+            raise ValueError("Running episodes on several simulators needs an environment_factory in the config")
+
         self.config = config
         self.dummy = first_dummy
+        self.simulators = simulators
+        self.schedule = schedule
+
+        # Used only when running episodes concurrently.
+        self._scenario_lock = threading.Lock()
+        self._dummy_lock = threading.Lock()
 
         self.number_of_runs = config.number_of_runs
         if isinstance(config.scenario_mapper, Sequence):
@@ -29,18 +55,22 @@ class ExperimentRunner:
             for validator_factory in self.config.validator_factories
         ]
 
-        self.config.scenario_mapper.set_seed(seed)
+        scenario_mapper = self.config.scenario_mapper
+        if self.dummy and isinstance(scenario_mapper, PregeneratedScenarioMapper):
+            # If the dummy scenario were invalid, it would be redrawn, replacing the scenario of a real episode.
+            scenario_mapper = scenario_mapper.scenario_mapper
 
         trajectory_evaluator = TrajectoryEvaluator.prepare_simulator(
             agent_factory=self.config.agent_factory,
             environment=running_environment,
             max_glimpses=self.config.number_of_glimpses,
-            scenario_mapper=self.config.scenario_mapper,
+            scenario_mapper=scenario_mapper,
             validators=validators,
             seed=seed,
             forgiveness=self.config.forgiveness,
             prompt_factory=self.config.prompt_factory,
-            scenario_idx=run_idx
+            scenario_idx=run_idx,
+            scenario_lock=self._scenario_lock if self.simulators > 1 else None,
         )
         if not trajectory_evaluator:
             print(f"Skipping run {run_idx} due to invalid scenario")
@@ -59,17 +89,77 @@ class ExperimentRunner:
 
         trajectory_evaluator.evaluate(loggers)
 
+    def _get_episodes(self) -> List[Tuple[int, int]]:
+        """Returns (run index, seed) pairs in the order the episodes should be run."""
+        seeds = random.sample(
+            range(int(1e9)), self.config.number_of_runs
+        )
+        episodes = [(self.config.continue_from_idx + idx, seed) for idx, seed in enumerate(seeds)]
+
+        if self.schedule == EpisodeSchedule.IN_ORDER and self.simulators == 1:
+            return episodes
+
+        # Concurrent episodes would otherwise draw their scenarios in whatever order their workers get to them.
+        if isinstance(self.config.scenario_mapper, EpisodeIteratorMapper):
+            self.config.scenario_mapper = PregeneratedScenarioMapper(
+                self.config.scenario_mapper, seeds, first_idx=self.config.continue_from_idx
+            )
+
+        if self.schedule == EpisodeSchedule.IN_ORDER:
+            return episodes
+
+        scenarios = [self.config.scenario_mapper[run_idx] for run_idx, _ in episodes]
+        order = schedule_scenarios(scenarios, self.schedule)
+        print(f"Running episodes in {self.schedule.value} order")
+
+        return [episodes[position] for position in order]
+
     def _run_experiments(self, running_environment: BaseFlySearchEnv):
         if self.dummy:
             self._run_single_experiment(self.config.continue_from_idx, 42,
                                         running_environment)  # Dummy run for sanity check
 
-        seeds = random.sample(
-            range(int(1e9)), self.config.number_of_runs
-        )
-        for idx, seed in enumerate(seeds):
-            self._run_single_experiment(self.config.continue_from_idx + idx, seed, running_environment)
+        for run_idx, seed in self._get_episodes():
+            self._run_single_experiment(run_idx, seed, running_environment)
+
+    def _run_experiments_concurrently(self, pool: SimulatorPool):
+        episodes = SimpleQueue()
+
+        for episode in self._get_episodes():
+            episodes.put(episode)
+
+        def worker():
+            # Every worker needs its own environment, as environments hold the state of the current episode.
+            environment = self.config.environment_factory()
+
+            with pool.lease() as client:
+                environment.use_client(client)
+
+                with environment as running_environment:
+                    # Other workers wait until the sanity check passes.
+                    with self._dummy_lock:
+                        if self.dummy:
+                            self._run_single_experiment(self.config.continue_from_idx, 42, running_environment)
+
+                    while True:
+                        try:
+                            run_idx, seed = episodes.get_nowait()
+                        except Empty:
+                            return
+
+                        self._run_single_experiment(run_idx, seed, running_environment)
+
+        with ThreadPoolExecutor(max_workers=pool.size) as executor:
+            workers = [executor.submit(worker) for _ in range(pool.size)]
+
+            for finished_worker in workers:
+                finished_worker.result()
 
     def run(self):
+        if self.simulators > 1:
+            with SimulatorPool(self.config.environment.get_client, self.simulators) as pool:
+                self._run_experiments_concurrently(pool)
+            return
+
         with self.config.environment as running_environment:
             self._run_experiments(running_environment)
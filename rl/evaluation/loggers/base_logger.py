@@ -20,6 +20,10 @@ class BaseLogger(ABC):
     def log_termination(self, termination_info: Dict):
         raise NotImplementedError
 
+    def log_rpc_trace(self, rpc_trace: Dict):
+        """Per-command latency histograms of the simulator requests made during the episode. Ignored by default."""
+        pass
+
     @abstractmethod
     def nuke(self):
         raise NotImplementedError
@@ -84,6 +84,10 @@ class LocalFSLogger(BaseLogger):
         with open(self.log_dir / "termination.txt", "w") as f:
             f.write(termination_info["reason"])
 
+    def log_rpc_trace(self, rpc_trace):
+        with open(self.log_dir / "rpc_trace.json", "w") as f:
+            json.dump(rpc_trace, f, indent=4)
+
     def nuke(self):
         shutil.rmtree(self.log_dir)
         self.log_dir.mkdir()
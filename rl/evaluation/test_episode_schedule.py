@@ -0,0 +1,91 @@
+import random
+
+import numpy as np
+import pytest
+
+from rl.evaluation.configs.experiment_config import ExperimentConfig
+from rl.evaluation.episode_schedule import EpisodeSchedule, hilbert_indices, schedule_scenarios
+from rl.evaluation.experiment_runner import ExperimentRunner
+from rl.evaluation.test_trajectory_evaluator import (
+    AgentFactoryMock,
+    AgentMock,
+    EnvironmentMock,
+    ScenarioMapperMock,
+    prompt_func,
+)
+from rl.evaluation.trajectory_evaluator import TrajectoryEvaluator
+from scenarios.pregenerated_scenario_mapper import PregeneratedScenarioMapper
+
+
+def city_scenarios(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [{"object_coords": (x, y, 0.0)} for x, y in rng.uniform(-1e5, 1e5, size=(n, 2)).tolist()]
+
+
+def tour_length(scenarios, order):
+    points = np.array([scenarios[position]["object_coords"][:2] for position in order])
+    return np.sum(np.linalg.norm(np.diff(points, axis=0), axis=1))
+
+
+def make_config(scenario_mapper, number_of_runs, continue_from_idx=0):
+    return ExperimentConfig(agent_factory=None, environment=None, scenario_mapper=scenario_mapper,
+                            logger_factories=[], validator_factories=[], forgiveness=0,
+                            number_of_runs=number_of_runs, continue_from_idx=continue_from_idx,
+                            number_of_glimpses=10, prompt_factory=None)
+
+
+class TestEpisodeSchedule:
+    def test_hilbert_curve_visits_neighbouring_cells(self):
+        cells = np.array([(x, y) for x in range(4) for y in range(4)], dtype=np.float64)
+        indices = hilbert_indices(cells, order=2)
+
+        assert sorted(indices.tolist()) == list(range(16))
+
+        path = cells[np.argsort(indices)]
+        assert np.all(np.abs(np.diff(path, axis=0)).sum(axis=1) == 1)
+
+    @pytest.mark.parametrize("schedule", [EpisodeSchedule.HILBERT, EpisodeSchedule.NEAREST_NEIGHBOUR])
+    def test_schedules_shorten_the_tour(self, schedule):
+        scenarios = city_scenarios(500)
+        order = schedule_scenarios(scenarios, schedule)
+
+        assert sorted(order) == list(range(500))
+        assert tour_length(scenarios, order) < tour_length(scenarios, range(500)) / 5
+
+    def test_in_order(self):
+        assert schedule_scenarios(city_scenarios(5), EpisodeSchedule.IN_ORDER) == [0, 1, 2, 3, 4]
+
+class TestScheduledExperimentRunner:
+    def test_random_scenarios_keep_their_indices_and_seeds(self):
+        scenario_mapper = ScenarioMapperMock(seed=0)
+        scenario_mapper.set_dict_with_returns({"object_coords": (0.0, 0.0, 0.0)})
+        runner = ExperimentRunner(make_config(scenario_mapper, 20, continue_from_idx=5), first_dummy=False,
+                                  schedule=EpisodeSchedule.NEAREST_NEIGHBOUR)
+
+        random.seed(1)
+        in_order = [(idx, seed) for idx, seed in enumerate(random.sample(range(int(1e9)), 20), start=5)]
+
+        random.seed(1)
+        episodes = runner._get_episodes()
+
+        assert sorted(episodes) == in_order
+        assert isinstance(runner.config.scenario_mapper, PregeneratedScenarioMapper)
+
+        for run_idx, seed in episodes:
+            assert runner.config.scenario_mapper[run_idx]["seed"] == seed
+
+    def test_invalid_scenarios_are_redrawn(self):
+        scenario_mapper = ScenarioMapperMock(seed=0)
+        scenario_mapper.set_dict_with_returns({"object_coords": (0.0, 0.0, 0.0)})
+        pregenerated = PregeneratedScenarioMapper(scenario_mapper, [11, 12], first_idx=5)
+
+        environment = EnvironmentMock()
+        environment.set_throws_on_reset(2)
+        evaluator = TrajectoryEvaluator.prepare_simulator(
+            AgentFactoryMock(AgentMock()), environment, 6, pregenerated, [], 12, 10, prompt_func, 6
+        )
+
+        assert evaluator is not None
+        assert len(environment.configs_passed) == 3
+        assert evaluator.scenario["throws"] == 2
+        assert evaluator.scenario["seed"] == 12 and pregenerated[6] is evaluator.scenario
@@ -0,0 +1,101 @@
+import threading
+from contextlib import contextmanager
+
+import pytest
+
+from rl.evaluation.experiment_runner import ExperimentRunner
+from rl.evaluation.test_episode_schedule import make_config
+from rl.evaluation.test_trajectory_evaluator import (
+    AgentFactoryMock,
+    AgentMock,
+    EnvironmentMock,
+    ScenarioMapperMock,
+    prompt_func,
+)
+from rl.evaluation.trajectory_evaluator import TrajectoryEvaluator
+from scenarios.pregenerated_scenario_mapper import PregeneratedScenarioMapper
+
+
+class WorkerEnvironmentMock:
+    def __init__(self):
+        self.client = None
+
+    def use_client(self, client):
+        self.client = client
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+class SimulatorPoolMock:
+    def __init__(self, size):
+        self.size = size
+        self.clients = iter(range(size))
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def lease(self):
+        with self._lock:
+            client = next(self.clients)
+        yield client
+
+
+class TestConcurrentExperimentRunner:
+    def test_every_worker_gets_its_own_environment(self):
+        environments = []
+
+        def environment_factory():
+            environments.append(WorkerEnvironmentMock())
+            return environments[-1]
+
+        config = make_config(ScenarioMapperMock(seed=0), number_of_runs=8)
+        config.environment_factory = environment_factory
+        runner = ExperimentRunner(config, first_dummy=False, simulators=2)
+
+        runs = []
+        runner._run_single_experiment = lambda run_idx, seed, environment: runs.append((run_idx, environment))
+        runner._run_experiments_concurrently(SimulatorPoolMock(2))
+
+        assert len(environments) == 2
+        assert {environment.client for environment in environments} == {0, 1}
+        assert sorted(run_idx for run_idx, _ in runs) == list(range(8))
+        assert {id(environment) for _, environment in runs} <= {id(environment) for environment in environments}
+
+    def test_concurrent_runs_need_an_environment_factory(self):
+        with pytest.raises(ValueError):
+            ExperimentRunner(make_config(ScenarioMapperMock(seed=0), number_of_runs=8), simulators=2)
+
+    def test_concurrent_runs_get_pregenerated_scenarios(self):
+        config = make_config(ScenarioMapperMock(seed=0), number_of_runs=4, continue_from_idx=3)
+        config.environment_factory = WorkerEnvironmentMock
+        runner = ExperimentRunner(config, first_dummy=False, simulators=2)
+
+        episodes = runner._get_episodes()
+
+        assert [run_idx for run_idx, _ in episodes] == [3, 4, 5, 6]
+        assert isinstance(runner.config.scenario_mapper, PregeneratedScenarioMapper)
+
+        for run_idx, seed in episodes:
+            assert runner.config.scenario_mapper[run_idx]["seed"] == seed
+
+    def test_invalid_dummy_scenario_does_not_replace_a_real_one(self, monkeypatch):
+        monkeypatch.setattr(TrajectoryEvaluator, "evaluate", lambda self, loggers: None)
+
+        pregenerated = PregeneratedScenarioMapper(ScenarioMapperMock(seed=0), [11, 12], first_idx=5)
+        first_scenario = pregenerated[5]
+
+        config = make_config(pregenerated, number_of_runs=2, continue_from_idx=5)
+        config.agent_factory = AgentFactoryMock(AgentMock())
+        config.prompt_factory = prompt_func
+        runner = ExperimentRunner(config)
+
+        environment = EnvironmentMock()
+        environment.set_throws_on_reset(1)
+        runner._run_single_experiment(5, 42, environment)
+
+        assert not runner.dummy
+        assert [scenario["seed"] for scenario in environment.configs_passed] == [42, 42]
+        assert pregenerated[5] is first_scenario and first_scenario["seed"] == 11
@@ -1,5 +1,6 @@
 from typing import Dict
 
+from glimpse_generators.rpc_tracer import RpcTracer
 from rl.agents.base_agent import BaseAgent
 from rl.agents.base_agent_factory import BaseAgentFactory
 from rl.environment.base_fly_search_env import DroneCannotSeeTargetException
@@ -38,8 +39,10 @@ class EnvironmentMock:
         self.info_returned = None
         self.return_terminated = False
         self.resources_initialized = True
+        self.rpc_tracer = RpcTracer()
 
     def reset(self, seed=None, options=None):
+        self.rpc_tracer.record("vbp RunPCG", 0.5)
         self.configs_passed.append(options)
         if self.throws_on_reset != 0:
             self.throws_on_reset -= 1
@@ -47,6 +50,7 @@ class EnvironmentMock:
         return self.obs_returned, self.info_returned
 
     def step(self, action):
+        self.rpc_tracer.record("vget /camera/lit", 0.1, payload_bytes=3000000)
         self.actions_passed.append(action)
         return self.obs_returned, 0.0, self.return_terminated, False, self.info_returned
 
@@ -116,6 +120,7 @@ class LoggerMock(BaseLogger):
     def __init__(self):
         self.termination_info = []
         self.evaluation_states = []
+        self.rpc_traces = []
 
     def log(self, evaluation_state: EvaluationState):
         self.evaluation_states.append(evaluation_state)
@@ -123,6 +128,9 @@ class LoggerMock(BaseLogger):
     def log_termination(self, termination_info: Dict):
         self.termination_info.append(termination_info)
 
+    def log_rpc_trace(self, rpc_trace: Dict):
+        self.rpc_traces.append(rpc_trace)
+
     def nuke(self):
         pass
 
@@ -382,3 +390,24 @@ class TestTrajectoryEvaluator:
         assert len(logger.termination_info) == 1
         assert logger.evaluation_states[0].agent_info == {"eee": 42}
         assert logger.termination_info[0] == {"reason": "found claimed"}
+
+    def test_loggers_get_rpc_trace_of_the_episode(self):
+        env_mock = EnvironmentMock()
+        agent_mock = AgentMock()
+        agent_factory = AgentFactoryMock(agent_mock)
+        mapper = ScenarioMapperMock(seed=155)
+        logger = LoggerMock()
+
+        env_mock.rpc_tracer.record("vget /camera/lit", 0.1)  # Previous episode
+        agent_mock.set_action_to_return({"found": 0, "coordinate_change": (1, 2, 3)})
+
+        evaluator = TrajectoryEvaluator.prepare_simulator(
+            agent_factory, env_mock, 2, mapper, [], 155, 3, prompt_func, 0
+        )
+
+        evaluator.evaluate([logger])
+
+        assert len(logger.rpc_traces) == 1
+        assert list(logger.rpc_traces[0]) == ["vbp RunPCG", "vget /camera/lit"]
+        assert logger.rpc_traces[0]["vget /camera/lit"]["count"] == 2
+        assert logger.rpc_traces[0]["vget /camera/lit"]["payload_bytes"] == 6000000
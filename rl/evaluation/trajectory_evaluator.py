@@ -1,5 +1,8 @@
+import threading
+from contextlib import nullcontext
 from typing import Dict, List, Optional
 
+from glimpse_generators.readiness import ReadinessTimeoutException
 from glimpse_generators.unreal_client_wrapper import UnrealDiedException
 from response_parsers.xml_response_parser import ParsingError
 from rl.agents.base_agent_factory import BaseAgentFactory
@@ -8,6 +11,7 @@ from rl.evaluation.evaluation_state import EvaluationState
 from rl.evaluation.loggers.base_logger import BaseLogger
 from rl.evaluation.validators.base_validator import BaseValidator
 from scenarios.base_scenario_mapper import BaseScenarioMapper, EpisodeCollectionMapper, EpisodeIteratorMapper
+from scenarios.pregenerated_scenario_mapper import PregeneratedScenarioMapper
 
 
 class TrajectoryEvaluator:
@@ -61,15 +65,28 @@ class TrajectoryEvaluator:
                           seed: int,
                           forgiveness: int,
                           prompt_factory,
-                          scenario_idx: Optional[int]) -> Optional['TrajectoryEvaluator']:
+                          scenario_idx: Optional[int],
+                          scenario_lock: Optional[threading.Lock] = None) -> Optional['TrajectoryEvaluator']:
+        """
+        `scenario_lock` has to be passed if scenarios are drawn from the same mapper by episodes running concurrently.
+        """
+        scenario_lock = scenario_lock or nullcontext()
 
-        if isinstance(scenario_mapper, EpisodeCollectionMapper):
-            assert scenario_idx is not None, "scenario_idx must be provided when using EpisodeCollectionMapper"
-            scenario = scenario_mapper[scenario_idx]
-        elif isinstance(scenario_mapper, EpisodeIteratorMapper):
-            scenario = next(scenario_mapper)
-        else:
-            raise ValueError("agent_factory must be an EpisodeIteratorMapper or EpisodeCollectionMapper")
+        # Mappers generate scenarios based on their seed, so setting it and drawing a scenario must happen atomically.
+        with scenario_lock:
+            scenario_mapper.set_seed(seed)
+
+            if isinstance(scenario_mapper, EpisodeCollectionMapper):
+                assert scenario_idx is not None, "scenario_idx must be provided when using EpisodeCollectionMapper"
+                scenario = scenario_mapper[scenario_idx]
+            elif isinstance(scenario_mapper, EpisodeIteratorMapper):
+                scenario = next(scenario_mapper)
+            else:
+                raise ValueError("agent_factory must be an EpisodeIteratorMapper or EpisodeCollectionMapper")
+
+        # Episode's trace starts with preparing its scene, which is where PCG and partition loading waits happen.
+        if environment.rpc_tracer is not None:
+            environment.rpc_tracer.reset_histograms()
 
         throws = 0
         max_retries = 30
@@ -91,12 +108,20 @@ class TrajectoryEvaluator:
                     first_info=first_info,
                     scenario=scenario
                 )
-            except UnrealDiedException:
+            except (UnrealDiedException, ReadinessTimeoutException):
                 continue
             except InvalidScenarioException as ex:
                 if isinstance(scenario_mapper, EpisodeIteratorMapper):
                     print(f"Invalid scenario {scenario} due to {str(ex)}, re-generating scenario.")
-                    scenario = next(scenario_mapper)
+                    with scenario_lock:
+                        scenario_mapper.set_seed(seed)
+                        scenario = next(scenario_mapper)
+                    throws += 1
+                    continue
+                elif isinstance(scenario_mapper, PregeneratedScenarioMapper):
+                    print(f"Invalid scenario {scenario} due to {str(ex)}, re-generating scenario.")
+                    with scenario_lock:
+                        scenario = scenario_mapper.redraw(scenario_idx)
                     throws += 1
                     continue
                 else:
@@ -126,6 +151,15 @@ class TrajectoryEvaluator:
         for logger in loggers:
             logger.log_termination(termination_info)
 
+    def tell_loggers_about_rpc_trace(self, loggers):
+        if self.environment.rpc_tracer is None:
+            return
+
+        rpc_trace = self.environment.rpc_tracer.export_histograms()
+
+        for logger in loggers:
+            logger.log_rpc_trace(rpc_trace)
+
     @staticmethod
     def tell_loggers(loggers, evaluation_state: EvaluationState):
         for logger in loggers:
@@ -162,6 +196,7 @@ class TrajectoryEvaluator:
         while not success:
             try:
                 self._evaluate_unsafe(loggers)
+                self.tell_loggers_about_rpc_trace(loggers)
                 success = True
             except UnrealDiedException:
                 if self.scenario is None:
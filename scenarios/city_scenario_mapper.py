@@ -1,11 +1,16 @@
 import math
 import os
+import random
 from enum import Enum
-from typing import Tuple, Any, Dict
+from typing import Tuple, Any, Dict, List, Optional
 
+import numpy as np
 import pandas as pd
 
 from scenarios.base_scenario_mapper import EpisodeIteratorMapper
+from scenarios.city_validity_index import LocationValidity, load_validity_index, valid_locations_mask
+
+LOCATION_COLUMNS = ("X", "Y", "Z", "P", "Q", "R")
 
 
 class CityScenarioMapper(EpisodeIteratorMapper):
@@ -38,7 +43,15 @@ class CityScenarioMapper(EpisodeIteratorMapper):
             y_max: float = math.inf,
             alpha: float = 0.5,
             random_sun: bool = False,
+            require_object_in_sight: bool = False,
+            validity_index: Optional[pd.DataFrame] = None,
     ):
+        """
+        Locations known (from the validity index, see `rl.environment.validate_city_locations`) to fail the checks done
+        by the environment for an object type are never sampled for it. The index is only a pre-filter: the environment
+        still checks every scenario, and scenarios passing the index may be rejected. `require_object_in_sight` should
+        match the environment's. By default, the index is loaded from LOCATIONS_CITY_INDEX_PATH (if it exists).
+        """
         super().__init__(object_probs, CityScenarioMapper.ObjectType)
 
         self.drone_z_rel_min = drone_z_rel_min
@@ -58,71 +71,140 @@ class CityScenarioMapper(EpisodeIteratorMapper):
                 "LOCATIONS_CITY_PATH environment variable must be set to the path of the locations_city.csv file"
             )
 
-        self.possible_locations = pd.read_csv(possible_location_csv_path)
-
-        # Drop locations that are not in the specified range
-        self.possible_locations = self.possible_locations[
-            self.possible_locations["X"] >= x_min
-            ]
-        self.possible_locations = self.possible_locations[
-            self.possible_locations["X"] <= x_max
-            ]
+        locations = pd.read_csv(possible_location_csv_path)
 
-        self.possible_locations = self.possible_locations[
-            self.possible_locations["Y"] >= y_min
-            ]
-        self.possible_locations = self.possible_locations[
-            self.possible_locations["Y"] <= y_max
-            ]
+        # Locations (X, Y, Z, P, Q, R) are kept in a contiguous array, together with their rows in the CSV file. There's
+        # no spatial index over them: locations are only ever sampled uniformly by index (bounds are a single mask),
+        # so nothing would query it.
+        in_bounds = (
+            (locations["X"] >= x_min).to_numpy() & (locations["X"] <= x_max).to_numpy()
+            & (locations["Y"] >= y_min).to_numpy() & (locations["Y"] <= y_max).to_numpy()
+        )
+        self.locations = np.ascontiguousarray(locations[list(LOCATION_COLUMNS)].to_numpy(dtype=np.float64)[in_bounds])
+        self.location_rows = locations.index.to_numpy()[in_bounds]
 
         self._validate_object_probs()
 
-    def __next__(self) -> Dict[str, Any]:
-        object_type = self.sample_object_from_object_probs()
-        row = self.possible_locations.sample(n=1).iloc[0]
+        if validity_index is None:
+            validity_index = load_validity_index()
 
-        object_x = row["X"]
-        object_y = row["Y"]
-        object_z = row["Z"]
+        self.validity_index = validity_index
+        self.required_validity = LocationValidity.VISIBLE if require_object_in_sight else LocationValidity.PLACEMENT_OK
+        self._locations_per_object_type: Dict[CityScenarioMapper.ObjectType, np.ndarray] = {}
 
-        # Rotations
-        object_rot_p = row["P"]
-        object_rot_q = row["Q"]
-        object_rot_r = row["R"]
+    @property
+    def possible_locations(self) -> pd.DataFrame:
+        return pd.DataFrame(self.locations, columns=list(LOCATION_COLUMNS), index=self.location_rows)
 
-        drone_z = self.sample_value_between(
-            object_z + self.drone_z_rel_min, object_z + self.drone_z_rel_max
-        )
+    def get_possible_locations(self, object_type: ObjectType) -> np.ndarray:
+        """Returns indices (into `locations`) of the locations that can be sampled for `object_type`."""
+        if object_type not in self._locations_per_object_type:
+            candidates = np.arange(len(self.locations))
 
-        drone_x, drone_y = CityScenarioMapper.sample_drone_position(
-            object_x, object_y, drone_z, alpha=self.alpha
-        )
+            if self.validity_index is not None and object_type.name in self.validity_index.columns:
+                mask = valid_locations_mask(self.validity_index, object_type.name, self.required_validity)
+                valid = candidates[mask.reindex(self.location_rows, fill_value=True).to_numpy(dtype=bool)]
+
+                if len(valid) > 0:
+                    candidates = valid
+                else:
+                    print(f"No valid locations for {object_type.name} in the validity index, ignoring it.")
+
+            self._locations_per_object_type[object_type] = candidates
+
+        return self._locations_per_object_type[object_type]
+
+    def sample_object_types(self, n: int, rng: np.random.Generator) -> List[ObjectType]:
+        """Vectorized `sample_object_from_object_probs`."""
+        groups = list(self.object_probs)
+        cumulative_probabilities = np.cumsum([self.object_probs[group] for group in groups])
+
+        draws = rng.random(n)
+        chosen_groups = np.searchsorted(cumulative_probabilities, draws, side="left")
+
+        if (chosen_groups >= len(groups)).any():
+            raise ValueError("Probabilities do not sum to 1")
+
+        # Members of a group (tuple) are equally likely.
+        member_draws = rng.random(n)
+
+        object_types = []
+        for group_index, member_draw in zip(chosen_groups, member_draws):
+            group = groups[group_index]
+
+            if type(group) is tuple:
+                group = group[int(member_draw * len(group))]
 
-        drone_x = drone_x - object_x
-        drone_y = drone_y - object_y
+            object_types.append(group)
 
-        drone_x = int(drone_x / 100)
-        drone_y = int(drone_y / 100)
-        drone_z = int(drone_z / 100)
+        return object_types
 
-        return_dict = {
-            "object_coords": (object_x, object_y, object_z),
-            "object_rot": (object_rot_p, object_rot_q, object_rot_r),
-            "object_type": object_type,
-            "drone_rel_coords": (drone_x, drone_y, drone_z),
-            "set_object": True,
-            "regenerate_city": True,
-            "seed": self.seed,
-        }
+    def sample_batch(self, n: int, rng: Optional[np.random.Generator] = None) -> List[Dict[str, Any]]:
+        """
+        Generates `n` scenarios at once (same distribution as `__next__`). By default, the generator is seeded from
+        the `random` module, as the rest of the mappers' sampling.
+        """
+        if rng is None:
+            rng = np.random.default_rng(random.getrandbits(64))
+
+        object_types = self.sample_object_types(n, rng)
+
+        location_indices = np.empty(n, dtype=np.int64)
+        object_type_indices = np.array([object_type.value for object_type in object_types])
+
+        for object_type in set(object_types):
+            scenarios_of_type = np.flatnonzero(object_type_indices == object_type.value)
+            location_indices[scenarios_of_type] = rng.choice(
+                self.get_possible_locations(object_type), size=len(scenarios_of_type)
+            )
+
+        locations = self.locations[location_indices]
+        object_x, object_y, object_z = locations[:, 0], locations[:, 1], locations[:, 2]
+
+        drone_z = rng.uniform(object_z + self.drone_z_rel_min, object_z + self.drone_z_rel_max)
+
+        if (drone_z < 0).any():
+            raise ValueError("Drone height must be positive")
+
+        # Same as `sample_drone_position`.
+        drone_x = rng.uniform(object_x - self.alpha * drone_z, object_x + self.alpha * drone_z)
+        drone_y = rng.uniform(object_y - self.alpha * drone_z, object_y + self.alpha * drone_z)
+
+        drone_rel_coords = np.stack([
+            np.trunc((drone_x - object_x) / 100),
+            np.trunc((drone_y - object_y) / 100),
+            np.trunc(drone_z / 100),
+        ], axis=1).astype(np.int64).tolist()
 
         if self.random_sun:
-            sun_y = self.sample_value_between(-90, -10)
-            sun_z = self.sample_value_between(0, 360)
+            sun_y = rng.uniform(-90, -10, size=n).tolist()
+            sun_z = rng.uniform(0, 360, size=n).tolist()
+
+        # Plain Python numbers, so that scenarios are logged (and parsed back) as before.
+        locations = locations.tolist()
+
+        scenarios = []
+        for i in range(n):
+            scenario = {
+                "object_coords": tuple(locations[i][0:3]),
+                "object_rot": tuple(locations[i][3:6]),
+                "object_type": object_types[i],
+                "drone_rel_coords": tuple(drone_rel_coords[i]),
+                "set_object": True,
+                "regenerate_city": True,
+                "seed": self.seed,
+            }
 
-            return_dict["sun_y"] = sun_y
-            return_dict["sun_z"] = sun_z
+            if self.random_sun:
+                scenario["sun_y"] = sun_y[i]
+                scenario["sun_z"] = sun_z[i]
 
-        return return_dict
+            scenarios.append(scenario)
+
+        return scenarios
+
+    def __next__(self) -> Dict[str, Any]:
+        return self.sample_batch(1)[0]
 
     def get_description(self, object_type):
         if object_type != CityScenarioMapper.ObjectType.ANOMALY:
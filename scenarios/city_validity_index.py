@@ -0,0 +1,52 @@
+import os
+from enum import IntFlag
+from typing import Optional
+
+import pandas as pd
+
+
+class LocationValidity(IntFlag):
+    """
+    Results of the offline checks of a location (row of `locations_city.csv`) for an object type. They are a pre-filter
+    only: the checks are done with one object of the type (the one of seed 0) from straight above, while scenarios use
+    other objects of the type and other drone positions, so the environment still runs its checks on every scenario.
+    """
+    VALIDATED = 1  # The location was checked at all (unchecked locations are assumed to be valid)
+    PLACEMENT_OK = 2  # The object isn't inside a building or a wall
+    VISIBLE = 4  # The object can be seen from straight above, at `REFERENCE_ALTITUDE`
+
+
+# Meters above the object; the lowest starting altitude of FS-1.
+REFERENCE_ALTITUDE = 30
+
+
+def get_validity_index_path() -> str:
+    possible_index_path = os.getenv("LOCATIONS_CITY_INDEX_PATH")
+
+    if possible_index_path is None or possible_index_path == "":
+        possible_index_path = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "locations_city_validity.csv"
+        )
+
+    return possible_index_path
+
+
+def load_validity_index(path: Optional[str] = None) -> Optional[pd.DataFrame]:
+    """
+    Returns the validity index (indexed by row of `locations_city.csv`, with a column of `LocationValidity` flags per
+    object type name) or None if it hasn't been computed.
+    """
+    path = path or get_validity_index_path()
+
+    if not os.path.isfile(path):
+        return None
+
+    return pd.read_csv(path, index_col=0)
+
+
+def valid_locations_mask(index: pd.DataFrame, object_type_name: str, required: LocationValidity) -> pd.Series:
+    # Flags are plain ints in the index (pandas treats IntFlag members as sequences).
+    flags, required = index[object_type_name], int(required)
+    validated = (flags & int(LocationValidity.VALIDATED)) != 0
+
+    return ~validated | ((flags & required) == required)
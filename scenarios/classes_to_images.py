@@ -1,56 +1,85 @@
-from PIL import Image
+import threading
 from pathlib import Path
+from typing import Dict, Mapping, Tuple
+
+from PIL import Image
 
+from misc.cv2_and_numpy import Frame
 from scenarios.city_scenario_mapper import CityScenarioMapper
 
 CLASS_IMAGES_DIR = (
     Path(__file__).resolve().parent.parent / "web" / "client" / "public" / "targets"
 )
 
-classes_to_images = {
-    CityScenarioMapper.ObjectType.FIRE: Image.open(
-        CLASS_IMAGES_DIR / "fire.png.jpg"
-    ),
-    CityScenarioMapper.ObjectType.CROWD: Image.open(
-        CLASS_IMAGES_DIR / "crowd.png.jpg"
-    ),
-    CityScenarioMapper.ObjectType.POLICE_CAR: Image.open(
-        CLASS_IMAGES_DIR / "police_car.png.jpg"
-    ),
-    CityScenarioMapper.ObjectType.WHITE_SPORT_CAR: Image.open(
-        CLASS_IMAGES_DIR / "white_sport_car.png.jpg"
-    ),
-    CityScenarioMapper.ObjectType.RED_SPORT_CAR: Image.open(
-        CLASS_IMAGES_DIR / "red_sport_car.png.jpg"
-    ),
-    CityScenarioMapper.ObjectType.BLUE_SPORT_CAR: Image.open(
-        CLASS_IMAGES_DIR / "blue_sport_car.png.jpg"
-    ),
-    CityScenarioMapper.ObjectType.BEIGE_SPORT_CAR: Image.open(
-        CLASS_IMAGES_DIR / "beige_sport_car.png.jpg"
-    ),
-    CityScenarioMapper.ObjectType.BLACK_TRUCK: Image.open(
-        CLASS_IMAGES_DIR / "black_truck.png.jpg"
-    ),
-    CityScenarioMapper.ObjectType.WHITE_TRUCK: Image.open(
-        CLASS_IMAGES_DIR / "white_truck.png.jpg"
-    ),
-    CityScenarioMapper.ObjectType.RED_PICKUP_TRUCK: Image.open(
-        CLASS_IMAGES_DIR / "red_pickup_truck.png.jpg"
-    ),
-    CityScenarioMapper.ObjectType.GREEN_PICKUP_TRUCK: Image.open(
-        CLASS_IMAGES_DIR / "green_pickup_truck.png.jpg"
-    ),
-    CityScenarioMapper.ObjectType.BLACK_PICKUP_TRUCK: Image.open(
-        CLASS_IMAGES_DIR / "black_pickup_truck.png.jpg"
-    ),
-    CityScenarioMapper.ObjectType.WHITE_PICKUP_TRUCK: Image.open(
-        CLASS_IMAGES_DIR / "white_pickup_truck.png.jpg"
-    ),
-    CityScenarioMapper.ObjectType.ROAD_CONSTRUCTION_SITE: Image.open(
-        CLASS_IMAGES_DIR / "road_construction_site.png.jpg"
-    ),
-    CityScenarioMapper.ObjectType.LARGE_TRASH_PILE: Image.open(
-        CLASS_IMAGES_DIR / "large_trash_pile.png.jpg"
-    ),
+CLASS_IMAGE_FILES = {
+    CityScenarioMapper.ObjectType.FIRE: "fire.png.jpg",
+    CityScenarioMapper.ObjectType.CROWD: "crowd.png.jpg",
+    CityScenarioMapper.ObjectType.POLICE_CAR: "police_car.png.jpg",
+    CityScenarioMapper.ObjectType.WHITE_SPORT_CAR: "white_sport_car.png.jpg",
+    CityScenarioMapper.ObjectType.RED_SPORT_CAR: "red_sport_car.png.jpg",
+    CityScenarioMapper.ObjectType.BLUE_SPORT_CAR: "blue_sport_car.png.jpg",
+    CityScenarioMapper.ObjectType.BEIGE_SPORT_CAR: "beige_sport_car.png.jpg",
+    CityScenarioMapper.ObjectType.BLACK_TRUCK: "black_truck.png.jpg",
+    CityScenarioMapper.ObjectType.WHITE_TRUCK: "white_truck.png.jpg",
+    CityScenarioMapper.ObjectType.RED_PICKUP_TRUCK: "red_pickup_truck.png.jpg",
+    CityScenarioMapper.ObjectType.GREEN_PICKUP_TRUCK: "green_pickup_truck.png.jpg",
+    CityScenarioMapper.ObjectType.BLACK_PICKUP_TRUCK: "black_pickup_truck.png.jpg",
+    CityScenarioMapper.ObjectType.WHITE_PICKUP_TRUCK: "white_pickup_truck.png.jpg",
+    CityScenarioMapper.ObjectType.ROAD_CONSTRUCTION_SITE: "road_construction_site.png.jpg",
+    CityScenarioMapper.ObjectType.LARGE_TRASH_PILE: "large_trash_pile.png.jpg",
 }
+
+
+class ClassImageRegistry:
+    """
+    Sample images of the searched object classes (shown to the agent if the difficulty level gives a visual sample).
+    Images are loaded on first use, and the observation-ready frames are made once per (class, resolution), so
+    showing a sample on every step is a dictionary lookup.
+
+    `registry[object_type]` gives the sample image as it was stored.
+    """
+
+    def __init__(self, files: Mapping = CLASS_IMAGE_FILES, directory: Path = CLASS_IMAGES_DIR):
+        self.files = dict(files)
+        self.directory = directory
+
+        self.images: Dict = {}
+        self.frames: Dict[Tuple, Frame] = {}
+        # Environments running concurrently share the registry.
+        self._lock = threading.Lock()
+
+    def __contains__(self, object_type) -> bool:
+        return object_type in self.files
+
+    def __getitem__(self, object_type) -> Image.Image:
+        image = self.images.get(object_type)
+
+        if image is None:
+            with Image.open(self.directory / self.files[object_type]) as stored_image:
+                image = stored_image.convert("RGB")
+
+            with self._lock:
+                image = self.images.setdefault(object_type, image)
+
+        return image
+
+    def get_frame(self, object_type, resolution: int) -> Frame:
+        """
+        The sample resized to `resolution` x `resolution`, as put into observations. It's shared by every observation
+        asking for it, so it's read-only.
+        """
+        key = (object_type, resolution)
+        frame = self.frames.get(key)
+
+        if frame is None:
+            frame = Frame.from_pil(self[object_type].resize((resolution, resolution)))
+            frame.flags.writeable = False
+            frame.rgb.flags.writeable = False
+
+            with self._lock:
+                frame = self.frames.setdefault(key, frame)
+
+        return frame
+
+
+classes_to_images = ClassImageRegistry()
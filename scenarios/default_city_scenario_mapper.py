@@ -2,7 +2,7 @@ from scenarios.city_scenario_mapper import CityScenarioMapper
 
 
 class DefaultCityScenarioMapper(CityScenarioMapper):
-    def __init__(self, drone_alt_min, drone_alt_max, alpha=0.5, random_sun=False):
+    def __init__(self, drone_alt_min, drone_alt_max, alpha=0.5, random_sun=False, require_object_in_sight=False):
         super().__init__(
             object_probs={
                 (
@@ -27,4 +27,5 @@ class DefaultCityScenarioMapper(CityScenarioMapper):
             drone_z_rel_max=drone_alt_max * 100,
             alpha=alpha,
             random_sun=random_sun,
+            require_object_in_sight=require_object_in_sight,
         )
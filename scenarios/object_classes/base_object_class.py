@@ -1,8 +1,7 @@
 import re
 from random import Random
-from typing import List
+from typing import Collection, Dict, List
 
-from glimpse_generators.unreal_client_wrapper import UnrealException
 from glimpse_generators.unrealcv_fix import Client
 
 
@@ -12,53 +11,87 @@ class BaseObjectClass:
         self.client = client
         self.visible = False  # By default, objects are hidden. This also means that we don't need to care about binary restarts if something goes wrong.
 
-    def _hide_object(self, object_id: str):
-        id_number = int(re.findall(r"\d+", object_id)[-1])
+    @staticmethod
+    def _needs_hiding(object_id: str) -> bool:
+        # Fires need also hiding, as it extinguishes them. Fire may burn even after being moved, which is why we need this.
+        return "Niagara" in object_id or object_id in [
+            "BP_Configuration_13_C_UAID_08BFB8191750E53702_1640163914",
+            "BP_Configuration_12_C_UAID_08BFB8191750E53702_1361488908",
+            "SkeletalMeshActor_UAID_08BFB8191750E43702_1589650724",
+        ]
 
-        print(
-            f"BaseObjectClass _hide_object, object id_number of {object_id} is {id_number}"
-        )
+    def _hidden_state(self, object_id: str) -> Dict:
+        id_number = int(re.findall(r"\d+", object_id)[-1])
 
         x = id_number // 1000
         y = id_number // 1000
         z = 0
 
-        self.client.request(f"vset /object/{object_id}/location {x} {y} {z}")
+        return {"location": (x, y, z), "visible": False if self._needs_hiding(object_id) else None}
 
-        # Fires need also hiding, as it extinguishes them. Fire may burn even after being moved, which is why we need this.
-        if "Niagara" in object_id or object_id in [
-            "BP_Configuration_13_C_UAID_08BFB8191750E53702_1640163914",
-            "BP_Configuration_12_C_UAID_08BFB8191750E53702_1361488908",
-            "SkeletalMeshActor_UAID_08BFB8191750E43702_1589650724",
-        ]:
-            self.client.request(f"vset /object/{object_id}/hide")
+    def _hide_object(self, object_id: str):
+        self._set_object_states({object_id: self._hidden_state(object_id)})
+
+    def hide_all_objects(self, keep_object_ids: Collection[str] = ()) -> List[str]:
+        """
+        Hides all objects of this class, except for the ones in `keep_object_ids` (e.g. an object that is about to be
+        shown again anyway). Objects that need hiding (fires) are hidden even if kept, as only a hide -> show cycle puts
+        them out and ignites them again at their new location. Commands for objects that are already hidden are not
+        sent.
 
-    def hide_all_objects(self):
+        Returns the commands that were sent.
+        """
         if not self.visible:
-            return
+            return []
 
-        try:
-            self.visible = False
+        object_ids = [object_id for object_id in self.spawnable_object_ids
+                      if object_id not in keep_object_ids or self._needs_hiding(object_id)]
+        self.visible = len(object_ids) != len(self.spawnable_object_ids)
+
+        # All hiding commands are pipelined. We are ignoring errors because if one is returned it (most likely) means that the object we wanted to hide does not exist
+        # Which is expected, as we are hiding all objects from all environments. There won't be objects from city in forest and vice versa.
+        return self._set_object_states(
+            {object_id: self._hidden_state(object_id) for object_id in object_ids}, raise_on_error=False
+        )
 
-            for object_id in self.spawnable_object_ids:
-                self._hide_object(object_id)
-        except UnrealException:
-            # We are ignoring this exception because if it is raised it (most likely) means that the object we wanted to hide does not exist
-            # Which is expected, as we are hiding all objects from all environments. There won't be objects from city in forest and vice versa.
-            pass
+    def choose_object_id(self, seed: int) -> str:
+        rng = Random()
+        rng.seed(seed)
+        return rng.choice(self.spawnable_object_ids)
 
     # Returns object id of the object moved
     def move_and_show(self, x: float, y: float, z: float, seed: int) -> str:
         self.visible = True
 
-        rng = Random()
-        rng.seed(seed)
-        object_id = rng.choice(self.spawnable_object_ids)
-
-        self.client.request(f"vset /object/{object_id}/location {x} {y} {z}")
-        self.client.request(f"vset /object/{object_id}/show")
+        object_id = self.choose_object_id(seed)
+        self._set_object_states({object_id: {"location": (x, y, z), "visible": True}})
 
         return object_id
 
     def rotate_object(self, object_id: str, p: float, q: float, r: float):
-        self.client.request(f"vset /object/{object_id}/rotation {p} {q} {r}")
+        self._set_object_states({object_id: {"rotation": (p, q, r)}})
+
+    def _set_object_states(self, states: Dict[str, Dict], raise_on_error: bool = True) -> List[str]:
+        """
+        Brings objects to the requested states, sending (pipelined) only the commands that differ from the scene state
+        we last pushed to the simulator. Returns the commands that were sent.
+        """
+        scene_state = self.client.scene_state
+
+        commands = []
+        for object_id, state in states.items():
+            commands.extend(scene_state.object_commands(object_id, **state))
+
+        if commands:
+            try:
+                self.client.request_many(commands, raise_on_error=raise_on_error)
+            except Exception:
+                # Some of the commands may have been applied, so we no longer know the state of these objects.
+                for object_id in states:
+                    scene_state.forget_object(object_id)
+                raise
+
+        for object_id, state in states.items():
+            scene_state.update_object(object_id, **state)
+
+        return commands
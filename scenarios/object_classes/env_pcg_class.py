@@ -1,17 +1,15 @@
+from glimpse_generators.readiness import pcg_ready, wait_until
+
+
 class EnvPCGClass:
     def __init__(self, pcg_id: str, client):
         self.pcg_id = pcg_id
         self.client = client
 
     def _wait_for_pcg(self):
-        ready = self.client.request(f"vbp {self.pcg_id} IsPCGReady")
-
-        while ready == "false":
-            ready = self.client.request(f"vbp {self.pcg_id} IsPCGReady")
-            print(
-                f"PCG is not ready while waiting for {self.pcg_id}, sleeping for 0.5 seconds, got:",
-                ready,
-            )
+        config = self.client.readiness_config
+        wait_until(lambda: pcg_ready(self.client, self.pcg_id), f"PCG {self.pcg_id}", config.pcg_deadline_seconds, config,
+                   tracer=self.client.tracer)
 
     def run_pcg(self, seed: int):
         self.client.request(f"vbp {self.pcg_id} RunPCG {seed}")
@@ -30,7 +28,18 @@ class ForestEnvPCGClass(EnvPCGClass):
         stones: float = 0.0,
         cliffs: float = 0.0,
     ):
+        params = (live_trees_density, dead_trees_density, stones, cliffs, seed)
+
+        # Generation is deterministic given its parameters, so there's nothing to do if the forest is already generated.
+        if not self.client.scene_state.pcg_changed(self.pcg_id, params):
+            return
+
+        # If generation fails midway, we don't know what the forest looks like anymore.
+        self.client.scene_state.forget_pcg(self.pcg_id)
+
         self.client.request(
             f"vbp {self.pcg_id} RunPCG {live_trees_density} {dead_trees_density} {stones} {cliffs} {seed}"
         )
         self._wait_for_pcg()
+
+        self.client.scene_state.update_pcg(self.pcg_id, params)
@@ -6,4 +6,9 @@ class SunClass:
     def set_sun_rotation(self, sun_y, sun_z):
         # OpenCV has a different coordinate system than that of Unreal's editor.
         # This means a rather awkward placement of y and z coordinates.
-        self.client.request(f"vset /object/{self.sun_id}/rotation {sun_y} {sun_z} 0")
+        commands = self.client.scene_state.object_commands(self.sun_id, rotation=(sun_y, sun_z, 0))
+
+        if commands:
+            self.client.request_many(commands)
+
+        self.client.scene_state.update_object(self.sun_id, rotation=(sun_y, sun_z, 0))
@@ -1,5 +1,7 @@
-from time import sleep
+from typing import Collection, List, Optional, Tuple
 
+from glimpse_generators.readiness import pcg_ready, wait_until
+from glimpse_generators.unreal_client_wrapper import UnrealException
 from scenarios.object_classes.base_object_class import BaseObjectClass
 
 
@@ -12,22 +14,61 @@ class PCGClass(BaseObjectClass):
     def _hide_object(self, object_id: str):
         super()._hide_object(object_id)
         # Yes, we have to run PCG as the super method will put it somewhere, but you need to regenerate it for it to happen.
-        self.client.request(f"vbp {self.pcg_id} RunPCG 0")
-        self._wait_for_pcg()
+        self.run_pcg(0)
+
+    def hide_all_objects(self, keep_object_ids: Collection[str] = ()) -> List[str]:
+        commands = super().hide_all_objects(keep_object_ids)
+
+        if not commands:
+            return commands
+
+        try:
+            # Same as in _hide_object, but PCG is regenerated only once for all the (pipelined) hides.
+            self.run_pcg(0)
+        except UnrealException:
+            # PCG actor does not exist in this environment, see BaseObjectClass.hide_all_objects
+            pass
+
+        return commands
 
     def _wait_for_pcg(self):
-        response = self.client.request(f"vbp {self.pcg_id} IsPCGReady")
+        config = self.client.readiness_config
+        wait_until(lambda: pcg_ready(self.client, self.pcg_id), f"PCG {self.pcg_id}", config.pcg_deadline_seconds, config,
+                   tracer=self.client.tracer)
 
-        while "false" in response:
-            print(
-                f"PCG is not ready while waiting for {self.pcg_id}, sleeping for 0.5 seconds; got:",
-                response,
-            )
-            sleep(0.5)
-            response = self.client.request(f"vbp {self.pcg_id} IsPCGReady")
+    def _pcg_params(self, seed: int) -> Optional[Tuple]:
+        """
+        Generation depends on the seed and on where the spawnable objects are. Returns None if we don't know where they
+        are, in which case PCG always has to be run.
+        """
+        locations = []
+
+        for object_id in self.spawnable_object_ids:
+            state = self.client.scene_state.objects.get(object_id)
+
+            if state is None or state.location is None:
+                return None
+
+            locations.append(state.location)
+
+        return (seed, *locations)
+
+    def run_pcg(self, seed: int):
+        params = self._pcg_params(seed)
+
+        if params is not None and not self.client.scene_state.pcg_changed(self.pcg_id, params):
+            return
+
+        # If generation fails midway, we don't know what was generated anymore.
+        self.client.scene_state.forget_pcg(self.pcg_id)
 
-    def move_and_show(self, x: float, y: float, z: float, seed: int) -> str:
-        object_id = super().move_and_show(x, y, z, seed)
         self.client.request(f"vbp {self.pcg_id} RunPCG {seed}")
         self._wait_for_pcg()
+
+        if params is not None:
+            self.client.scene_state.update_pcg(self.pcg_id, params)
+
+    def move_and_show(self, x: float, y: float, z: float, seed: int) -> str:
+        object_id = super().move_and_show(x, y, z, seed)
+        self.run_pcg(seed)
         return object_id
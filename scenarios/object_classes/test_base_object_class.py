@@ -0,0 +1,42 @@
+import numpy as np
+
+from glimpse_generators.test_unreal_glimpse_generator import UnrealClientMock
+from scenarios.object_classes.base_object_class import BaseObjectClass
+
+FIRE_ID = "NiagaraActor_UAID_001"
+CAR_ID = "BP_Car_C_UAID_002"
+
+
+def visibility_requests(client):
+    return [request for request in client.requests if request.endswith(("/show", "/hide"))]
+
+
+def make_client():
+    return UnrealClientMock(np.zeros((8, 8, 3), dtype=np.uint8))
+
+
+class TestHideAllObjects:
+    def test_kept_object_is_only_moved(self):
+        client = make_client()
+        cars = BaseObjectClass([CAR_ID], client=client)
+
+        cars.move_and_show(100, 200, 0, seed=0)
+        client.requests.clear()
+
+        cars.hide_all_objects(keep_object_ids={CAR_ID})
+        cars.move_and_show(300, 200, 0, seed=0)
+
+        assert client.requests == [f"vset /object/{CAR_ID}/location 300.0 200.0 0.0"]
+
+    def test_kept_fire_is_put_out_and_ignited_again(self):
+        client = make_client()
+        fires = BaseObjectClass([FIRE_ID], client=client)
+
+        fires.move_and_show(100, 200, 0, seed=0)
+        client.requests.clear()
+
+        fires.hide_all_objects(keep_object_ids={FIRE_ID})
+        fires.move_and_show(300, 200, 0, seed=0)
+
+        assert visibility_requests(client) == [f"vset /object/{FIRE_ID}/hide", f"vset /object/{FIRE_ID}/show"]
+        assert client.scene_state.objects[FIRE_ID].visible
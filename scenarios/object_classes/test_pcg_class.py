@@ -0,0 +1,64 @@
+import numpy as np
+
+from glimpse_generators.test_unreal_glimpse_generator import UnrealClientMock
+from scenarios.object_classes.env_pcg_class import ForestEnvPCGClass
+from scenarios.object_classes.pcg_class import PCGClass
+
+
+def pcg_runs(client):
+    return [request for request in client.requests if "RunPCG" in request]
+
+
+def make_client():
+    return UnrealClientMock(np.zeros((8, 8, 3), dtype=np.uint8))
+
+
+class TestPCGClass:
+    def test_unchanged_generation_is_skipped(self):
+        client = make_client()
+        crowd = PCGClass("spawner", ["crowd_1"], client=client)
+
+        crowd.move_and_show(100, 200, 0, seed=3)
+        crowd.move_and_show(100, 200, 0, seed=3)
+        assert pcg_runs(client) == ["vbp spawner RunPCG 3"]
+
+        crowd.move_and_show(100, 200, 0, seed=4)
+        crowd.move_and_show(300, 200, 0, seed=4)
+        assert len(pcg_runs(client)) == 3
+
+    def test_hiding_regenerates_once(self):
+        client = make_client()
+        crowd = PCGClass("spawner", ["crowd_1", "crowd_2"], client=client)
+
+        crowd.move_and_show(100, 200, 0, seed=3)
+        crowd.hide_all_objects()
+        crowd.hide_all_objects()
+        assert pcg_runs(client)[1:] == ["vbp spawner RunPCG 0"]
+
+    def test_kept_objects_are_not_regenerated(self):
+        client = make_client()
+        crowd = PCGClass("spawner", ["crowd_1"], client=client)
+
+        crowd.move_and_show(100, 200, 0, seed=3)
+        crowd.hide_all_objects(keep_object_ids={"crowd_1"})
+        assert len(pcg_runs(client)) == 1
+
+    def test_unknown_scene_state_regenerates(self):
+        client = make_client()
+        crowd = PCGClass("spawner", ["crowd_1"], client=client)
+
+        crowd.move_and_show(100, 200, 0, seed=3)
+        client.scene_state.clear()
+        crowd.move_and_show(100, 200, 0, seed=3)
+        assert len(pcg_runs(client)) == 2
+
+
+class TestForestEnvPCGClass:
+    def test_unchanged_forest_is_not_regenerated(self):
+        client = make_client()
+        forest = ForestEnvPCGClass("forest", client)
+
+        forest.run_pcg(1, 0.2, 0.02, 0.05)
+        forest.run_pcg(1, 0.2, 0.02, 0.05)
+        forest.run_pcg(2, 0.2, 0.02, 0.05)
+        assert len(pcg_runs(client)) == 2
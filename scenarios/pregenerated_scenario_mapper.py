@@ -0,0 +1,54 @@
+from typing import Any, Dict, List, Sequence
+
+from scenarios.base_scenario_mapper import EpisodeCollectionMapper, EpisodeIteratorMapper
+
+
+class PregeneratedScenarioMapper(EpisodeCollectionMapper):
+    def __init__(self, scenario_mapper: EpisodeIteratorMapper, seeds: Sequence[int], first_idx: int = 0):
+        """
+        Draws one scenario per seed from `scenario_mapper` up front (e.g. so that they can be reordered before running).
+        Scenario `first_idx + i` is the one drawn with `seeds[i]`. Invalid scenarios are replaced with `redraw`, as the
+        evaluator would do with `scenario_mapper` (the replacement is no longer placed by the schedule, though).
+        """
+        super().__init__(scenario_mapper.object_probs, scenario_mapper.get_object_type_cls())
+
+        self.scenario_mapper = scenario_mapper
+        self.first_idx = first_idx
+        self.scenarios = self._draw_scenarios(seeds)
+
+    def _draw_scenarios(self, seeds: Sequence[int]) -> List[Dict[str, Any]]:
+        if hasattr(self.scenario_mapper, "sample_batch"):
+            # Mappers use their seed only as the seed of the scenario.
+            scenarios = self.scenario_mapper.sample_batch(len(seeds))
+
+            for scenario, seed in zip(scenarios, seeds):
+                scenario["seed"] = seed
+
+            return scenarios
+
+        scenarios = []
+
+        for seed in seeds:
+            self.scenario_mapper.set_seed(seed)
+            scenarios.append(next(self.scenario_mapper))
+
+        return scenarios
+
+    def redraw(self, item: int) -> Dict[str, Any]:
+        """Replaces scenario `item` (e.g. found invalid) with a new one, drawn with the same seed."""
+        self.scenario_mapper.set_seed(self[item]["seed"])
+        scenario = self.scenarios[item - self.first_idx] = next(self.scenario_mapper)
+
+        return scenario
+
+    def get_description(self, object_type):
+        return self.scenario_mapper.get_description(object_type)
+
+    def __len__(self):
+        return self.first_idx + len(self.scenarios)
+
+    def __getitem__(self, item: int):
+        return self.scenarios[item - self.first_idx]
+
+    def __iter__(self):
+        return iter(self.scenarios)
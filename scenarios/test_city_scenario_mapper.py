@@ -0,0 +1,79 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scenarios.city_scenario_mapper import CityScenarioMapper
+
+ObjectType = CityScenarioMapper.ObjectType
+
+
+@pytest.fixture
+def locations(tmp_path, monkeypatch):
+    path = tmp_path / "locations.csv"
+    xs = np.arange(100, dtype=np.float64) * 1000
+    pd.DataFrame({
+        "X": xs,
+        "Y": -xs,
+        "Z": np.full(100, 500.0),
+        "P": np.zeros(100),
+        "Q": np.zeros(100),
+        "R": xs / 1000,
+    }).to_csv(path, index=False)
+    monkeypatch.setenv("LOCATIONS_CITY_PATH", str(path))
+    monkeypatch.setenv("LOCATIONS_CITY_INDEX_PATH", str(tmp_path / "missing.csv"))
+
+
+def make_mapper(**kwargs):
+    return CityScenarioMapper({ObjectType.FIRE: 0.5, (ObjectType.CROWD, ObjectType.WHITE_TRUCK): 0.5},
+                              drone_z_rel_min=3000, drone_z_rel_max=10000, **kwargs)
+
+
+class TestCityScenarioMapper:
+    def test_bounds_filter(self, locations):
+        mapper = make_mapper(x_min=10000, x_max=19000)
+
+        assert mapper.locations.flags["C_CONTIGUOUS"]
+        assert list(mapper.location_rows) == list(range(10, 20))
+        assert list(mapper.possible_locations.index) == list(range(10, 20))
+
+    def test_batch_matches_scenario_distribution(self, locations):
+        mapper = make_mapper(alpha=0.5, random_sun=True)
+        scenarios = mapper.sample_batch(2000, np.random.default_rng(0))
+
+        assert len(scenarios) == 2000
+        assert {scenario["object_type"] for scenario in scenarios} == {
+            ObjectType.FIRE, ObjectType.CROWD, ObjectType.WHITE_TRUCK
+        }
+
+        for scenario in scenarios:
+            x, y, z = scenario["object_coords"]
+            drone_x, drone_y, drone_z = scenario["drone_rel_coords"]
+
+            assert (x, y, z) in set(map(tuple, mapper.locations[:, :3].tolist()))
+            assert scenario["object_rot"] == (0.0, 0.0, x / 1000)
+            assert 35 <= drone_z <= 105
+            # Truncated towards zero, as `__next__` does.
+            assert abs(drone_x) <= 0.5 * (drone_z + 1) and abs(drone_y) <= 0.5 * (drone_z + 1)
+            assert all(type(value) is int for value in scenario["drone_rel_coords"])
+            assert -90 <= scenario["sun_y"] <= -10 and 0 <= scenario["sun_z"] <= 360
+
+        fires = sum(scenario["object_type"] == ObjectType.FIRE for scenario in scenarios)
+        assert 900 < fires < 1100
+
+    def test_next_is_reproducible_with_random_seed(self, locations):
+        mapper = make_mapper()
+
+        random.seed(5)
+        first = [next(mapper) for _ in range(3)]
+        random.seed(5)
+        second = [next(mapper) for _ in range(3)]
+
+        assert first == second
+
+    def test_probabilities_must_sum_to_one(self, locations):
+        mapper = CityScenarioMapper({ObjectType.FIRE: 0.1}, drone_z_rel_min=3000, drone_z_rel_max=3000)
+
+        with pytest.raises(ValueError):
+            mapper.sample_batch(100, np.random.default_rng(0))
@@ -0,0 +1,55 @@
+import pandas as pd
+import pytest
+
+from scenarios.city_scenario_mapper import CityScenarioMapper
+from scenarios.city_validity_index import LocationValidity
+
+ObjectType = CityScenarioMapper.ObjectType
+
+VALID = LocationValidity.VALIDATED | LocationValidity.PLACEMENT_OK | LocationValidity.VISIBLE
+HIDDEN = LocationValidity.VALIDATED | LocationValidity.PLACEMENT_OK
+IN_BUILDING = LocationValidity.VALIDATED
+
+
+@pytest.fixture
+def locations(tmp_path, monkeypatch):
+    path = tmp_path / "locations.csv"
+    pd.DataFrame({
+        "X": [0.0, 100.0, 200.0, 300.0],
+        "Y": [0.0, 0.0, 0.0, 0.0],
+        "Z": [50.0, 50.0, 50.0, 50.0],
+        "P": [0.0] * 4,
+        "Q": [0.0] * 4,
+        "R": [0.0] * 4,
+    }).to_csv(path, index=False)
+    monkeypatch.setenv("LOCATIONS_CITY_PATH", str(path))
+    monkeypatch.setenv("LOCATIONS_CITY_INDEX_PATH", str(tmp_path / "missing.csv"))
+
+
+def make_mapper(index, require_object_in_sight):
+    return CityScenarioMapper({ObjectType.FIRE: 1.0}, drone_z_rel_min=3000, drone_z_rel_max=3000,
+                              require_object_in_sight=require_object_in_sight, validity_index=index)
+
+
+class TestValidityIndex:
+    def test_invalid_locations_are_not_sampled(self, locations):
+        # The last location wasn't validated, so it's assumed to be valid.
+        index = pd.DataFrame({"FIRE": [int(VALID), int(HIDDEN), int(IN_BUILDING), 0]})
+
+        in_sight = make_mapper(index, require_object_in_sight=True)
+        placement = make_mapper(index, require_object_in_sight=False)
+
+        assert list(in_sight.locations[in_sight.get_possible_locations(ObjectType.FIRE), 0]) == [0.0, 300.0]
+        assert list(placement.locations[placement.get_possible_locations(ObjectType.FIRE), 0]) == [0.0, 100.0, 300.0]
+        assert next(in_sight)["object_coords"][0] in (0.0, 300.0)
+
+    def test_types_missing_from_index_use_all_locations(self, locations):
+        mapper = make_mapper(pd.DataFrame({"CROWD": [0, 0, 0, 0]}), require_object_in_sight=True)
+
+        assert len(mapper.get_possible_locations(ObjectType.FIRE)) == 4
+
+    def test_no_index(self, locations):
+        mapper = make_mapper(None, require_object_in_sight=True)
+
+        assert mapper.validity_index is None
+        assert len(mapper.get_possible_locations(ObjectType.FIRE)) == 4
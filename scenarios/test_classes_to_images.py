@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from misc.cv2_and_numpy import pil_to_opencv
+from scenarios.city_scenario_mapper import CityScenarioMapper
+from scenarios.classes_to_images import CLASS_IMAGE_FILES, CLASS_IMAGES_DIR, ClassImageRegistry
+
+ObjectType = CityScenarioMapper.ObjectType
+
+
+def test_every_object_type_has_an_image():
+    # Anomalies differ from scenario to scenario, so there's no single sample to show for them.
+    assert set(CLASS_IMAGE_FILES) == set(ObjectType) - {ObjectType.ANOMALY}
+    assert all((CLASS_IMAGES_DIR / file).exists() for file in CLASS_IMAGE_FILES.values())
+
+
+class TestClassImageRegistry:
+    def test_images_are_loaded_lazily(self):
+        registry = ClassImageRegistry()
+
+        assert registry.images == {}
+        registry.get_frame(ObjectType.FIRE, 100)
+        assert list(registry.images) == [ObjectType.FIRE]
+
+    def test_frame_is_the_resized_sample(self):
+        registry = ClassImageRegistry()
+        frame = registry.get_frame(ObjectType.POLICE_CAR, 100)
+
+        expected = pil_to_opencv(Image.open(CLASS_IMAGES_DIR / "police_car.png.jpg").resize((100, 100)))
+
+        assert frame.shape == (100, 100, 3)
+        assert np.array_equal(frame, expected)
+
+    def test_frames_are_cached_per_resolution(self):
+        registry = ClassImageRegistry()
+
+        assert registry.get_frame(ObjectType.CROWD, 100) is registry.get_frame(ObjectType.CROWD, 100)
+        assert registry.get_frame(ObjectType.CROWD, 100) is not registry.get_frame(ObjectType.CROWD, 200)
+        assert registry.get_frame(ObjectType.CROWD, 100).to_pil() is registry.get_frame(ObjectType.CROWD, 100).to_pil()
+
+    def test_shared_frames_are_read_only(self):
+        frame = ClassImageRegistry().get_frame(ObjectType.FIRE, 100)
+
+        with pytest.raises(ValueError):
+            frame[0, 0] = 0
+        with pytest.raises(ValueError):
+            frame.rgb[0, 0] = 0